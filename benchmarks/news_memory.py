@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "feedparser==6.0.11",
+#   "rich==13.7.1",
+#   "pyarrow",
+# ]
+# ///
+"""
+⏱️ 記事ストアのメモリベンチマーク
+数百フィード × 数日分の記事を、以前の NewsItem（通常の dataclass）のリスト、
+__slots__ + ソース名 intern の NewsItem のリスト、列指向の NewsStore で保持したときの
+メモリ使用量と、NewsStore の一括書き出しの時間を比較します
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+from rich import box
+
+from news import NewsItem, NewsStore
+
+console = Console()
+
+@dataclass
+class LegacyNewsItem:
+    """以前の NewsItem（__dict__ あり・ソース名は記事ごとに別の文字列・公開時刻は文字列）"""
+    title: str
+    url: str
+    source: str
+    published: Optional[str] = None
+    summary: Optional[str] = None
+
+def make_records(feeds, per_feed, seed):
+    """フィードキャッシュから読み込んだときと同じく、1行ずつ JSON から記事を作るための JSONL 行"""
+    rng = random.Random(seed)
+    lines = []
+    for feed in range(feeds):
+        source = f"フィード{feed:03d}"
+        for i in range(per_feed):
+            lines.append(json.dumps({
+                'title': f"ニュース見出し{feed}-{i} " + '東京' * rng.randrange(5, 20),
+                'url': f"https://news{feed}.example.com/article/{rng.randrange(10 ** 9)}",
+                'source': source,
+                'published': f"2026-10-{rng.randrange(10, 18)}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00+09:00",
+                'summary': '記事の概要です。' * rng.randrange(3, 12),
+            }, ensure_ascii=False))
+    return lines
+
+def retained(build):
+    """build() の戻り値が保持しているメモリ（バイト）を tracemalloc で計測する"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+def main():
+    parser = argparse.ArgumentParser(description="記事ストアのメモリベンチマーク")
+    parser.add_argument('--feeds', type=int, default=300, help='フィード数')
+    parser.add_argument('--per-feed', type=int, default=300, help='フィードごとの記事数（数日分）')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    lines = make_records(args.feeds, args.per_feed, args.seed)
+    count = len(lines)
+
+    legacy_size, legacy = retained(lambda: [LegacyNewsItem(**json.loads(line)) for line in lines])
+    del legacy
+    slots_size, slotted = retained(lambda: [NewsItem.from_dict(json.loads(line)) for line in lines])
+    del slotted
+    store_size, store = retained(lambda: NewsStore(NewsItem.from_dict(json.loads(line)) for line in lines))
+
+    table = Table(title=f"⏱️ {count:,} 件の記事（{args.feeds} フィード）", box=box.ROUNDED)
+    table.add_column("保持方法")
+    table.add_column("メモリ (MB)", justify="right")
+    table.add_column("1件 (byte)", justify="right")
+    table.add_column("削減", justify="right", style="bold green")
+    for label, size in (("list[dataclass]（以前）", legacy_size),
+                        ("list[NewsItem]（slots + intern）", slots_size),
+                        ("NewsStore（列指向）", store_size)):
+        table.add_row(
+            escape(label),
+            f"{size / 1024 / 1024:.1f}",
+            f"{size / count:.0f}",
+            "-" if size == legacy_size else f"{(1 - size / legacy_size) * 100:.0f}%"
+        )
+    console.print(table)
+
+    export_table = Table(title="💾 NewsStore の一括書き出し", box=box.ROUNDED)
+    export_table.add_column("形式")
+    export_table.add_column("時間 (ms)", justify="right")
+    export_table.add_column("サイズ (MB)", justify="right")
+    # pyarrow の import 時間を計測に含めない
+    try:
+        store.to_arrow()
+    except RuntimeError:
+        pass
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for suffix in ('.jsonl', '.arrow', '.parquet'):
+            path = Path(tmp_dir) / f'news{suffix}'
+            started = time.perf_counter()
+            try:
+                store.export(path)
+            except RuntimeError as e:
+                export_table.add_row(suffix, "-", f"[yellow]{e}[/yellow]")
+                continue
+            elapsed = time.perf_counter() - started
+            export_table.add_row(suffix, f"{elapsed * 1000:.1f}", f"{path.stat().st_size / 1024 / 1024:.1f}")
+    console.print(export_table)
+
+if __name__ == "__main__":
+    main()
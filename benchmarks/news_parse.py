@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "feedparser==6.0.11",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ RSSフィード解析ベンチマーク
+フィード全体を読み込んで feedparser で解析する方法と、チャンクごとのストリーム解析
+（上限件数に達したら読むのをやめる）の時間とピークメモリを比較します
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedparser
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from news import STREAM_CHUNK_SIZE, items_from_feedparser, iter_feed_items
+
+console = Console()
+
+def make_feed(path, count):
+    """count 件の記事を持つ RSS 2.0 フィードを書き出す（アーカイブフィードを想定した長めの本文付き）"""
+    body = '長い本文 ' * 200
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                '<title>archive</title><link>https://example.com/</link><description>d</description>')
+        for i in range(count):
+            f.write(f'<item><title>ニュース見出し {i}</title>'
+                    f'<link>https://example.com/article/{i}</link>'
+                    f'<pubDate>Sat, 17 Oct 2026 09:{i % 60:02d}:00 +0900</pubDate>'
+                    f'<description><![CDATA[<p>記事{i}の概要です。</p>{body}]]></description></item>\n')
+        f.write('</channel></rss>')
+
+def feedparser_path(path, limit):
+    """以前の処理: 全体を読み込んで feedparser.parse してから先頭 limit 件"""
+    with open(path, 'rb') as f:
+        body = f.read()
+    return items_from_feedparser(feedparser.parse(body), 'bench', limit)
+
+def streaming_path(path, limit):
+    """チャンクごとに解析し、limit 件で読むのをやめる"""
+    with open(path, 'rb') as f:
+        chunks = iter(lambda: f.read(STREAM_CHUNK_SIZE), b'')
+        return list(iter_feed_items(chunks, 'bench', limit))
+
+def measure(func, path, limit, repeat):
+    """(最速の時間 秒, ピークメモリ バイト, 結果) を返す。メモリは別の1回で計測する"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(path, limit)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(path, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description="RSSフィード解析（全体読み込み vs ストリーム）のベンチマーク")
+    parser.add_argument('--items', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='フィードの記事数')
+    parser.add_argument('--limit', type=int, default=15, help='取得する記事数の上限')
+    parser.add_argument('--repeat', type=int, default=3, help='各条件の試行回数（最速値を採用）')
+    args = parser.parse_args()
+
+    table = Table(
+        title=f"⏱️ 先頭 {args.limit} 件の取得（全体 = 読み込み + feedparser, 逐次 = ストリーム解析）",
+        box=box.ROUNDED
+    )
+    table.add_column("記事数", justify="right")
+    table.add_column("サイズ", justify="right")
+    table.add_column("全体 (ms)", justify="right")
+    table.add_column("逐次 (ms)", justify="right")
+    table.add_column("高速化", justify="right", style="bold green")
+    table.add_column("全体ピーク", justify="right")
+    table.add_column("逐次ピーク", justify="right")
+    table.add_column("一致", justify="center")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in args.items:
+            path = Path(tmp_dir) / f'feed_{count}.xml'
+            make_feed(path, count)
+            size_mb = path.stat().st_size / 1024 / 1024
+            full_time, full_peak, full_items = measure(feedparser_path, path, args.limit, args.repeat)
+            stream_time, stream_peak, stream_items = measure(streaming_path, path, args.limit, args.repeat)
+            table.add_row(
+                str(count),
+                f"{size_mb:.1f} MB",
+                f"{full_time * 1000:.1f}",
+                f"{stream_time * 1000:.1f}",
+                f"{full_time / stream_time:.0f}x",
+                f"{full_peak / 1024 / 1024:.1f} MB",
+                f"{stream_peak / 1024 / 1024:.2f} MB",
+                "✅" if full_items == stream_items else "[red]❌[/red]"
+            )
+
+    console.print(table)
+
+if __name__ == "__main__":
+    main()
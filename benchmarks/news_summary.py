@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "feedparser==6.0.11",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ 記事サマリー抽出ベンチマーク
+実際のフィードの description / summary を集め、以前の処理（ループ内で re.sub して先頭100文字）と
+extract_summary（コンパイル済みパターン・途中で打ち切り・実体参照のデコード）を比較します
+"""
+
+import argparse
+import html
+import re
+import sys
+import time
+import urllib.request
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from news import NewsAggregator, USER_AGENT, extract_summary
+
+console = Console()
+
+_SUMMARY_TAGS = {
+    'description',
+    '{http://purl.org/rss/1.0/}description',
+    '{http://www.w3.org/2005/Atom}summary',
+    '{http://www.w3.org/2005/Atom}content',
+    '{http://purl.org/rss/1.0/modules/content/}encoded',
+}
+
+def load_feed(source):
+    """URL またはローカルファイルからフィードの本文を読み込む"""
+    if Path(source).exists():
+        return Path(source).read_bytes()
+    request = urllib.request.Request(source, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read()
+
+def collect_summaries(sources):
+    """各フィードの description / summary / content の生の HTML を集める"""
+    corpus = []
+    for source in sources:
+        try:
+            root = ET.fromstring(load_feed(source))
+        except Exception as e:
+            console.print(f"[yellow]{source} を読み込めませんでした: {e}[/yellow]")
+            continue
+        corpus.extend(elem.text for elem in root.iter() if elem.tag in _SUMMARY_TAGS and elem.text)
+    return corpus
+
+def old_summary(summary):
+    """以前の get_rss_feed() の処理（ループ内の import も含めて再現）"""
+    if summary:
+        import re
+        summary = re.sub(r'<[^>]+>', '', summary)
+        summary = summary.strip()[:100] + '...' if len(summary) > 100 else summary
+    return summary
+
+def full_unescape_summary(summary):
+    """以前の処理に html.unescape を足しただけのもの（本文全体をタグ除去・デコードしてから切る）"""
+    text = html.unescape(re.sub(r'<[^>]+>', '', summary)).strip()
+    return text[:100] + '...' if len(text) > 100 else text
+
+METHODS = [
+    ("以前", old_summary),
+    ("以前+unescape", full_unescape_summary),
+    ("extract_summary", extract_summary),
+]
+
+# 本文の長さ（HTML の文字数）の区切り
+LENGTH_BUCKETS = [(0, 500, "〜500"), (500, 5000, "500〜5000"), (5000, float('inf'), "5000〜")]
+
+def best_time(func, corpus, repeat):
+    """コーパス全体を repeat 回処理して最速の時間（秒）を返す"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for summary in corpus:
+            func(summary)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="記事サマリー抽出のマイクロベンチマーク")
+    parser.add_argument('feeds', nargs='*',
+                        help='フィードの URL またはファイル（省略時は news.py の登録フィード）')
+    parser.add_argument('--repeat', type=int, default=20, help='試行回数（最速値を採用）')
+    args = parser.parse_args()
+
+    sources = args.feeds or list(NewsAggregator().rss_feeds.values())
+    corpus = collect_summaries(sources)
+    if not corpus:
+        console.print("[red]サマリーを1件も集められませんでした[/red]")
+        sys.exit(1)
+
+    table = Table(title=f"⏱️ {len(corpus)} 件のサマリー（1件あたり µs）", box=box.ROUNDED)
+    table.add_column("HTML の長さ")
+    table.add_column("件数", justify="right")
+    for label, _ in METHODS:
+        table.add_column(label, justify="right")
+    table.add_column("高速化", justify="right", style="bold green")
+
+    for low, high, label in LENGTH_BUCKETS:
+        bucket = [summary for summary in corpus if low <= len(summary) < high]
+        if not bucket:
+            continue
+        per_item = [best_time(func, bucket, args.repeat) / len(bucket) * 1e6 for _, func in METHODS]
+        table.add_row(
+            label,
+            str(len(bucket)),
+            *(f"{value:.1f}" for value in per_item),
+            f"{per_item[1] / per_item[2]:.1f}x"
+        )
+
+    console.print(table)
+    console.print("高速化は、同じ結果になる「以前+unescape」（本文全体を処理）との比較です")
+    differs = sum(1 for summary in corpus if old_summary(summary) != extract_summary(summary))
+    console.print(f"実体参照のデコードなどで、以前と表示が変わるサマリー: {differs} 件")
+
+if __name__ == "__main__":
+    main()
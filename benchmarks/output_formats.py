@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "feedparser==6.0.11",
+#   "requests==2.31.0",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ 出力形式ベンチマーク
+weather.py と news.py の rich による表示（パネル・テーブル）と、--format json / ndjson の
+書き出しにかかる時間を比較します（取得は含めず、同じデータの描画・書き出しだけを計測）
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+import news
+import weather
+from stub_server import CITIES, synthetic_cities, weather_for
+
+console = Console()
+
+def terminal_console():
+    """端末への出力と同じく ANSI エスケープ付きで描画し、結果は捨てる Console"""
+    return Console(file=io.StringIO(), width=120, force_terminal=True, color_system='truecolor')
+
+def make_weather_results(count):
+    """スタブサーバーと同じ疑似データで (city, data, error) を count 件作る"""
+    cities = (CITIES + synthetic_cities(count))[:count]
+    return [(city['name'], weather_for(city, 'metric'), None) for city in cities]
+
+def make_news_items(count, seed):
+    """3つのソースに振り分けた count 件の記事"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    sources = ['Yahoo!ニュース', 'ITメディア', 'Yahoo!経済']
+    return [
+        news.NewsItem(
+            title=f"ニュース見出し{i} " + '東京' * rng.randrange(3, 12),
+            url=f"https://news.example.com/article/{i}",
+            source=sources[i % len(sources)],
+            published=now - timedelta(minutes=rng.randrange(60 * 24 * 3)),
+            summary='記事の概要です。' * rng.randrange(3, 12)
+        )
+        for i in range(count)
+    ]
+
+def weather_panels(results):
+    out = terminal_console()
+    for _, data, _ in results:
+        out.print(weather.format_weather_display(data))
+    return out.file.tell()
+
+def weather_table(results):
+    out = terminal_console()
+    out.print(weather.format_weather_table(results))
+    return out.file.tell()
+
+def weather_json(fmt):
+    def write(results):
+        stream = io.StringIO()
+        weather.write_records(iter(results), fmt, stream=stream)
+        return stream.tell()
+    return write
+
+def news_rich(items):
+    news.console = terminal_console()
+    groups = news.aggregate_news(items)
+    news.display_news_by_source(groups)
+    news.display_summary(groups)
+    return news.console.file.tell()
+
+def news_json(fmt):
+    def write(items):
+        stream = io.StringIO()
+        writer = news.RecordWriter(fmt, stream)
+        for item in items:
+            writer.write(item.to_dict())
+        writer.close()
+        return stream.tell()
+    return write
+
+def best_time(func, data, repeat):
+    """(最速の時間 秒, 出力の文字数) を返す"""
+    best, size = float('inf'), 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = func(data)
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+def main():
+    parser = argparse.ArgumentParser(description="rich の表示と JSON / NDJSON 出力の描画コストの比較")
+    parser.add_argument('--cities', type=int, default=500, help='天気の都市数')
+    parser.add_argument('--items', type=int, default=3000, help='ニュースの記事数')
+    parser.add_argument('--repeat', type=int, default=3, help='試行回数（最速値を採用）')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    cases = [
+        (f"weather.py（{args.cities} 都市）", make_weather_results(args.cities), [
+            ("rich パネル（1都市ずつ）", weather_panels),
+            ("rich テーブル", weather_table),
+            ("--format json", weather_json('json')),
+            ("--format ndjson", weather_json('ndjson')),
+        ]),
+        (f"news.py（{args.items} 件）", make_news_items(args.items, args.seed), [
+            ("rich テーブル + サマリー", news_rich),
+            ("--format json", news_json('json')),
+            ("--format ndjson", news_json('ndjson')),
+        ]),
+    ]
+
+    table = Table(title="⏱️ 描画・書き出しの時間（取得は含まない）", box=box.ROUNDED)
+    table.add_column("対象")
+    table.add_column("形式")
+    table.add_column("時間 (ms)", justify="right")
+    table.add_column("1件 (µs)", justify="right")
+    table.add_column("出力 (千文字)", justify="right")
+    table.add_column("短縮", justify="right", style="bold green")
+    for label, data, methods in cases:
+        baseline = None
+        for name, func in methods:
+            elapsed, size = best_time(func, data, args.repeat)
+            baseline = baseline or elapsed
+            table.add_row(
+                label,
+                name,
+                f"{elapsed * 1000:.1f}",
+                f"{elapsed / len(data) * 1e6:.0f}",
+                f"{size / 1000:.0f}",
+                "-" if elapsed == baseline else f"{(1 - elapsed / baseline) * 100:.0f}%"
+            )
+            label = ""
+        table.add_section()
+
+    console.print(table)
+    console.print("短縮は各対象の先頭（rich による表示）との比較です")
+
+if __name__ == "__main__":
+    main()
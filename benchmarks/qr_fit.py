@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "qrcode[pil]==7.4.2",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ QRコードのバージョン・マスク選択ベンチマーク
+qrcode 標準の make(fit=True) と、qr.py の build_qr() のマスク選択（auto/memo/固定）を比較します
+（バージョンの決定は短縮にほとんど寄与せず、時間の大半はマスクの評価です）
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrcode
+from qrcode import util
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+import qr as qr_module
+
+console = Console()
+
+def make_payloads(count, seed):
+    """夜間バッチを想定した、長さのそろったチケット・ラベル用のデータ"""
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            payloads.append(f"https://tickets.example.com/t/{rng.randrange(10 ** 9):09d}")
+        elif kind == 1:
+            payloads.append('LBL-' + ''.join(rng.choices(string.ascii_uppercase + string.digits, k=16)))
+        else:
+            payloads.append(''.join(rng.choices(string.digits, k=24)))
+    return payloads
+
+def current_path(data, error_level):
+    """qr.py の以前の処理: version=1 から make(fit=True)"""
+    qr = qrcode.QRCode(version=1, error_correction=qr_module.ERROR_LEVELS[error_level])
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+def run(build, payloads):
+    """全データを生成して (経過秒, QRCode のリスト) を返す"""
+    started = time.perf_counter()
+    codes = [build(data) for data in payloads]
+    return time.perf_counter() - started, codes
+
+def main():
+    parser = argparse.ArgumentParser(description="バージョン・マスク選択のベンチマーク")
+    parser.add_argument('--count', type=int, default=600, help='生成するQRコードの数')
+    parser.add_argument('--error-level', choices=['L', 'M', 'Q', 'H'], default='M')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.count, args.seed)
+    baseline_time, baseline_codes = run(
+        lambda data: current_path(data, args.error_level), payloads
+    )
+    baseline_penalty = sum(util.lost_point(code.modules) for code in baseline_codes)
+
+    table = Table(title=f"⏱️ {args.count} 件の符号化時間", box=box.ROUNDED)
+    table.add_column("方式")
+    table.add_column("合計 (ms)", justify="right")
+    table.add_column("1件 (µs)", justify="right")
+    table.add_column("短縮", justify="right", style="bold green")
+    table.add_column("同一の行列", justify="right")
+    table.add_column("ペナルティ増", justify="right")
+    table.add_row(
+        "make(fit=True)",
+        f"{baseline_time * 1000:.1f}",
+        f"{baseline_time / args.count * 1e6:.0f}",
+        "-", "-", "-"
+    )
+
+    for label, mask in (("mask=auto", 'auto'), ("mask=memo", 'memo'), ("mask=0", '0')):
+        qr_module._mask_memo.clear()
+        elapsed, codes = run(
+            lambda data: qr_module.build_qr(data, error_correction=args.error_level, mask=mask), payloads
+        )
+        if mask == 'memo':
+            memo_classes = len(qr_module._mask_memo)
+        identical = sum(code.modules == base.modules for code, base in zip(codes, baseline_codes))
+        penalty = sum(util.lost_point(code.modules) for code in codes)
+        table.add_row(
+            label,
+            f"{elapsed * 1000:.1f}",
+            f"{elapsed / args.count * 1e6:.0f}",
+            f"{(1 - elapsed / baseline_time) * 100:.0f}%",
+            f"{identical}/{args.count}",
+            f"{(penalty / baseline_penalty - 1) * 100:+.1f}%"
+        )
+
+    console.print(table)
+    console.print(f"mask=memo で評価したペイロードの種類: {memo_classes}（残りはメモを再利用）")
+
+if __name__ == "__main__":
+    main()
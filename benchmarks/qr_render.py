@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "qrcode[pil]==7.4.2",
+#   "numpy",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ QRコード描画ベンチマーク
+qrcode 標準の PIL 描画（モジュールごとの矩形）と NumPy ラスタライザを比較します
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrcode
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from qr import render_square_numpy
+
+console = Console()
+
+def best_time(func, repeat):
+    """repeat 回実行して最速の時間（秒）を返す"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def build_qr(version, box_size):
+    """指定バージョンのQRコードを作る（データは1文字で固定）"""
+    qr = qrcode.QRCode(version=version, box_size=box_size, border=4)
+    qr.add_data('x')
+    qr.make(fit=False)
+    return qr
+
+def main():
+    parser = argparse.ArgumentParser(description="PIL 描画と NumPy ラスタライザのベンチマーク")
+    parser.add_argument('--versions', type=int, nargs='+', default=[1, 5, 10, 20, 30, 40],
+                        help='計測するQRバージョン (1-40)')
+    parser.add_argument('--box-sizes', type=int, nargs='+', default=[10, 20, 30, 40],
+                        help='計測するボックスサイズ')
+    parser.add_argument('--fill-color', default='black', help='前景色')
+    parser.add_argument('--back-color', default='white', help='背景色')
+    parser.add_argument('--repeat', type=int, default=3, help='各条件の試行回数（最速値を採用）')
+    args = parser.parse_args()
+
+    table = Table(title="⏱️ square スタイル描画時間", box=box.ROUNDED)
+    table.add_column("version", justify="right")
+    table.add_column("box_size", justify="right")
+    table.add_column("画像サイズ", justify="right")
+    table.add_column("PIL (ms)", justify="right")
+    table.add_column("NumPy (ms)", justify="right")
+    table.add_column("高速化", justify="right", style="bold green")
+    table.add_column("一致", justify="center")
+
+    # NumPy / PIL の import を計測に含めないよう一度ずつ実行しておく
+    warmup = build_qr(1, 1)
+    warmup.make_image(fill_color=args.fill_color, back_color=args.back_color)
+    render_square_numpy(warmup, fill_color=args.fill_color, back_color=args.back_color)
+
+    for version in args.versions:
+        for box_size in args.box_sizes:
+            qr = build_qr(version, box_size)
+            pil_time, pil_img = best_time(
+                lambda: qr.make_image(fill_color=args.fill_color, back_color=args.back_color),
+                args.repeat
+            )
+            numpy_time, numpy_img = best_time(
+                lambda: render_square_numpy(qr, fill_color=args.fill_color, back_color=args.back_color),
+                args.repeat
+            )
+            pil_img = pil_img.get_image()
+            identical = (pil_img.mode == numpy_img.mode and pil_img.size == numpy_img.size
+                         and pil_img.tobytes() == numpy_img.tobytes())
+            table.add_row(
+                str(version),
+                str(box_size),
+                f"{pil_img.size[0]} px",
+                f"{pil_time * 1000:.1f}",
+                f"{numpy_time * 1000:.1f}",
+                f"{pil_time / numpy_time:.1f}x",
+                "✅" if identical else "[red]❌[/red]"
+            )
+
+    console.print(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "qrcode[pil]==7.4.2",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ qr.py 起動時間ベンチマーク
+python -X importtime で qr.py の各実行パスの import 時間を計測し、予算を超えたら失敗します
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+QR_SCRIPT = Path(__file__).resolve().parent.parent / 'qr.py'
+
+# (名前, qr.py の引数, import 時間の予算 ms)。{out} は一時ディレクトリ内の出力ファイル
+SCENARIOS = [
+    ('help', ['--help'], 40),
+    ('square --quiet', ['Hello World', '{out}/square.png', '--quiet'], 200),
+    ('stdout png', ['Hello World', '-'], 200),
+    ('square (rich)', ['Hello World', '{out}/rich.png'], 350),
+]
+
+def parse_importtime(stderr):
+    """-X importtime の出力から (合計 self 時間 µs, {モジュール名: 累積 µs}) を返す"""
+    total = 0
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        cumulative[name.strip()] = int(cumulative_us)
+    return total, cumulative
+
+def measure(args, repeat):
+    """コマンドを repeat 回実行し、(import 時間 ms の中央値, 実行時間 ms の中央値, 最後の累積時間) を返す"""
+    import_times = []
+    wall_times = []
+    cumulative = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        wall_times.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} が失敗しました (exit {result.returncode})")
+        total, cumulative = parse_importtime(result.stderr)
+        import_times.append(total / 1000)
+    return statistics.median(import_times), statistics.median(wall_times), cumulative
+
+def main():
+    parser = argparse.ArgumentParser(description="qr.py の起動時間（import 時間）ベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5, help='各シナリオの試行回数（中央値を採用）')
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='全シナリオの予算に掛ける倍率（遅いマシン向け）')
+    parser.add_argument('--top', type=int, default=5, help='表示する重いモジュールの数')
+    args = parser.parse_args()
+
+    # インタプリタ自体の起動（site など）の分を差し引くための基準値
+    baseline_import, baseline_wall, _ = measure(['-c', 'pass'], args.repeat)
+    print(f"baseline: import {baseline_import:.1f} ms, wall {baseline_wall:.1f} ms")
+
+    failures = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name, scenario_args, budget_ms in SCENARIOS:
+            qr_args = [str(QR_SCRIPT)] + [arg.format(out=out_dir) for arg in scenario_args]
+            import_ms, wall_ms, cumulative = measure(qr_args, args.repeat)
+            import_ms -= baseline_import
+            wall_ms -= baseline_wall
+            budget_ms *= args.budget_scale
+            status = 'OK' if import_ms <= budget_ms else 'FAIL'
+            print(f"{status:4} {name:16} import {import_ms:7.1f} ms (budget {budget_ms:.0f} ms)"
+                  f"  wall +{wall_ms:.1f} ms")
+            top_level = {mod: us for mod, us in cumulative.items() if '.' not in mod}
+            heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+            print('       ' + ', '.join(f"{mod} {us / 1000:.1f}ms" for mod, us in heaviest))
+            if status == 'FAIL':
+                failures.append(name)
+
+    if failures:
+        print(f"予算超過: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
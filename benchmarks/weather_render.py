@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "requests==2.31.0",
+#   "rich==13.7.1",
+# ]
+# ///
+"""
+⏱️ 天気の一覧表示ベンチマーク
+以前の処理（説明文の部分一致によるアイコン検索・呼び出しごとの方位リスト・マークアップ付きの行）と、
+condition ID の表引き・モジュールレベルの表・Text のセルを使う現在の weather.py を比較します
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+import weather
+from stub_server import CITIES, synthetic_cities, weather_for
+
+console = Console()
+
+def old_icon(description):
+    """以前の get_weather_icon(): 小文字化して WEATHER_ICONS を先頭から部分一致で探す"""
+    description = description.lower()
+    for key, icon in weather.WEATHER_ICONS.items():
+        if key in description:
+            return icon
+    return '🌍'
+
+def old_direction(degrees):
+    """以前の方位名: 呼び出しごとに16方位のリストを作る"""
+    directions = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                  'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+    return directions[int((degrees + 11.25) / 22.5) % 16]
+
+def old_color(temp):
+    if temp >= 30:
+        return "red"
+    elif temp >= 20:
+        return "yellow"
+    elif temp >= 10:
+        return "green"
+    return "blue"
+
+def old_table(results):
+    """以前の format_weather_table(): マークアップ付きの文字列で行を作る"""
+    table = Table(title=f"🌍 Weather in {len(results)} cities", box=box.ROUNDED, header_style="bold cyan")
+    table.add_column("City", style="bold white")
+    table.add_column("Condition")
+    for name in ("Temp", "Feels like", "Humidity", "Wind", "Pressure"):
+        table.add_column(name, justify="right")
+    for _, data, _ in results:
+        main = data['main']
+        condition = data['weather'][0]
+        wind = data.get('wind', {})
+        temp_color = old_color(main['temp'])
+        wind_text = f"{wind.get('speed', 0):.1f} m/s"
+        if wind.get('deg') is not None:
+            wind_text += f" {old_direction(wind['deg'])}"
+        table.add_row(
+            f"{data['name']}, {data['sys'].get('country', '')}",
+            f"{old_icon(condition['description'])} {condition['description'].title()}",
+            f"[{temp_color}]{main['temp']:.1f}°C[/{temp_color}]",
+            f"{main['feels_like']:.1f}°C",
+            f"{main['humidity']}%",
+            wind_text,
+            f"{main['pressure']} hPa"
+        )
+    return table
+
+def make_results(count):
+    cities = (CITIES + synthetic_cities(count))[:count]
+    return [(city['name'], weather_for(city, 'metric'), None) for city in cities]
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def render(table):
+    Console(file=io.StringIO(), width=120, force_terminal=True, color_system='truecolor').print(table)
+
+def main():
+    parser = argparse.ArgumentParser(description="アイコン・方位の表引きと一覧表の描画のベンチマーク")
+    parser.add_argument('--cities', type=int, nargs='+', default=[100, 1000, 3000], help='都市数')
+    parser.add_argument('--repeat', type=int, default=3, help='試行回数（最速値を採用）')
+    args = parser.parse_args()
+
+    results = make_results(max(args.cities))
+    conditions = [data['weather'][0] for _, data, _ in results]
+    degrees = [data['wind']['deg'] for _, data, _ in results]
+    rounds = max(1, 200_000 // len(conditions))
+
+    lookups = Table(title="⏱️ 表引き（1回あたり ns）", caption=f"{len(conditions) * rounds:,} 回の平均",
+                    box=box.ROUNDED)
+    lookups.add_column("処理")
+    lookups.add_column("以前", justify="right")
+    lookups.add_column("現在", justify="right")
+    lookups.add_column("高速化", justify="right", style="bold green")
+    for label, old, new in (
+        ("アイコン",
+         lambda: [old_icon(c['description']) for _ in range(rounds) for c in conditions],
+         lambda: [weather.get_weather_icon(c['description'], c['id']) for _ in range(rounds) for c in conditions]),
+        ("風向き",
+         lambda: [old_direction(d) for _ in range(rounds) for d in degrees],
+         lambda: [weather.wind_direction_name(d) for _ in range(rounds) for d in degrees]),
+    ):
+        old_time, new_time = best_time(old, args.repeat), best_time(new, args.repeat)
+        calls = len(conditions) * rounds
+        lookups.add_row(label, f"{old_time / calls * 1e9:.0f}", f"{new_time / calls * 1e9:.0f}",
+                        f"{old_time / new_time:.1f}x")
+    console.print(lookups)
+
+    tables = Table(title="⏱️ 一覧表の作成と描画（ms）", box=box.ROUNDED)
+    tables.add_column("都市数", justify="right")
+    tables.add_column("以前", justify="right")
+    tables.add_column("現在", justify="right")
+    tables.add_column("短縮", justify="right", style="bold green")
+    tables.add_column("パネル（1都市ずつ）", justify="right")
+    for count in args.cities:
+        subset = results[:count]
+        old_time = best_time(lambda: render(old_table(subset)), args.repeat)
+        new_time = best_time(lambda: render(weather.format_weather_table(subset)), args.repeat)
+        panels_time = best_time(
+            lambda: [render(weather.format_weather_display(data)) for _, data, _ in subset], 1
+        )
+        tables.add_row(str(count), f"{old_time * 1000:.0f}", f"{new_time * 1000:.0f}",
+                       f"{(1 - new_time / old_time) * 100:.0f}%", f"{panels_time * 1000:.0f}")
+    console.print(tables)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = []
+# ///
+"""
+🎞️ HTTP 応答の記録と再生
+weather.py と news.py が受け取った HTTP 応答をディレクトリに記録し、ネットワークなしで再生するための部品です
+（標準ライブラリのみ。stub_server.py --replay DIR からも使います）
+
+    python weather.py --record fixtures/ Tokyo London      # 記録
+    python news.py --record fixtures/
+    python weather.py --replay fixtures/ Tokyo London      # ディスクから再生
+    python stub_server.py --replay fixtures/ --latency 50 --error-rate 0.1   # スタブから再生
+    python news.py --replay http://127.0.0.1:8766
+    python http_fixtures.py fixtures/                      # 記録の一覧
+
+ディレクトリの構成:
+    manifest.jsonl     1行1件の記録（キー・ステータス・ヘッダー・本文のファイル名）。同じキーは後の行が優先
+    bodies/<sha1>.bin  応答の本文（内容のハッシュで保存するので同じ本文は1つだけ）
+
+天気の /group（複数の都市 ID をまとめた問い合わせ）は ID の順序によらず同じキーになります。
+記録と異なる組み合わせの /group は、記録したすべての /group 応答から都市ごとの項目を集めて応答を
+組み立てます（要求したすべての ID が記録にあるときだけ。1つでも欠けていれば記録なしとして扱います）。
+"""
+
+import argparse
+import email.message
+import hashlib
+import io
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+import urllib.response
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# キーに含めないクエリパラメーター（API キーを記録に残さない）
+SECRET_PARAMS = {'appid', 'api_key', 'apikey', 'key', 'token'}
+# 記録するレスポンスヘッダー（Content-Length や Content-Encoding は再生時に付け直す）
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'retry-after')
+
+def sorted_ids(value: str) -> str:
+    """数値 ID のカンマ区切り（/group の id=）なら数値順に並べ替える。それ以外はそのまま"""
+    parts = value.split(',')
+    if len(parts) < 2 or not all(part.isdigit() for part in parts):
+        return value
+    return ','.join(sorted(parts, key=int))
+
+def normalized_query(query: str) -> str:
+    """API キーを除き、並べ替えたクエリ文字列（/group の id=1,2,3 の並びも揃える）"""
+    params = sorted((name, sorted_ids(value) if name == 'id' else value)
+                    for name, value in parse_qsl(query, keep_blank_values=True)
+                    if name.lower() not in SECRET_PARAMS)
+    return '?' + urlencode(params) if params else ''
+
+def split_group_query(query: str):
+    """正規化したクエリを (都市 ID のリスト, id 以外のクエリ) に分ける"""
+    params = parse_qsl(query.lstrip('?'), keep_blank_values=True)
+    ids = [part for name, value in params if name == 'id' for part in value.split(',') if part]
+    return ids, urlencode([(name, value) for name, value in params if name != 'id'])
+
+def fixture_key(url: str) -> str:
+    """URL から記録のキー（ホスト + パス + 正規化したクエリ）を作る。スキームとポートは含めない"""
+    parts = urlsplit(url)
+    return f"{parts.hostname or ''}{parts.path or '/'}{normalized_query(parts.query)}"
+
+@dataclass
+class Fixture:
+    """記録した1件の応答"""
+    key: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def reason(self) -> str:
+        try:
+            return HTTPStatus(self.status).phrase
+        except ValueError:
+            return ''
+
+    def not_modified(self, request_headers) -> bool:
+        """条件付きリクエスト（If-None-Match / If-Modified-Since）が記録した検証子と一致するか
+
+        request_headers は小文字のヘッダー名で引けるもの（小文字キーの dict や http.server のヘッダー）
+        """
+        etag = self.headers.get('etag')
+        last_modified = self.headers.get('last-modified')
+        if etag and request_headers.get('if-none-match') == etag:
+            return True
+        return bool(last_modified) and request_headers.get('if-modified-since') == last_modified
+
+class FixtureStore:
+    """manifest.jsonl と bodies/ からなる記録のディレクトリ（スレッドセーフ）"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory).expanduser()
+        self.manifest = self.directory / 'manifest.jsonl'
+        self.entries: Dict[str, dict] = {}
+        # ホストなしのパスからも引けるようにする（--api-base でスタブに向けた weather.py 用）
+        self.by_path: Dict[str, dict] = {}
+        # /group 応答の都市ごとの項目（必要になったときに作る）
+        self._group_items: Optional[Dict[tuple, dict]] = None
+        self.lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        if self.manifest.exists():
+            with open(self.manifest, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _index(self, entry):
+        self.entries[entry['key']] = entry
+        host, _, path = entry['key'].partition('/')
+        self.by_path['/' + path] = entry
+        self._group_items = None
+
+    def group_items(self) -> Dict[tuple, dict]:
+        """記録した /group 応答の項目を (ホストなしのパス, id 以外のクエリ, 都市 ID) で引く辞書"""
+        with self.lock:
+            if self._group_items is None:
+                items = {}
+                for entry in self.entries.values():
+                    path, _, query = entry['key'].partition('/')[2].partition('?')
+                    if entry['status'] != 200 or not path.endswith('/group'):
+                        continue
+                    _, rest = split_group_query(query)
+                    try:
+                        body = json.loads((self.directory / entry['body']).read_bytes())
+                        for item in body['list']:
+                            items['/' + path, rest, str(item['id'])] = item
+                    except (OSError, ValueError, KeyError, TypeError):
+                        continue
+                self._group_items = items
+            return self._group_items
+
+    def combine_group(self, paths, query: str) -> Optional[Fixture]:
+        """記録したキーにない /group の問い合わせに、記録した /group 応答の項目を集めて答える"""
+        ids, rest = split_group_query(query)
+        if not ids or not any(path.endswith('/group') for path in paths):
+            return None
+        items = self.group_items()
+        for path in paths:
+            found = [items.get((path, rest, city_id)) for city_id in ids]
+            if all(found):
+                body = json.dumps({'cnt': len(found), 'list': found}, ensure_ascii=False).encode('utf-8')
+                return Fixture(path.lstrip('/') + query, 200, {'content-type': 'application/json; charset=utf-8'}, body)
+        return None
+
+    def record(self, url: str, status: int, headers, body: bytes):
+        """1件の応答を記録する（同じキーの記録は上書き）"""
+        digest = hashlib.sha1(body).hexdigest()
+        entry = {
+            'key': fixture_key(url),
+            'status': status,
+            'headers': {name.lower(): value for name, value in headers.items() if name.lower() in KEPT_HEADERS},
+            'body': f'bodies/{digest}.bin',
+            'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        with self.lock:
+            body_path = self.directory / entry['body']
+            if not body_path.exists():
+                body_path.parent.mkdir(parents=True, exist_ok=True)
+                body_path.write_bytes(body)
+            with open(self.manifest, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._index(entry)
+            self.recorded += 1
+
+    def find(self, target: str) -> Optional[Fixture]:
+        """URL、またはスタブへのパス（/ホスト/パス?クエリ・/パス?クエリ）に対応する記録を返す"""
+        parts = urlsplit(target)
+        query = normalized_query(parts.query)
+        if parts.scheme:
+            entry = self.entries.get(fixture_key(target)) or self.by_path.get(parts.path + query)
+            paths = [parts.path]
+        else:
+            entry = self.entries.get(parts.path.lstrip('/') + query) or self.by_path.get(parts.path + query)
+            paths = [parts.path, '/' + parts.path.lstrip('/').partition('/')[2]]
+        if entry is not None:
+            body = (self.directory / entry['body']).read_bytes()
+            fixture = Fixture(entry['key'], entry['status'], dict(entry['headers']), body)
+        else:
+            fixture = self.combine_group(paths, query)
+        with self.lock:
+            if fixture is None:
+                self.missing += 1
+            else:
+                self.replayed += 1
+        return fixture
+
+    def record_urlopen(self, request, timeout=None):
+        """urllib.request.urlopen の代わりに使い、実際の応答を記録してから返す
+
+        本文は最後まで読んでから記録するので、記録中はストリーミング解析の途中打ち切りは効きません。
+        """
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            # 304 は前回の応答がないと再生できないので記録しない
+            if e.code != 304:
+                self.record(request.full_url, e.code, e.headers, body)
+            raise urllib.error.HTTPError(e.url, e.code, e.msg, e.headers, io.BytesIO(body)) from None
+        self.record(request.full_url, status, headers, body)
+        return replay_response(request.full_url, Fixture(fixture_key(request.full_url), status,
+                                                         dict(headers.items()), body))
+
+    def replay_urlopen(self, request, timeout=None):
+        """urllib.request.urlopen の代わりに使い、ネットワークに出ずに記録から応答を返す"""
+        fixture = self.find(request.full_url)
+        if fixture is None:
+            raise urllib.error.URLError(f'記録がありません: {fixture_key(request.full_url)}')
+        if fixture.not_modified({name.lower(): value for name, value in request.header_items()}):
+            fixture = Fixture(fixture.key, 304, fixture.headers, b'')
+        return replay_response(request.full_url, fixture)
+
+def replay_response(url: str, fixture: Fixture):
+    """記録を urlopen の戻り値と同じ形（エラーなら HTTPError）にする"""
+    headers = email.message.Message()
+    for name, value in fixture.headers.items():
+        headers[name] = value
+    if fixture.status >= 300:
+        raise urllib.error.HTTPError(url, fixture.status, fixture.reason, headers, io.BytesIO(fixture.body))
+    return urllib.response.addinfourl(io.BytesIO(fixture.body), headers, url, fixture.status)
+
+def stub_urlopen(base_url: str):
+    """リクエストを stub_server.py --replay の /ホスト/パス に向け直す urlopen を返す"""
+    base_url = base_url.rstrip('/')
+
+    def urlopen(request, timeout=None):
+        parts = urlsplit(request.full_url)
+        target = f"{base_url}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+        stub_request = urllib.request.Request(target, headers=dict(request.header_items()))
+        return urllib.request.urlopen(stub_request, timeout=timeout)
+
+    return urlopen
+
+def main():
+    parser = argparse.ArgumentParser(description="記録した HTTP 応答の一覧")
+    parser.add_argument('directory', help='--record で指定したディレクトリ')
+    args = parser.parse_args()
+
+    store = FixtureStore(args.directory)
+    if not store.entries:
+        print(f"{store.directory} に記録はありません", file=sys.stderr)
+        sys.exit(1)
+    for key, entry in sorted(store.entries.items()):
+        size = (store.directory / entry['body']).stat().st_size
+        print(f"{entry['status']}  {size:>9,} B  {entry['recorded_at']}  {key}")
+    print(f"{len(store)} 件", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
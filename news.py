@@ -10,99 +10,1067 @@
 Yahoo!ニュース、ITメディア、Yahoo!経済のRSSフィードから最新ニュースを美しく表示
 """
 
+import argparse
 import feedparser
+import hashlib
+import heapq
+import html
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
 import time
-from datetime import datetime
-from rich.console import Console
+import urllib.error
+import urllib.request
+import unicodedata
+import xml.etree.ElementTree as ET
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from rich.console import Console, Group
+from rich.live import Live
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
-from rich.progress import track
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn, TimeElapsedColumn
 from rich import box
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 console = Console()
 
-@dataclass
+@dataclass(slots=True)
 class NewsItem:
     title: str
     url: str
     source: str
-    published: Optional[str] = None
+    published: Optional[datetime] = None  # タイムゾーン付き（UTC）。表示用の文字列にするのは描画時
     summary: Optional[str] = None
 
+    def __post_init__(self):
+        # ソース名は数種類しかないので、全記事で同じ文字列オブジェクトを共有する
+        self.source = sys.intern(self.source)
+
+    def to_dict(self) -> dict:
+        """JSON に書ける辞書（published は ISO 8601 文字列）"""
+        record = asdict(self)
+        record['published'] = self.published.isoformat() if self.published else None
+        return record
+
+    @classmethod
+    def from_dict(cls, record: dict) -> 'NewsItem':
+        """to_dict() の逆変換"""
+        published = record.get('published')
+        return cls(
+            title=record['title'],
+            url=record['url'],
+            source=record['source'],
+            published=datetime.fromisoformat(published) if published else None,
+            summary=record.get('summary')
+        )
+
+def published_timestamp(item: NewsItem) -> float:
+    """並べ替え・絞り込み用の公開時刻（エポック秒）。公開時刻のない記事は最も古い扱い"""
+    return item.published.timestamp() if item.published else float('-inf')
+
+def format_published(published: Optional[datetime]) -> str:
+    """表示用の公開時刻（ローカル時刻。今年でなければ年月日）"""
+    if published is None:
+        return ''
+    local = published.astimezone()
+    if local.year != datetime.now().year:
+        return local.strftime('%Y/%m/%d')
+    return local.strftime('%m/%d %H:%M')
+
+_RELATIVE_TIME = re.compile(r'(\d+(?:\.\d+)?)\s*([mhdw])')
+_RELATIVE_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+def parse_since(value: str) -> datetime:
+    """'30m' / '2h' / '3d' / '1w'（今からさかのぼる時間）または ISO 8601 の日時を tz 付きの datetime にする
+
+    タイムゾーンのない日時はローカル時刻として扱います。
+    """
+    match = _RELATIVE_TIME.fullmatch(value.strip().lower())
+    if match:
+        seconds = float(match.group(1)) * _RELATIVE_UNITS[match.group(2)]
+        return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+    when = datetime.fromisoformat(value)
+    return when if when.tzinfo is not None else when.astimezone()
+
+def filter_by_time(items: Iterable[NewsItem], since: Optional[datetime] = None,
+                   until: Optional[datetime] = None) -> List[NewsItem]:
+    """公開時刻が since 以降・until より前の記事（公開時刻のない記事は除く）"""
+    start = since.timestamp() if since else float('-inf')
+    end = until.timestamp() if until else float('inf')
+    return [item for item in items if item.published and start <= item.published.timestamp() < end]
+
+class NewsStore:
+    """記事を列ごとのリストで持つストア（長時間の収集・分析向けのエクスポート用）
+
+    記事ごとのオブジェクトを作らず、タイトルなどは列のリスト、ソース名はソース一覧への
+    番号（array('H')）、公開時刻はエポック秒（array('d')、不明は NaN）で持ちます。
+    JSONL / Arrow IPC / Parquet にまとめて書き出せます。
+    Arrow / Parquet には pyarrow が必要です。
+    """
+
+    COLUMNS = ('title', 'url', 'source', 'published', 'summary')
+
+    def __init__(self, items: Iterable[NewsItem] = ()):
+        self.titles: List[str] = []
+        self.urls: List[str] = []
+        self.published = array('d')
+        self.summaries: List[Optional[str]] = []
+        self.source_codes = array('H')
+        self.sources: List[str] = []
+        self._source_index: Dict[str, int] = {}
+        self.extend(items)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getitem__(self, index: int) -> NewsItem:
+        return NewsItem(
+            title=self.titles[index],
+            url=self.urls[index],
+            source=self.sources[self.source_codes[index]],
+            published=self._published_at(index),
+            summary=self.summaries[index]
+        )
+
+    def _published_at(self, index: int) -> Optional[datetime]:
+        timestamp = self.published[index]
+        return None if timestamp != timestamp else datetime.fromtimestamp(timestamp, timezone.utc)
+
+    def __iter__(self) -> Iterator[NewsItem]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, item: NewsItem):
+        code = self._source_index.get(item.source)
+        if code is None:
+            code = self._source_index[item.source] = len(self.sources)
+            self.sources.append(sys.intern(item.source))
+        self.titles.append(item.title)
+        self.urls.append(item.url)
+        self.source_codes.append(code)
+        self.published.append(item.published.timestamp() if item.published else float('nan'))
+        self.summaries.append(item.summary)
+
+    def extend(self, items: Iterable[NewsItem]):
+        for item in items:
+            self.append(item)
+
+    def window(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[NewsItem]:
+        """公開時刻が since 以降・until より前の記事（前回のポーリング以降の記事なども）"""
+        start = since.timestamp() if since else float('-inf')
+        end = until.timestamp() if until else float('inf')
+        # NaN（公開時刻不明）は比較がすべて偽になるので自然に除かれる
+        return [self[index] for index, timestamp in enumerate(self.published) if start <= timestamp < end]
+
+    def columns(self) -> Dict[str, list]:
+        """列名 -> 値のリスト（source は文字列に、published は datetime に戻す）"""
+        sources = self.sources
+        return {
+            'title': self.titles,
+            'url': self.urls,
+            'source': [sources[code] for code in self.source_codes],
+            'published': [self._published_at(index) for index in range(len(self))],
+            'summary': self.summaries,
+        }
+
+    def write_jsonl(self, path):
+        """1行1記事の JSON Lines で書き出す"""
+        sources = self.sources
+        with open(path, 'w', encoding='utf-8') as f:
+            for index, row in enumerate(zip(self.titles, self.urls, self.source_codes, self.summaries)):
+                title, url, code, summary = row
+                published = self._published_at(index)
+                record = {'title': title, 'url': url, 'source': sources[code],
+                          'published': published.isoformat() if published else None, 'summary': summary}
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+
+    def to_arrow(self):
+        """pyarrow.Table に変換（source は辞書型の列）"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("Arrow / Parquet への書き出しには pyarrow が必要です（uv run --with pyarrow news.py ...）")
+        source = pa.DictionaryArray.from_arrays(
+            pa.array(self.source_codes, type=pa.uint16()), pa.array(self.sources, type=pa.string())
+        )
+        return pa.table({
+            'title': pa.array(self.titles, type=pa.string()),
+            'url': pa.array(self.urls, type=pa.string()),
+            'source': source,
+            'published': pa.array(
+                [None if timestamp != timestamp else int(timestamp * 1_000_000) for timestamp in self.published],
+                type=pa.timestamp('us', tz='UTC')
+            ),
+            'summary': pa.array(self.summaries, type=pa.string()),
+        })
+
+    def write_arrow(self, path):
+        """Arrow IPC（Feather v2）ファイルで書き出す"""
+        import pyarrow.feather as feather
+        feather.write_feather(self.to_arrow(), str(path))
+
+    def write_parquet(self, path):
+        """Parquet ファイルで書き出す"""
+        table = self.to_arrow()
+        import pyarrow.parquet as pq
+        pq.write_table(table, str(path))
+
+    def export(self, path):
+        """拡張子（.jsonl / .arrow / .feather / .parquet）に応じた形式で書き出す"""
+        suffix = Path(path).suffix.lower()
+        if suffix in ('.jsonl', '.ndjson'):
+            self.write_jsonl(path)
+        elif suffix in ('.arrow', '.feather'):
+            self.write_arrow(path)
+        elif suffix == '.parquet':
+            self.write_parquet(path)
+        else:
+            raise ValueError(f"対応していない形式です: {path}（.jsonl / .arrow / .feather / .parquet）")
+
+USER_AGENT = 'python-tools-demo news.py (+https://github.com/toiee-lab/python-tools-demo)'
+
+class HostRateLimiter:
+    """同じホストへのアクセス間隔を min_interval 秒以上空ける（別ホストは待たない）"""
+
+    def __init__(self, min_interval: float = 0.5):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        """url のホストに割り当てた時刻まで待つ"""
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+DEFAULT_FEED_CACHE = Path.home() / '.cache' / 'python-tools-demo' / 'news_feeds.json'
+
+class FeedCache:
+    """フィードごとの ETag / Last-Modified と解析済みの記事を保存するキャッシュ
+
+    次回の取得では条件付き GET（If-None-Match / If-Modified-Since）を送り、
+    304 Not Modified なら保存済みの記事をそのまま使います。
+    保存した記事は取得時の上限件数（limit）で打ち切られているので、それより多く求められたときは
+    条件付き GET をせずに取り直します。
+    記事の保存形式が変わったときは VERSION を上げ、古いキャッシュは読み捨てます。
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Path = DEFAULT_FEED_CACHE):
+        self.path = Path(path)
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self._feeds = data.get('feeds', {}) if data.get('version') == self.VERSION else {}
+
+    def validators(self, rss_url: str, limit: int) -> Dict[str, str]:
+        """条件付き GET 用のリクエストヘッダー（保存した記事が limit 件に足りない取得なら空）"""
+        entry = self._feeds.get(rss_url, {})
+        headers = {}
+        if (entry.get('limit') or 0) < limit:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('modified'):
+            headers['If-Modified-Since'] = entry['modified']
+        return headers
+
+    def items(self, rss_url: str, limit: int) -> Optional[List[NewsItem]]:
+        """304 のときに使う保存済みの記事を先頭から limit 件（なければ None）"""
+        entry = self._feeds.get(rss_url)
+        if entry is None or (entry.get('limit') or 0) < limit:
+            return None
+        with self._lock:
+            self.not_modified += 1
+        return [NewsItem.from_dict(item) for item in entry['items'][:limit]]
+
+    def put(self, rss_url: str, etag: Optional[str], modified: Optional[str], items: List[NewsItem], limit: int):
+        """取得した記事を検証用ヘッダー・上限件数と一緒に保存（どちらのヘッダーもなければ保存しない）"""
+        if not etag and not modified:
+            return
+        with self._lock:
+            self._feeds[rss_url] = {
+                'etag': etag,
+                'modified': modified,
+                'limit': limit,
+                'items': [item.to_dict() for item in items],
+            }
+
+    def save(self):
+        """キャッシュファイルへ書き出す（一時ファイル経由で置き換え）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'feeds': self._feeds}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+DEFAULT_DEDUP_INDEX = Path.home() / '.cache' / 'python-tools-demo' / 'news_dedup.json'
+
+# URL の正規化で取り除くクエリパラメータ（utm_* はプレフィックスで判定）
+TRACKING_PARAMS = frozenset({'fr', 'source', 'ref', 'rss', 'from', 'cmpid'})
+_TITLE_NOISE = re.compile(r'[\W_]+')
+
+def normalize_url(url: str) -> str:
+    """同じ記事の URL を同じ文字列にそろえる（スキーム・ホストの小文字化、フラグメントとトラッキング用パラメータの除去）"""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.startswith('utm_') and name.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https' if parts.scheme == 'http' else parts.scheme.lower(),
+                       (parts.hostname or '') + (f':{parts.port}' if parts.port else ''),
+                       path, urlencode(query), ''))
+
+def title_simhash(title: str) -> int:
+    """タイトルの 64bit SimHash（NFKC 正規化・記号除去後の文字 bigram から計算）
+
+    1〜2文字違いの見出しはハミング距離が小さくなるため、配信元ごとの表記ゆれを吸収できます。
+    """
+    text = _TITLE_NOISE.sub('', unicodedata.normalize('NFKC', title).lower())
+    shingles = {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+    # 各 bigram のハッシュを 64 桁の 0/1 文字列にし、桁ごとに 1 が過半数なら 1
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for shingle in shingles
+    ]
+    half = len(bits) / 2
+    return int(''.join('1' if column.count('1') > half else '0' for column in zip(*bits)), 2)
+
+class DedupIndex:
+    """フィードをまたいだ重複記事のインデックス
+
+    正規化した URL の完全一致と、タイトルの SimHash の近さ（ハミング距離 max_distance 以下）で
+    同じ記事を見つけます。SimHash は max_distance + 1 個のバンドに分けて索引しておき、
+    距離 max_distance 以下なら必ずどれかのバンドが一致するので、候補は各バンドのバケットを
+    引くだけで見つかります（1件あたり O(1)）。
+
+    記事を最初に出したフィード（ソース名と URL）がその記事の持ち主で、持ち主からの記事は
+    次回以降も重複扱いしません。max_age 秒見かけなかった記事と max_entries を超えた古い記事は忘れます。
+    """
+
+    def __init__(self, path: Path = DEFAULT_DEDUP_INDEX, max_age: float = 3 * 24 * 3600,
+                 max_entries: int = 5000, max_distance: int = 6):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._band_count = max_distance + 1
+        self._band_bits = 64 // self._band_count
+        self.duplicates = 0
+        # URL キー -> [ソース名, SimHash, 最終確認時刻]（最終確認が古い順）
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._bands: Dict[Tuple[int, int], set] = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for key, source, fingerprint, last_seen in json.load(f):
+                    self._add(key, source, fingerprint, last_seen)
+        except (OSError, ValueError):
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, fingerprint: int):
+        # 最後のバンドは余りのビットも含める
+        width = self._band_bits
+        keys = [(band, fingerprint >> (band * width) & ((1 << width) - 1)) for band in range(self._band_count - 1)]
+        keys.append((self._band_count - 1, fingerprint >> ((self._band_count - 1) * width)))
+        return keys
+
+    def _add(self, key: str, source: str, fingerprint: int, last_seen: float):
+        self._entries[key] = [source, fingerprint, last_seen]
+        for band_key in self._band_keys(fingerprint):
+            self._bands.setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: str):
+        _, fingerprint, _ = self._entries.pop(key)
+        for band_key in self._band_keys(fingerprint):
+            bucket = self._bands.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[band_key]
+
+    def _find(self, key: str, fingerprint: int) -> Optional[str]:
+        if key in self._entries:
+            return key
+        for band_key in self._band_keys(fingerprint):
+            for candidate in self._bands.get(band_key, ()):
+                if (self._entries[candidate][1] ^ fingerprint).bit_count() <= self.max_distance:
+                    return candidate
+        return None
+
+    def evict(self, now: Optional[float] = None):
+        """max_age を過ぎた記事と、max_entries を超えた分を古い順に削除"""
+        now = time.time() if now is None else now
+        while self._entries:
+            key, (_, _, last_seen) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - last_seen <= self.max_age:
+                break
+            self._remove(key)
+
+    def is_duplicate(self, item: NewsItem, now: Optional[float] = None) -> bool:
+        """別のフィード（または別の URL）で既に出た記事なら True。初めての記事は登録して False"""
+        now = time.time() if now is None else now
+        key = normalize_url(item.url) or f'title:{item.title}'
+        fingerprint = title_simhash(item.title)
+        match = self._find(key, fingerprint)
+        if match is None:
+            self._add(key, item.source, fingerprint, now)
+            self.evict(now)
+            return False
+        entry = self._entries[match]
+        entry[2] = now
+        self._entries.move_to_end(match)
+        if match == key and entry[0] == item.source:
+            return False
+        self.duplicates += 1
+        return True
+
+    def save(self):
+        """インデックスファイルへ書き出す（一時ファイル経由で置き換え）"""
+        self.evict()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([[key, *entry] for key, entry in self._entries.items()], f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+DEFAULT_MAX_ENTRIES = 15
+STREAM_CHUNK_SIZE = 16 * 1024
+SUMMARY_LENGTH = 100
+
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+# 実体参照がウィンドウの境目で切れても、先頭 max_chars 文字に影響しないように取る余白
+_SUMMARY_MARGIN = 32
+
+def extract_summary(html_text: str, max_chars: int = SUMMARY_LENGTH) -> str:
+    """HTML の本文から表示用のサマリーを作る（タグ除去・実体参照のデコード・max_chars 文字で省略）
+
+    本文全体ではなく先頭のウィンドウだけを処理し、表示に足りる文字数が集まらなければ
+    ウィンドウを倍にして処理し直します。長い本文の大部分は読まずに済みます。
+    """
+    window = max_chars * 4
+    while True:
+        chunk = html_text[:window]
+        if window < len(html_text):
+            # ウィンドウの境目で切れたタグは次回に回す
+            lt = chunk.rfind('<')
+            if lt > chunk.rfind('>'):
+                chunk = chunk[:lt]
+        text = _HTML_TAG.sub('', chunk)
+        # 実体参照のデコードで文字数は減るだけなので、デコード前に足りなければデコードせずに広げる
+        if window >= len(html_text) or len(text) > max_chars + _SUMMARY_MARGIN:
+            text = html.unescape(text).strip()
+            if window >= len(html_text) or len(text) > max_chars + _SUMMARY_MARGIN:
+                break
+        window *= 2
+    return text[:max_chars] + '...' if len(text) > max_chars else text
+
+def make_news_item(source_name: str, title: str, url: str, published: Optional[datetime],
+                   summary: str) -> Optional[NewsItem]:
+    """取り出した値から NewsItem を作る（タイトルがなければ None）。published はタイムゾーン付き"""
+    title = title.strip()
+    if not title:
+        return None
+    
+    return NewsItem(title=title, url=url, source=source_name, published=published,
+                    summary=extract_summary(summary) if summary else summary)
+
+def items_from_feedparser(feed, source_name: str, limit: int) -> List[NewsItem]:
+    """feedparser の解析結果から NewsItem を作る（ストリーム解析できないフィード用）"""
+    news_items = []
+    for entry in feed.entries[:limit]:
+        published = None
+        if entry.get('published_parsed'):
+            try:
+                # published_parsed は UTC の time.struct_time
+                published = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
+            except (TypeError, ValueError):
+                pass
+        item = make_news_item(source_name, entry.get('title', ''), entry.get('link', ''),
+                              published, entry.get('summary', ''))
+        if item is not None:
+            news_items.append(item)
+    return news_items
+
+# RSS 2.0 / RSS 1.0 (RDF) / Atom の要素名
+_ATOM = '{http://www.w3.org/2005/Atom}'
+_RSS1 = '{http://purl.org/rss/1.0/}'
+_DC = '{http://purl.org/dc/elements/1.1/}'
+_ITEM_TAGS = frozenset({'item', _RSS1 + 'item', _ATOM + 'entry'})
+_TITLE_TAGS = ('title', _RSS1 + 'title', _ATOM + 'title')
+_SUMMARY_TAGS = ('description', _RSS1 + 'description', _ATOM + 'summary')
+# 概要がない記事は feedparser と同じく本文（Atom の content・RSS の content:encoded）から作る
+_CONTENT_TAGS = (_ATOM + 'content', '{http://purl.org/rss/1.0/modules/content/}encoded')
+_DATE_TAGS = ('pubDate', _DC + 'date', _ATOM + 'published', _ATOM + 'updated')
+
+def _parse_feed_date(tag: str, text: str) -> Optional[datetime]:
+    """pubDate（RFC 822）と W3C-DTF の日時を UTC の datetime に変換（タイムゾーンがなければ UTC とみなす）"""
+    try:
+        if tag == 'pubDate':
+            value = parsedate_to_datetime(text)
+        else:
+            value = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _element_link(elem) -> str:
+    """記事の URL（RSS の link / Atom の rel=alternate、なければパーマリンクの guid）"""
+    for child in elem:
+        if child.tag in ('link', _RSS1 + 'link') and child.text:
+            return child.text.strip()
+        if child.tag == _ATOM + 'link' and child.get('rel', 'alternate') == 'alternate':
+            return child.get('href', '')
+    guid = elem.find('guid')
+    if guid is not None and guid.text and guid.get('isPermaLink', 'true') == 'true':
+        return guid.text.strip()
+    return ''
+
+def iter_feed_items(chunks: Iterable[bytes], source_name: str,
+                    limit: int = DEFAULT_MAX_ENTRIES) -> Iterator[NewsItem]:
+    """バイト列のチャンクを少しずつ XML パーサーに渡し、記事を読み終えたものから NewsItem を返す
+
+    limit 件に達したら残りのチャンクは読みません。処理済みの要素は clear() するので、
+    メモリ使用量はフィード全体の大きさではなく記事数に比例します。
+    XML として解析できない場合は xml.etree.ElementTree.ParseError を、
+    expat が扱えない文字コードの場合は ValueError を送出します。
+    """
+    if limit <= 0:
+        return
+    parser = ET.XMLPullParser(events=('end',))
+    count = 0
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag not in _ITEM_TAGS:
+                continue
+            title = summary = content = ''
+            published = None
+            for child in elem:
+                if child.tag in _TITLE_TAGS and not title:
+                    title = child.text or ''
+                elif child.tag in _SUMMARY_TAGS and not summary:
+                    summary = child.text or ''
+                elif child.tag in _CONTENT_TAGS and not content:
+                    # type="xhtml" の Atom content は子要素になっているのでテキストだけをつなぐ
+                    content = ''.join(child.itertext())
+                elif child.tag in _DATE_TAGS and published is None and child.text:
+                    published = _parse_feed_date(child.tag, child.text.strip())
+            item = make_news_item(source_name, title, _element_link(elem), published, summary or content)
+            elem.clear()
+            if item is None:
+                continue
+            yield item
+            count += 1
+            if count >= limit:
+                return
+    parser.close()
+
+DEFAULT_SEARCH_INDEX = Path.home() / '.cache' / 'python-tools-demo' / 'news_search.sqlite3'
+
+# 日本語（ひらがな・カタカナ・漢字）の連続部分と、それ以外の英数字の単語
+_CJK_CHARS = '\u3005\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_SEARCH_RUN = re.compile(f'[{_CJK_CHARS}]+|[^\\W_{_CJK_CHARS}]+')
+_CJK_RUN = re.compile(f'[{_CJK_CHARS}]+')
+
+def search_runs(text: str) -> List[List[str]]:
+    """検索用のトークン列を、日本語の連続部分・英数字の単語ごとに返す
+
+    日本語は分かち書きせずに文字 bigram（東京都 → 東京 京都）にし、英数字は単語のまま（小文字化）にします。
+    bigram の並びをフレーズとして検索すると、元の文字列の部分一致と同じ結果になります。
+    """
+    runs = []
+    for match in _SEARCH_RUN.finditer(unicodedata.normalize('NFKC', text).lower()):
+        run = match.group()
+        if _CJK_RUN.fullmatch(run) and len(run) > 1:
+            runs.append([run[i:i + 2] for i in range(len(run) - 1)])
+        else:
+            runs.append([run])
+    return runs
+
+class NewsIndex:
+    """取得した記事のタイトルとサマリーの全文検索インデックス（SQLite FTS5）
+
+    記事は URL ごとに1回だけ登録し（取得のたびに新しい記事だけを追加）、検索用のテキストは
+    search_runs() で bigram に分けてから FTS5 の contentless テーブルに入れます。
+    日本語1文字だけの検索語は bigram では探せないため、その部分は LIKE で絞り込みます。
+    """
+
+    def __init__(self, path: Path = DEFAULT_SEARCH_INDEX):
+        self.path = Path(path)
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS articles ('
+                'id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL, source TEXT NOT NULL, '
+                'published_at REAL, summary TEXT, fetched_at REAL NOT NULL)'
+            )
+            # 公開時刻を表示用の文字列（published TEXT）で持っていた以前のインデックスには列を足す
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(articles)')}
+            if 'published_at' not in columns:
+                self._conn.execute('ALTER TABLE articles ADD COLUMN published_at REAL')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS articles_published_at ON articles (published_at)')
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, summary, content='')"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def add(self, items: Iterable[NewsItem]) -> int:
+        """未登録の記事を追加し、追加した件数を返す
+
+        search() は登録の新しい順（rowid の降順）に返すので、フィードの並び（新しい順）のまま
+        登録すると1回の取得分が古い順に出てしまいます。公開時刻の古い順に並べ替えてから登録します
+        （公開時刻のない記事は最も古いものとして扱い、同じ時刻ならフィードで後ろの記事を先に登録）。
+        """
+        added = 0
+        now = time.time()
+        items = sorted(reversed(list(items)),
+                       key=lambda item: item.published.timestamp() if item.published else float('-inf'))
+        with self.conn:
+            for item in items:
+                row = self.conn.execute(
+                    'INSERT INTO articles (url, title, source, published_at, summary, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO NOTHING RETURNING id',
+                    (item.url or f'title:{item.title}', item.title, item.source,
+                     item.published.timestamp() if item.published else None, item.summary, now)
+                ).fetchone()
+                if row is None:
+                    continue
+                self.conn.execute(
+                    'INSERT INTO articles_fts (rowid, title, summary) VALUES (?, ?, ?)',
+                    (row[0],
+                     ' '.join(' '.join(run) for run in search_runs(item.title)),
+                     ' '.join(' '.join(run) for run in search_runs(item.summary or '')))
+                )
+                added += 1
+        return added
+
+    def search(self, query: str, limit: int = 20, source: Optional[str] = None,
+               rank: bool = False, since: Optional[datetime] = None) -> List[NewsItem]:
+        """query のすべての語を含む記事を、登録の新しい順（rank=True なら関連度 bm25 の高い順）に返す
+
+        新しい順なら FTS5 が rowid の降順に一致を返すので、limit 件見つかった時点で打ち切れます。
+        関連度順は一致したすべての記事のスコアを計算するため、よく出る語では遅くなります。
+        """
+        phrases = []
+        conditions = []
+        params: list = []
+        for run in search_runs(query):
+            if len(run) == 1 and len(run[0]) == 1 and _CJK_RUN.fullmatch(run[0]):
+                conditions.append("(a.title LIKE ? OR a.summary LIKE ?)")
+                params.extend([f'%{run[0]}%'] * 2)
+            else:
+                phrases.append('"' + ' '.join(run) + '"')
+        if source is not None:
+            conditions.append('a.source = ?')
+            params.append(source)
+        if since is not None:
+            conditions.append('a.published_at >= ?')
+            params.append(since.timestamp())
+        if not phrases and not conditions:
+            return []
+        
+        columns = 'a.title, a.url, a.source, a.published_at, a.summary'
+        where = ''.join(f' AND {condition}' for condition in conditions)
+        if phrases:
+            sql = (f'SELECT {columns} FROM articles_fts f JOIN articles a ON a.id = f.rowid '
+                   f'WHERE articles_fts MATCH ?{where} ORDER BY {"f.rank, " if rank else ""}f.rowid DESC LIMIT ?')
+            params = [' '.join(phrases)] + params
+        else:
+            sql = f'SELECT {columns} FROM articles a WHERE 1{where} ORDER BY a.id DESC LIMIT ?'
+        rows = self.conn.execute(sql, params + [limit]).fetchall()
+        return [NewsItem(title, url, source_name,
+                         datetime.fromtimestamp(published_at, timezone.utc) if published_at is not None else None,
+                         summary)
+                for title, url, source_name, published_at, summary in rows]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
 class NewsAggregator:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, timeout: float = 10.0, min_host_interval: float = 0.5,
+                 feed_cache: Optional[FeedCache] = None, dedup_index: Optional[DedupIndex] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, search_index: Optional[NewsIndex] = None,
+                 urlopen=None):
         self.rss_feeds = {
             'Yahoo!ニュース': 'https://news.yahoo.co.jp/rss/topics/top-picks.xml',
             'ITメディア': 'https://rss.itmedia.co.jp/rss/2.0/topstory.xml',
             'Yahoo!経済': 'https://news.yahoo.co.jp/rss/topics/business.xml'
         }
+        # フィードごとのタイムアウト（秒）。指定がなければ timeout を使う
+        self.feed_timeouts: Dict[str, float] = {}
+        # フィードごとの最大記事数。指定がなければ max_entries を使う
+        self.feed_limits: Dict[str, int] = {}
+        self.max_entries = max_entries
+        # --watch でのフィードごとのポーリング間隔（秒）。指定がなければ NewsWatcher の interval を使う
+        self.poll_intervals: Dict[str, float] = {}
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter(min_host_interval)
+        self.feed_cache = feed_cache
+        self.dedup_index = dedup_index
+        self.search_index = search_index
+        # HTTP 取得に使う関数（--record / --replay では http_fixtures の記録・再生に差し替える）
+        self.urlopen = urlopen or urllib.request.urlopen
+
+    def fetch_feed(self, source_name: str, rss_url: str, timeout: float,
+                   request_headers: Optional[Dict[str, str]] = None):
+        """フィードをタイムアウト付きでダウンロードしながら解析し、(記事, レスポンスヘッダー) を返す
+
+        feedparser.parse(url) にはタイムアウトを指定できないため、取得は urllib で行います。
+        記事は受信したチャンクから順に取り出し、上限に達したら残りは読みません。
+        XML として解析できないフィード（expat が扱えない文字コードなど）は feedparser で解析し直します。
+        304 Not Modified の場合は解析せずに None を返します。
+        """
+        headers = {'User-Agent': USER_AGENT}
+        headers.update(request_headers or {})
+        request = urllib.request.Request(rss_url, headers=headers)
+        limit = self.feed_limits.get(source_name, self.max_entries)
+        try:
+            with self.urlopen(request, timeout=timeout) as response:
+                # feedparser はヘッダー名を小文字で参照する（content-type の charset など）
+                response_headers = {name.lower(): value for name, value in response.headers.items()}
+                received = []
+                
+                def read_chunks():
+                    while True:
+                        chunk = response.read(STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            return
+                        received.append(chunk)
+                        yield chunk
+                
+                try:
+                    return list(iter_feed_items(read_chunks(), source_name, limit)), response_headers
+                except (ET.ParseError, ValueError):
+                    # ValueError: expat が対応していないマルチバイト文字コード（EUC-JP / Shift_JIS など）
+                    body = b''.join(received) + response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+        
+        feed = feedparser.parse(body, response_headers=response_headers)
+        if feed.bozo:
+            console.print(f"[yellow]警告: {source_name}のRSSフィードに問題があります[/yellow]")
+        return items_from_feedparser(feed, source_name, limit), response_headers
 
     def get_rss_feed(self, source_name: str, rss_url: str) -> List[NewsItem]:
         """RSSフィードから記事を取得"""
         news_items = []
         try:
-            feed = feedparser.parse(rss_url)
+            timeout = self.feed_timeouts.get(source_name, self.timeout)
+            limit = self.feed_limits.get(source_name, self.max_entries)
+            validators = self.feed_cache.validators(rss_url, limit) if self.feed_cache else None
+            result = self.fetch_feed(source_name, rss_url, timeout, validators)
             
-            if feed.bozo:
-                console.print(f"[yellow]警告: {source_name}のRSSフィードに問題があります[/yellow]")
+            # 304 Not Modified: 前回解析した記事をそのまま使う
+            if result is None:
+                cached_items = self.feed_cache.items(rss_url, limit)
+                if cached_items is not None:
+                    return cached_items
+                # キャッシュが消えていれば検証ヘッダーなしで取り直す
+                result = self.fetch_feed(source_name, rss_url, timeout)
             
-            for entry in feed.entries[:15]:  # 最大15件
-                # タイトルを取得
-                title = entry.get('title', '').strip()
-                if not title:
-                    continue
-                
-                # URLを取得
-                url = entry.get('link', '')
-                
-                # 公開日を取得
-                published = ''
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    try:
-                        pub_time = datetime(*entry.published_parsed[:6])
-                        published = pub_time.strftime('%m/%d %H:%M')
-                    except:
-                        pass
-                
-                # サマリーを取得
-                summary = entry.get('summary', '')
-                if summary:
-                    # HTMLタグを除去
-                    import re
-                    summary = re.sub(r'<[^>]+>', '', summary)
-                    summary = summary.strip()[:100] + '...' if len(summary) > 100 else summary
-                
-                news_items.append(NewsItem(
-                    title=title,
-                    url=url,
-                    source=source_name,
-                    published=published,
-                    summary=summary
-                ))
+            news_items, headers = result
+            if self.feed_cache is not None:
+                self.feed_cache.put(rss_url, headers.get('etag'), headers.get('last-modified'), news_items, limit)
             
         except Exception as e:
             console.print(f"[red]{source_name}のRSSフィード取得に失敗: {e}[/red]")
         
         return news_items
 
-
+    def _fetch_source(self, source_name: str, rss_url: str) -> List[NewsItem]:
+        """ホストごとのアクセス間隔を守ってから1つのフィードを取得"""
+        self.rate_limiter.wait(rss_url)
+        return self.get_rss_feed(source_name, rss_url)
 
     def get_all_news(self) -> List[NewsItem]:
-        """すべてのRSSフィードから記事を取得"""
-        all_news = []
-        
-        # プログレスバー付きで各RSSフィードから取得
+        """すべてのRSSフィードから記事を並行して取得"""
+        results: Dict[str, List[NewsItem]] = {}
         feeds = list(self.rss_feeds.items())
         
-        for source_name, rss_url in track(feeds, description="RSSフィードを取得中..."):
-            news = self.get_rss_feed(source_name, rss_url)
-            all_news.extend(news)
-            time.sleep(0.5)  # 各フィードへのアクセス間隔を空ける
+        # プログレスバー付きで各RSSフィードから取得（取得できたものから進む）
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[bold blue]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TimeElapsedColumn(),
+            console=console,
+            transient=True
+        ) as progress:
+            task = progress.add_task("RSSフィードを取得中...", total=len(feeds))
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(feeds)))) as executor:
+                futures = {
+                    executor.submit(self._fetch_source, source_name, rss_url): source_name
+                    for source_name, rss_url in feeds
+                }
+                for future in as_completed(futures):
+                    source_name = futures[future]
+                    results[source_name] = future.result()
+                    progress.update(
+                        task,
+                        advance=1,
+                        description=f"{source_name} を取得しました（{len(results[source_name])}件）"
+                    )
+        
+        # 表示順はフィードの登録順にそろえる
+        all_news = []
+        for source_name, _ in feeds:
+            all_news.extend(results.get(source_name, []))
         
+        # フィードをまたいだ重複は、先に登録されたフィードの記事を残す
+        all_news = self._accept(all_news)
+        self._save_state()
         return all_news
+    
+    def iter_news(self) -> Iterator[Tuple[str, List[NewsItem]]]:
+        """取得できたフィードから順に (ソース名, 記事のリスト) を返す（進捗表示なし）
+        
+        JSON / NDJSON 出力用。遅いフィードを待たずに先に届いた記事を返すため、
+        フィードをまたいだ重複は取得できた順に判定する
+        """
+        feeds = list(self.rss_feeds.items())
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(feeds)))) as executor:
+                futures = {
+                    executor.submit(self._fetch_source, source_name, rss_url): source_name
+                    for source_name, rss_url in feeds
+                }
+                for future in as_completed(futures):
+                    yield futures[future], self._accept(future.result())
+        finally:
+            self._save_state()
+    
+    def _accept(self, items: List[NewsItem]) -> List[NewsItem]:
+        """他のフィードと重複する記事を除き、新しい記事を検索インデックスに追加する"""
+        if self.dedup_index is not None:
+            items = [item for item in items if not self.dedup_index.is_duplicate(item)]
+        if self.search_index is not None:
+            self.search_index.add(items)
+        return items
+    
+    def _save_state(self):
+        """フィードキャッシュと重複判定の索引を保存する"""
+        if self.feed_cache is not None:
+            self.feed_cache.save()
+        if self.dedup_index is not None:
+            self.dedup_index.save()
+
+@dataclass
+class PollStats:
+    """1つのフィードのポーリング回数と取得時間（ms）の集計"""
+    polls: int = 0
+    new_items: int = 0
+    last_ms: float = 0.0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    next_poll: Optional[datetime] = None
+
+    def record(self, elapsed_ms: float, new_items: int):
+        self.polls += 1
+        self.new_items += new_items
+        self.last_ms = elapsed_ms
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.polls if self.polls else 0.0
+
+class NewsWatcher:
+    """NewsAggregator を使い回し、フィードごとの間隔でポーリングし続ける（--watch）
+
+    新しい記事（URL が未知のもの）だけをメモリ上のストアに追加し、
+    記事が増えたソースのテーブルだけを作り直して rich の Live で再描画します。
+    表示用のストアは max_items 件に切り詰めるので、新着かどうかはソースごとの
+    既読キー（最近見た順に seen_limit 件まで）で判定します。
+    """
+
+    # ソースごとに覚えておく既読キーの最小件数（フィードの記事数より十分大きくする）
+    SEEN_LIMIT = 1000
+
+    def __init__(self, aggregator: NewsAggregator, interval: float = 300.0, max_items: int = DEFAULT_MAX_ENTRIES):
+        self.aggregator = aggregator
+        self.interval = interval
+        self.max_items = max_items
+        # ソース名 -> {URL: NewsItem}（新しい記事が先頭）
+        self.store: Dict[str, Dict[str, NewsItem]] = {name: {} for name in aggregator.rss_feeds}
+        # ソース名 -> 既読キー（URL またはタイトル）。最近見たものが末尾
+        self.seen: Dict[str, OrderedDict] = {name: OrderedDict() for name in aggregator.rss_feeds}
+        self.seen_limit = max(self.SEEN_LIMIT, 4 * max_items)
+        self.stats: Dict[str, PollStats] = {name: PollStats() for name in aggregator.rss_feeds}
+        self._tables: Dict[str, Table] = {}
+        # 監視を始めてから見つけた新着記事すべて（--export 用）
+        self.history = NewsStore()
+        self.last_update: Optional[datetime] = None
+
+    def interval_for(self, source_name: str) -> float:
+        return self.aggregator.poll_intervals.get(source_name, self.interval)
+
+    def poll(self, source_name: str):
+        """1つのフィードを取得して (記事, 取得時間 ms) を返す（レート制限の待ち時間は含めない）"""
+        rss_url = self.aggregator.rss_feeds[source_name]
+        self.aggregator.rate_limiter.wait(rss_url)
+        started = time.perf_counter()
+        items = self.aggregator.get_rss_feed(source_name, rss_url)
+        return items, (time.perf_counter() - started) * 1000
+
+    def merge(self, source_name: str, items: List[NewsItem]) -> int:
+        """未知の記事だけをストアに追加し、追加した件数を返す"""
+        known = self.store[source_name]
+        seen = self.seen[source_name]
+        dedup_index = self.aggregator.dedup_index
+        fresh = {}
+        for item in items:
+            key = item.url or item.title
+            if key in seen:
+                seen.move_to_end(key)
+                # 既知の記事も確認時刻を更新しておく（重複インデックスから消えないように）
+                if dedup_index is not None:
+                    dedup_index.is_duplicate(item)
+                continue
+            seen[key] = None
+            if dedup_index is not None and dedup_index.is_duplicate(item):
+                continue
+            fresh[key] = item
+        while len(seen) > self.seen_limit:
+            seen.popitem(last=False)
+        added = len(fresh)
+        if added:
+            self.history.extend(fresh.values())
+            if self.aggregator.search_index is not None:
+                self.aggregator.search_index.add(fresh.values())
+            fresh.update(known)
+            # 公開時刻の新しい順に max_items 件まで（同じ時刻なら新着を先に）
+            ordered = sorted(fresh.items(), key=lambda pair: published_timestamp(pair[1]), reverse=True)
+            self.store[source_name] = dict(ordered[:self.max_items])
+            self._tables[source_name] = build_source_table(source_name, list(self.store[source_name].values()))
+        return added
+
+    def stats_table(self) -> Table:
+        """ポーリングごとの取得時間の統計"""
+        updated = self.last_update.strftime('%H:%M:%S') if self.last_update else '-'
+        table = Table(
+            title=f"📡 監視中（最終更新 {updated}・Ctrl+C で終了）",
+            box=box.SIMPLE_HEAVY,
+            header_style="bold cyan"
+        )
+        table.add_column("ニュースソース", style="bold yellow")
+        table.add_column("間隔", justify="right")
+        table.add_column("取得回数", justify="right")
+        table.add_column("新着", justify="right", style="bold green")
+        table.add_column("直近 (ms)", justify="right")
+        table.add_column("平均 (ms)", justify="right")
+        table.add_column("最大 (ms)", justify="right")
+        table.add_column("次回", justify="right", style="dim")
+        for source_name, stats in self.stats.items():
+            table.add_row(
+                source_name,
+                f"{self.interval_for(source_name):g}s",
+                str(stats.polls),
+                str(stats.new_items),
+                f"{stats.last_ms:.0f}",
+                f"{stats.avg_ms:.0f}",
+                f"{stats.max_ms:.0f}",
+                stats.next_poll.strftime('%H:%M:%S') if stats.next_poll else '-'
+            )
+        return table
+
+    def render(self) -> Group:
+        """統計と、作成済みのソース別テーブルをまとめる"""
+        tables = [self._tables[name] for name in self.store if name in self._tables]
+        return Group(self.stats_table(), *tables)
+
+    def run(self, duration: Optional[float] = None):
+        """Ctrl+C まで（duration を指定したらその秒数だけ）ポーリングを続ける"""
+        started = time.monotonic()
+        deadline = started + duration if duration is not None else None
+        # (次回の時刻, 登録順, ソース名) のヒープ。最初は全フィードを即時取得
+        schedule = [(started, order, name) for order, name in enumerate(self.store)]
+        heapq.heapify(schedule)
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.aggregator.max_workers, len(schedule))))
+        try:
+            with Live(self.render(), console=console, auto_refresh=False) as live:
+                while True:
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline and not pending:
+                        break
+                    while schedule and schedule[0][0] <= now and (deadline is None or now < deadline):
+                        _, order, name = heapq.heappop(schedule)
+                        pending[executor.submit(self.poll, name)] = (order, name)
+                    
+                    timeout = schedule[0][0] - now if schedule else None
+                    if deadline is not None:
+                        timeout = min(timeout if timeout is not None else deadline - now, deadline - now)
+                    timeout = max(0.0, timeout) if timeout is not None else None
+                    
+                    if not pending:
+                        time.sleep(timeout)
+                        continue
+                    done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        order, name = pending.pop(future)
+                        items, elapsed_ms = future.result()
+                        interval = self.interval_for(name)
+                        heapq.heappush(schedule, (time.monotonic() + interval, order, name))
+                        stats = self.stats[name]
+                        stats.record(elapsed_ms, self.merge(name, items))
+                        stats.next_poll = datetime.now() + timedelta(seconds=interval)
+                    if done:
+                        if self.aggregator.feed_cache is not None:
+                            self.aggregator.feed_cache.save()
+                        if self.aggregator.dedup_index is not None:
+                            self.aggregator.dedup_index.save()
+                        self.last_update = datetime.now()
+                        live.update(self.render(), refresh=True)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 def display_welcome():
     """ウェルカムメッセージを表示"""
@@ -125,70 +1093,93 @@ def display_welcome():
     console.print(panel)
     console.print()
 
-def display_news_by_source(news_items: List[NewsItem]):
-    """ソース別にニュースを美しく表示"""
+# ソース名 -> (色, アイコン)。登録されていないソースは DEFAULT_SOURCE_STYLE
+SOURCE_STYLES = {
+    'Yahoo!ニュース': ('red', '📰'),
+    'ITメディア': ('green', '💻'),
+    'Yahoo!経済': ('yellow', '💼'),
+}
+DEFAULT_SOURCE_STYLE = ('blue', '📄')
+
+@dataclass(slots=True)
+class SourceGroup:
+    """1つのソースの集計結果（items は公開時刻の新しい順、top_n 指定時はその件数まで）"""
+    name: str
+    count: int = 0
+    items: List[NewsItem] = field(default_factory=list)
+
+def aggregate_news(news_items: Iterable[NewsItem], top_n: Optional[int] = None) -> Dict[str, SourceGroup]:
+    """記事を1回だけ走査して、ソースごとの件数と公開時刻の新しい順の記事（上位 top_n 件）をまとめる
+
+    top_n を指定した場合はソースごとに top_n 件のヒープだけを持つので、記事数 n に対して
+    O(n log top_n) で済みます（指定しなければ最後に1回ずつ並べ替え）。同じ時刻の記事は元の順番を保ちます。
+    戻り値はソースが最初に現れた順の辞書です。
+    """
+    groups: Dict[str, SourceGroup] = {}
+    heaps: Dict[str, list] = {}
+    for seq, item in enumerate(news_items):
+        group = groups.get(item.source)
+        if group is None:
+            group = groups[item.source] = SourceGroup(item.source)
+            heaps[item.source] = []
+        group.count += 1
+        # (公開時刻, -出現順) が大きいものほど上位。出現順は一意なので NewsItem 同士は比較しない
+        entry = (published_timestamp(item), -seq, item)
+        heap = heaps[item.source]
+        if top_n is None:
+            heap.append(entry)
+        elif len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    for name, group in groups.items():
+        group.items = [entry[2] for entry in sorted(heaps[name], reverse=True)]
+    return groups
+
+def build_source_table(source_name: str, items: List[NewsItem], total: Optional[int] = None) -> Table:
+    """1つのソースの記事一覧テーブルを作成（total は上位だけを表示するときの全件数）"""
     
-    # ソース別にグループ化
-    sources = {}
-    for item in news_items:
-        if item.source not in sources:
-            sources[item.source] = []
-        sources[item.source].append(item)
+    # ソース名に応じて色とアイコンを設定
+    color, icon = SOURCE_STYLES.get(source_name, DEFAULT_SOURCE_STYLE)
+    count = f"{len(items)}/{total}件" if total is not None and total > len(items) else f"{len(items)}件"
     
-    # 各ソースのニュースを表示
-    for source_name, items in sources.items():
-        if not items:
-            continue
-            
-        # ソース名に応じて色とアイコンを設定
-        if "Yahoo!" in source_name:
-            if "経済" in source_name:
-                color = "yellow"
-                icon = "💼"
-            else:
-                color = "red"
-                icon = "📰"
-        elif "ITMedia" in source_name:
-            color = "green"
-            icon = "💻"
-        else:
-            color = "blue"
-            icon = "📄"
-        
-        # テーブル作成
-        table = Table(
-            title=f"{icon} {source_name} ({len(items)}件)",
-            box=box.ROUNDED,
-            show_header=True,
-            header_style="bold white",
-            title_style=f"bold {color}"
-        )
+    # テーブル作成
+    table = Table(
+        title=f"{icon} {source_name} ({count})",
+        box=box.ROUNDED,
+        show_header=True,
+        header_style="bold white",
+        title_style=f"bold {color}"
+    )
+    
+    table.add_column("時刻", style="dim cyan", width=11, no_wrap=True)
+    table.add_column("記事タイトル", style="white", no_wrap=False)
+    
+    # 記事を追加
+    for i, item in enumerate(items, 1):
+        # タイトルを適度な長さに制限
+        title = item.title
+        if len(title) > 70:
+            title = title[:67] + "..."
         
-        table.add_column("時刻", style="dim cyan", width=10, no_wrap=True)
-        table.add_column("記事タイトル", style="white", no_wrap=False)
+        # 公開時刻（ローカル時刻で表示）
+        time_str = format_published(item.published)
         
-        # 記事を追加
-        for i, item in enumerate(items, 1):
-            # タイトルを適度な長さに制限
-            title = item.title
-            if len(title) > 70:
-                title = title[:67] + "..."
-            
-            # 公開時刻
-            time_str = item.published if item.published else ""
-            
-            table.add_row(time_str, f"{i:2d}. {title}")
+        table.add_row(time_str, f"{i:2d}. {title}")
+    
+    return table
+
+def display_news_by_source(groups: Dict[str, SourceGroup]):
+    """ソース別にニュースを美しく表示（aggregate_news の結果を使う）"""
+    for group in groups.values():
+        if not group.items:
+            continue
         
         console.print()
-        console.print(table)
+        console.print(build_source_table(group.name, group.items, group.count))
 
-def display_summary(news_items: List[NewsItem]):
-    """取得結果のサマリーを表示"""
-    
-    # ソース別の件数をカウント
-    source_counts = {}
-    for item in news_items:
-        source_counts[item.source] = source_counts.get(item.source, 0) + 1
+def display_summary(groups: Dict[str, SourceGroup]):
+    """取得結果のサマリーを表示（aggregate_news の結果を使う）"""
     
     # サマリーテーブル
     summary_table = Table(
@@ -202,9 +1193,9 @@ def display_summary(news_items: List[NewsItem]):
     summary_table.add_column("記事数", style="bold green", justify="center", width=10)
     
     total = 0
-    for source, count in source_counts.items():
-        summary_table.add_row(source, str(count))
-        total += count
+    for group in groups.values():
+        summary_table.add_row(group.name, str(group.count))
+        total += group.count
     
     summary_table.add_row("", "")  # 区切り行
     summary_table.add_row("合計", str(total), style="bold white")
@@ -235,9 +1226,235 @@ def display_footer():
     console.print(panel)
     console.print()
 
+def display_search_results(query: str, items: List[NewsItem], elapsed_ms: float, indexed: int):
+    """検索結果を表示"""
+    if not items:
+        console.print(f"[yellow]🔍 「{query}」に一致する記事はありませんでした（{indexed}件を検索, {elapsed_ms:.1f} ms）[/yellow]")
+        return
+    
+    table = Table(
+        title=f"🔍 「{query}」の検索結果",
+        box=box.ROUNDED,
+        show_header=True,
+        header_style="bold white",
+        title_style="bold cyan"
+    )
+    table.add_column("時刻", style="dim cyan", width=11, no_wrap=True)
+    table.add_column("ニュースソース", no_wrap=True)
+    table.add_column("記事タイトル", style="white", no_wrap=False)
+    
+    words = query.split()
+    for item in items:
+        color, icon = SOURCE_STYLES.get(item.source, DEFAULT_SOURCE_STYLE)
+        title = Text(item.title, style=f"link {item.url}" if item.url.startswith('http') else "")
+        title.highlight_words(words, style="bold yellow", case_sensitive=False)
+        table.add_row(format_published(item.published), Text(f"{icon} {item.source}", style=color), title)
+    
+    console.print(table)
+    console.print(f"[dim]{len(items)}件を表示（{indexed}件を検索, {elapsed_ms:.1f} ms）[/dim]")
+
+def fixture_urlopen(args):
+    """--record / --replay に応じた (urlopen, FixtureStore) を返す（指定がなければ (None, None)）"""
+    if not (args.record or args.replay):
+        return None, None
+    # 記録・再生を使うときだけ読み込む（通常の取得には不要）
+    import http_fixtures
+    if args.record:
+        store = http_fixtures.FixtureStore(args.record)
+        return store.record_urlopen, store
+    if args.replay.startswith(('http://', 'https://')):
+        return http_fixtures.stub_urlopen(args.replay), None
+    store = http_fixtures.FixtureStore(args.replay)
+    return store.replay_urlopen, store
+
+def search_command(args):
+    """news.py search <query>: 検索インデックスから記事を探す"""
+    index = NewsIndex(args.index_file)
+    indexed = len(index)
+    if not indexed:
+        console.print("[yellow]💡 検索インデックスが空です。先に news.py を実行して記事を取得してください。[/yellow]")
+        return
+    query = ' '.join(args.query)
+    started = time.perf_counter()
+    since = parse_since(args.since) if args.since else None
+    items = index.search(query, limit=args.max_results, source=args.source, rank=args.rank, since=since)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    display_search_results(query, items, elapsed_ms, indexed)
+    index.close()
+
+OUTPUT_FORMATS = ['rich', 'json', 'ndjson']
+
+class RecordWriter:
+    """記事を JSON の配列、または NDJSON（1行に1件）で書き出す
+    
+    1件ごとに書き込んで flush するので、受け取る側は残りのフィードの取得を待たずに処理を始められる
+    """
+    
+    def __init__(self, fmt: str, stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.count = 0
+    
+    def write(self, record: dict):
+        text = json.dumps(record, ensure_ascii=False)
+        if self.fmt == 'json':
+            text = ('[\n  ' if self.count == 0 else ',\n  ') + text
+        else:
+            text += '\n'
+        self.stream.write(text)
+        self.stream.flush()
+        self.count += 1
+    
+    def close(self):
+        if self.fmt == 'json':
+            self.stream.write('\n]\n' if self.count else '[]\n')
+        self.stream.flush()
+
+def write_news_records(aggregator: NewsAggregator, fmt: str, since: Optional[datetime] = None,
+                       top_n: Optional[int] = None, stream=None) -> List[NewsItem]:
+    """rich の描画を通さずに記事を JSON / NDJSON で書き出す
+    
+    取得できたフィードから順に、ソースごとに公開時刻の新しい順で書き出す（top_n はソースごとの件数）。
+    --since で絞り込んだ後の全記事を返す（--export 用）
+    """
+    writer = RecordWriter(fmt, stream)
+    all_items = []
+    for _, items in aggregator.iter_news():
+        if since is not None:
+            items = filter_by_time(items, since=since)
+        all_items.extend(items)
+        for item in sorted(items, key=published_timestamp, reverse=True)[:top_n]:
+            writer.write(item.to_dict())
+    writer.close()
+    return all_items
+
 def main():
     """メイン処理"""
+    global console
+    parser = argparse.ArgumentParser(description="📰 RSSニュース取得・表示スクリプト")
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='フィードキャッシュ（ETag / Last-Modified による条件付き取得）を使わない'
+    )
+    parser.add_argument(
+        '--cache-file',
+        default=str(DEFAULT_FEED_CACHE),
+        help='フィードキャッシュの保存先 (デフォルト: %(default)s)'
+    )
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help='フィードごとに取得する最大記事数。上限に達したら残りはダウンロードしない (デフォルト: %(default)s)'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        metavar='N',
+        help='ソースごとに公開時刻の新しい N 件だけを表示する（件数のサマリーは全件で集計）'
+    )
+    parser.add_argument(
+        '--since',
+        help='この時刻以降に公開された記事だけを表示する（例: 30m, 2h, 3d, 1w, 2026-10-01T09:00）'
+    )
+    parser.add_argument(
+        '--no-dedup',
+        action='store_true',
+        help='フィードをまたいだ重複記事（同じ URL・ほぼ同じタイトル）を省略しない'
+    )
+    parser.add_argument(
+        '--export',
+        metavar='FILE',
+        help='取得した記事を書き出す（拡張子で形式を選択: .jsonl / .arrow / .parquet。Arrow と Parquet は pyarrow が必要）'
+    )
+    parser.add_argument(
+        '--format',
+        choices=OUTPUT_FORMATS,
+        default='rich',
+        help='出力形式。json / ndjson は rich の表示を行わず、取得できたフィードから順に記事を標準出力へ書き出す (デフォルト: %(default)s)'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='終了せずにフィードをポーリングし続け、新着記事だけを追加して再描画する（Ctrl+C で終了）'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=300.0,
+        help='--watch でのポーリング間隔（秒, デフォルト: %(default)s）'
+    )
+    fixture_options = parser.add_mutually_exclusive_group()
+    fixture_options.add_argument(
+        '--record',
+        metavar='DIR',
+        help='受け取ったフィードの応答を DIR に記録する（http_fixtures.py の形式。記録中はフィードキャッシュを使わない）'
+    )
+    fixture_options.add_argument(
+        '--replay',
+        metavar='DIR|URL',
+        help='ネットワークに出ずに DIR の記録から応答する。URL を指定すると stub_server.py --replay に問い合わせる'
+    )
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help='取得した記事を検索インデックスに追加しない'
+    )
+    parser.add_argument(
+        '--index-file',
+        default=str(DEFAULT_SEARCH_INDEX),
+        help='検索インデックスの保存先 (デフォルト: %(default)s)'
+    )
+    
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    search_parser = subparsers.add_parser('search', help='これまでに取得した記事をタイトルとサマリーから検索する')
+    search_parser.add_argument('query', nargs='+', help='検索語（複数指定するとすべてを含む記事）')
+    search_parser.add_argument('-n', '--max-results', type=int, default=20, help='表示する最大件数 (デフォルト: %(default)s)')
+    search_parser.add_argument('--source', help='ニュースソースで絞り込む（例: ITメディア）')
+    search_parser.add_argument('--rank', action='store_true', help='新しい順ではなく関連度（bm25）の高い順に表示する')
+    search_parser.add_argument('--since', default=argparse.SUPPRESS,
+                               help='この時刻以降に公開された記事だけ（例: 2h, 3d, 2026-10-01）')
+    search_parser.add_argument('--index-file', default=argparse.SUPPRESS, help='検索インデックスの保存先')
+    args = parser.parse_args()
+    machine_output = args.command != 'search' and args.format != 'rich'
+    if machine_output and args.watch:
+        parser.error('--format json / ndjson は --watch と同時に使えません')
+    if machine_output:
+        # 標準出力には記事だけを書き、メッセージは標準エラー出力へ
+        console = Console(stderr=True)
+    
+    urlopen, fixtures = fixture_urlopen(args) if args.command != 'search' else (None, None)
+    if args.replay and fixtures is not None and not len(fixtures):
+        parser.error(f"{fixtures.manifest} に記録がありません（--record で作成してください）")
+    
     try:
+        if args.command == 'search':
+            search_command(args)
+            return
+        since = parse_since(args.since) if args.since else None
+        # 記録では 304 にならないよう、条件付き取得をせずに本文を受け取る
+        use_cache = not (args.no_cache or args.record)
+        
+        if machine_output:
+            feed_cache = FeedCache(args.cache_file) if use_cache else None
+            aggregator = NewsAggregator(
+                feed_cache=feed_cache,
+                dedup_index=None if args.no_dedup else DedupIndex(),
+                max_entries=args.limit,
+                search_index=None if args.no_index else NewsIndex(args.index_file),
+                urlopen=urlopen
+            )
+            try:
+                news_items = write_news_records(aggregator, args.format, since=since, top_n=args.top)
+            except BrokenPipeError:
+                # 読み手が先に終了した（| head など）
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return
+            if args.export:
+                NewsStore(news_items).export(args.export)
+            return
+        
         # 画面クリア
         console.clear()
         
@@ -245,7 +1462,22 @@ def main():
         display_welcome()
         
         # ニュース取得
-        aggregator = NewsAggregator()
+        feed_cache = FeedCache(args.cache_file) if use_cache else None
+        dedup_index = None if args.no_dedup else DedupIndex()
+        search_index = None if args.no_index else NewsIndex(args.index_file)
+        aggregator = NewsAggregator(feed_cache=feed_cache, dedup_index=dedup_index, max_entries=args.limit,
+                                    search_index=search_index, urlopen=urlopen)
+        
+        if args.watch:
+            watcher = NewsWatcher(aggregator, interval=args.interval, max_items=args.limit)
+            try:
+                watcher.run()
+            finally:
+                if args.export:
+                    watcher.history.export(args.export)
+                    console.print(f"[dim]💾 {len(watcher.history)}件の記事を {args.export} に書き出しました[/dim]")
+            return
+        
         news_items = aggregator.get_all_news()
         
         if not news_items:
@@ -253,11 +1485,27 @@ def main():
             console.print("[yellow]💡 インターネット接続を確認してください。[/yellow]")
             return
         
+        if since is not None:
+            news_items = filter_by_time(news_items, since=since)
+            if not news_items:
+                console.print(f"[yellow]💡 {args.since} 以降に公開された記事はありません。[/yellow]")
+                return
+        
+        if args.export:
+            NewsStore(news_items).export(args.export)
+        
+        # ソース別の集計（1回の走査で件数・並べ替え・上位の抽出）
+        groups = aggregate_news(news_items, top_n=args.top)
+        
         # ニュース表示
-        display_news_by_source(news_items)
+        display_news_by_source(groups)
         
         # サマリー表示
-        display_summary(news_items)
+        display_summary(groups)
+        if feed_cache is not None and feed_cache.not_modified:
+            console.print(f"[dim]🗄️ {feed_cache.not_modified}件のフィードは更新がなく、キャッシュを使用しました[/dim]")
+        if dedup_index is not None and dedup_index.duplicates:
+            console.print(f"[dim]🔁 他のフィードと重複する{dedup_index.duplicates}件の記事を省略しました[/dim]")
         
         # フッター表示
         display_footer()
@@ -270,6 +1518,11 @@ def main():
     except Exception as e:
         console.print(f"\n[bold red]❌ エラーが発生しました: {e}[/bold red]")
         console.print("[yellow]💡 しばらく時間を置いてから再試行してください。[/yellow]")
+    finally:
+        if fixtures is not None and fixtures.recorded:
+            console.print(f"[dim]🎞️ {fixtures.recorded}件の応答を {fixtures.directory} に記録しました[/dim]")
+        elif fixtures is not None and fixtures.missing:
+            console.print(f"[yellow]🎞️ {fixtures.missing}件のリクエストは {fixtures.directory} に記録がありませんでした[/yellow]")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,71 +11,849 @@
 """
 
 import argparse
+import csv
+import json
+import shutil
+import struct
 import sys
 import os
+import time
+import zlib
+from contextlib import contextmanager
+from importlib.util import find_spec
 from pathlib import Path
-import qrcode
-try:
-    from qrcode.image.styledpil import StyledPilImage
-    from qrcode.image.styles.moduledrawers import RoundedModuleDrawer, CircleModuleDrawer, SquareModuleDrawer
-    from qrcode.image.styles.colorfills import SolidFillColorMask
-    STYLED_FEATURES = True
-except ImportError:
-    STYLED_FEATURES = False
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich.text import Text
-from rich import box
-
-console = Console()
 
-def create_qr_code(data, output_path, box_size=10, border=4, error_correction='M', style='square', 
-                   fill_color='black', back_color='white'):
-    """QRコードを生成"""
-    
-    # エラー訂正レベルの設定
-    error_levels = {
-        'L': qrcode.constants.ERROR_CORRECT_L,  # 約7%
-        'M': qrcode.constants.ERROR_CORRECT_M,  # 約15%（デフォルト）
-        'Q': qrcode.constants.ERROR_CORRECT_Q,  # 約25%
-        'H': qrcode.constants.ERROR_CORRECT_H   # 約30%
-    }
+# qrcode（PIL を含む）と rich は起動を速くするため、実際に使う処理の中で import します
+
+_console = None
+
+def get_console():
+    """rich の Console を初回利用時に作成して返す"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+# エラー訂正レベルの設定（値は qrcode.constants.ERROR_CORRECT_* と同じ、規格上のビット値）
+ERROR_LEVELS = {
+    'L': 1,  # 約7%
+    'M': 0,  # 約15%（デフォルト）
+    'Q': 3,  # 約25%
+    'H': 2   # 約30%
+}
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'python-tools-demo' / 'qr'
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+class QRCache:
+    """データと描画オプションのハッシュをキーにしたQRコード画像のディスクキャッシュ
+
+    画像は <cache_dir>/<キー先頭2文字>/<キー><拡張子> に保存し、サイズと最終利用時刻、
+    ヒット/ミス数は SQLite のインデックスで管理します（複数プロセスから同時に使えます）。
+    合計サイズが max_bytes を超えると、最終利用時刻の古いものから削除します。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._conn = None
+
+    def __getstate__(self):
+        # ワーカープロセスへ渡すときは接続を持ち越さない
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            import sqlite3
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.cache_dir / 'index.sqlite3', timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(data, output_path, **options):
+        """データ・描画オプション・出力形式（拡張子）からキャッシュキーを作る"""
+        import hashlib
+        payload = [data, Path(output_path).suffix.lower()]
+        payload.extend(options.get(name) for name in (
+            'error_correction', 'box_size', 'border', 'style', 'fill_color', 'back_color'
+        ))
+        # マスクを指定したときだけキーに含める（既定の auto のキーは変えない）
+        if options.get('mask', 'auto') != 'auto':
+            payload.append(options['mask'])
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _count(self, name):
+        with self.conn:
+            self.conn.execute('UPDATE stats SET value = value + 1 WHERE name = ?', (name,))
+
+    def fetch(self, key, output_path):
+        """キャッシュにあれば output_path へコピーして True を返す
+
+        出力はキャッシュの画像とは別のファイルなので、利用者が編集してもキャッシュは壊れず、
+        ファイルのモードも通常どおりです（画像は小さいのでコピーの費用は無視できます）。
+
+        保存時とサイズが変わっている画像（外部から書き換えられたもの）は削除してミスとして扱います。
+        """
+        row = self.conn.execute('SELECT path, size FROM entries WHERE key = ?', (key,)).fetchone()
+        cached_path = self.cache_dir / row[0] if row else None
+        try:
+            intact = cached_path is not None and cached_path.stat().st_size == row[1]
+        except FileNotFoundError:
+            intact = False
+        if not intact:
+            if cached_path is not None:
+                cached_path.unlink(missing_ok=True)
+                with self.conn:
+                    self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._count('misses')
+            return False
+
+        with open(cached_path, 'rb') as src, replacing_output(output_path) as dst:
+            shutil.copyfileobj(src, dst)
+
+        with self.conn:
+            self.conn.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'hits'")
+        return True
+
+    def store(self, key, output_path):
+        """生成済みの画像をキャッシュへコピーし、上限を超えた分を削除"""
+        relative_path = Path(key[:2]) / (key + Path(output_path).suffix.lower())
+        cached_path = self.cache_dir / relative_path
+        cached_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cached_path.with_name(f"{cached_path.name}.{os.getpid()}.tmp")
+        shutil.copyfile(output_path, tmp_path)
+        os.replace(tmp_path, cached_path)
+
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (key, relative_path.as_posix(), cached_path.stat().st_size, time.time())
+            )
+        self.evict()
+
+    def evict(self):
+        """合計サイズが上限以下になるまで最終利用時刻の古いエントリを削除"""
+        with self.conn:
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, path, size in self.conn.execute(
+                'SELECT key, path, size FROM entries ORDER BY last_used'
+            ).fetchall():
+                (self.cache_dir / path).unlink(missing_ok=True)
+                self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self):
+        """ヒット数・ミス数・エントリ数・合計サイズを返す"""
+        counts = dict(self.conn.execute('SELECT name, value FROM stats'))
+        entries, total = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {
+            'hits': counts.get('hits', 0),
+            'misses': counts.get('misses', 0),
+            'entries': entries,
+            'bytes': total,
+        }
+
+# renderer='auto' でも NumPy の import 時間（数十ms）より描画の短縮が大きくなる画像サイズ
+NUMPY_AUTO_MIN_PIXELS = 1500
+
+def _numpy_available():
+    """NumPy ラスタライザが使えるかどうか（import はしない）"""
+    return 'numpy' in sys.modules or find_spec('numpy') is not None
+
+def _use_numpy(renderer, qr):
+    """square スタイルを NumPy で描画するかどうか
+
+    auto の場合、NumPy が import 済みか、画像が大きく import 時間を取り戻せるときだけ使います。
+    """
+    if renderer != 'auto':
+        return renderer == 'numpy'
+    if 'numpy' in sys.modules:
+        return True
+    pixel_size = (qr.modules_count + qr.border * 2) * qr.box_size
+    return pixel_size >= NUMPY_AUTO_MIN_PIXELS and _numpy_available()
+
+_styled_drawers = None
+
+def _load_styled_drawers():
+    """round / circle 用の StyledPilImage 関連クラスを初回利用時に読み込む（使えなければ None）"""
+    global _styled_drawers
+    if _styled_drawers is None:
+        try:
+            from qrcode.image.styledpil import StyledPilImage
+            from qrcode.image.styles.moduledrawers import RoundedModuleDrawer, CircleModuleDrawer
+            from qrcode.image.styles.colormasks import SolidFillColorMask
+        except ImportError:
+            _styled_drawers = {}
+        else:
+            _styled_drawers = {
+                'image_factory': StyledPilImage,
+                'round': RoundedModuleDrawer,
+                'circle': CircleModuleDrawer,
+                'color_mask': SolidFillColorMask,
+            }
+    return _styled_drawers or None
+
+def render_square_numpy(qr, fill_color='black', back_color='white'):
+    """square スタイルの画像を NumPy で一括ラスタライズ
+
+    qr.make_image() はモジュールごとに PIL の矩形を描くため box_size² × モジュール数に比例して
+    遅くなります。ここでは qr.get_matrix() を np.repeat で拡大し、1回のバッファ変換で画像にします。
+    色の扱い（"1" / RGB / RGBA モードの選択）は qrcode の PilImage と同じで、出力はピクセル単位で一致します。
+    """
+    import numpy as np
+    from PIL import Image, ImageColor
+
+    # 横方向だけ拡大した1行分を作ってから行を複製する（縦の拡大はバッファのコピーのみ）
+    dark = np.array(qr.get_matrix(), dtype=bool)
+    rows = dark.repeat(qr.box_size, axis=1)
+    size = (rows.shape[1], rows.shape[0] * qr.box_size)
+
+    fill_key = fill_color.lower() if isinstance(fill_color, str) else fill_color
+    back_key = back_color.lower() if isinstance(back_color, str) else back_color
+
+    if fill_key == 'black' and back_key == 'white':
+        # 1ビット画像: 白 = 1 のビットをそのまま詰める
+        packed = np.packbits(~rows, axis=1).repeat(qr.box_size, axis=0)
+        return Image.frombytes('1', size, packed.tobytes())
+
+    if back_key == 'transparent':
+        mode = 'RGBA'
+        background = (0, 0, 0, 0)
+    else:
+        mode = 'RGB'
+        background = back_key
+
+    def to_rgb(color):
+        if isinstance(color, str):
+            return ImageColor.getcolor(color, mode)
+        if mode == 'RGBA' and len(color) == 3:
+            return (*color, 255)
+        return tuple(color)
+
+    palette = np.array([to_rgb(background), to_rgb(fill_key)], dtype=np.uint8)
+    return Image.fromarray(palette[rows.view(np.uint8)].repeat(qr.box_size, axis=0), mode)
+
+# マスクパターンの選び方: 'auto'（8種類すべて評価、qrcode と同じ）/
+# 'memo'（同じ種類のペイロードでは最初に評価した結果を再利用）/ '0'〜'7'（固定）
+MASK_CHOICES = ['auto', 'memo'] + [str(pattern) for pattern in range(8)]
+
+# (バージョン, エラー訂正レベル, モード, 長さ) → 最良のマスクパターン
+_mask_memo = {}
+
+def build_qr(data, error_correction='M', box_size=10, border=4, mask='auto'):
+    """データを追加して符号化済みの qrcode.QRCode を返す
+    
+    バージョンは qrcode の best_fit() で決め、マスクパターンは mask の指定に従って選びます。
+    符号化の時間はほぼマスクの評価（8種類の行列を作ってペナルティを計算）で占められるので、
+    'memo' や固定マスクは8種類の評価を省くぶん速くなりますが、
+    ペナルティ最小ではないマスクになることがあります（読み取りには問題ありません）。
+    """
+    import qrcode
     
     # QRCodeオブジェクトを作成
     qr = qrcode.QRCode(
-        version=1,  # 自動サイズ調整
-        error_correction=error_levels[error_correction],
+        error_correction=ERROR_LEVELS[error_correction],
         box_size=box_size,
         border=border,
     )
     
     # データを追加
     qr.add_data(data)
-    qr.make(fit=True)
-    
-    # スタイルに応じて画像を生成
-    if STYLED_FEATURES and style == 'round':
-        img = qr.make_image(
-            image_factory=StyledPilImage,
-            module_drawer=RoundedModuleDrawer(),
-            color_mask=SolidFillColorMask(front_color=fill_color, back_color=back_color)
+    qr.best_fit()
+    
+    if mask == 'auto':
+        qr.make(fit=False)
+    elif mask == 'memo':
+        memo_key = (qr.version, error_correction, tuple((chunk.mode, len(chunk)) for chunk in qr.data_list))
+        pattern = _mask_memo.get(memo_key)
+        if pattern is None:
+            pattern = _mask_memo[memo_key] = qr.best_mask_pattern()
+        qr.makeImpl(False, pattern)
+    else:
+        qr.mask_pattern = int(mask)
+        qr.make(fit=False)
+    return qr
+
+def make_qr_image(qr, style='square', fill_color='black', back_color='white', renderer='auto'):
+    """スタイルに応じて画像を生成"""
+    styled = _load_styled_drawers() if style in ('round', 'circle') else None
+    if styled:
+        from PIL import ImageColor
+        # SolidFillColorMask は RGB のタプルで色を受け取る
+        return qr.make_image(
+            image_factory=styled['image_factory'],
+            module_drawer=styled[style](),
+            color_mask=styled['color_mask'](
+                front_color=ImageColor.getrgb(fill_color),
+                back_color=ImageColor.getrgb(back_color)
+            )
         )
-    elif STYLED_FEATURES and style == 'circle':
-        img = qr.make_image(
-            image_factory=StyledPilImage,
-            module_drawer=CircleModuleDrawer(),
-            color_mask=SolidFillColorMask(front_color=fill_color, back_color=back_color)
+    if _use_numpy(renderer, qr):
+        return render_square_numpy(qr, fill_color=fill_color, back_color=back_color)
+    # square (default) or fallback
+    return qr.make_image(fill_color=fill_color, back_color=back_color)
+
+@contextmanager
+def replacing_output(output_path):
+    """output_path と同じディレクトリの一時ファイルへ書き、書き終えたら output_path と置き換える
+
+    既存のファイルを開いて書き換えることはないので、書き込みが途中で失敗しても
+    以前の出力は壊れません。
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def create_qr_code(data, output_path, box_size=10, border=4, error_correction='M', style='square', 
+                   fill_color='black', back_color='white', cache=None, renderer='auto', mask='auto'):
+    """QRコードを生成（cache に QRCache を渡すと同じ内容の画像を再利用）
+
+    renderer は square スタイルの描画方法: 'numpy'（高速）/ 'pil'（qrcode 標準）/
+    'auto'（NumPy があれば numpy）。出力ファイルの拡張子が .svg / .pdf の場合は
+    ラスタライズせずにベクター形式で書き出します。
+    """
+    
+    vector_format = VECTOR_FORMATS.get(Path(output_path).suffix.lower())
+    
+    if cache is not None:
+        cache_key = QRCache.make_key(
+            data, output_path,
+            error_correction=error_correction, box_size=box_size, border=border,
+            style=style, fill_color=fill_color, back_color=back_color, mask=mask
         )
-    else:  # square (default) or fallback
-        img = qr.make_image(fill_color=fill_color, back_color=back_color)
+        if cache.fetch(cache_key, output_path):
+            if vector_format:
+                return VectorImage(_read_vector_size(output_path), vector_format)
+            from PIL import Image
+            with Image.open(output_path) as img:
+                return img
+    
+    qr = build_qr(data, error_correction=error_correction, box_size=box_size, border=border, mask=mask)
     
-    # ファイル保存
-    img.save(output_path)
+    # ファイル保存（キャッシュの有無にかかわらず、既存の出力ファイルは書き換えずに置き換える）
+    if vector_format:
+        with replacing_output(output_path) as f:
+            img = write_vector(qr, f, vector_format, style=style, fill_color=fill_color, back_color=back_color)
+    else:
+        img = make_qr_image(qr, style=style, fill_color=fill_color, back_color=back_color, renderer=renderer)
+        # qrcode の PilImage と同じく拡張子に関わらず PNG で保存
+        with replacing_output(output_path) as f:
+            img.save(f, format='PNG')
+    if cache is not None:
+        cache.store(cache_key, output_path)
     return img
 
+class QRMatrix:
+    """1モジュール1ビットに詰めたQRコードのモジュール行列（ボーダー込み）
+
+    各行は MSB から詰めて stride バイト単位に揃えています（1 = 暗モジュール）。
+    buffer は data をコピーせずに参照する memoryview です。Python 3.12 以降は
+    バッファプロトコル（__buffer__）にも対応するので memoryview(matrix) や
+    bytes(matrix) でも同じバッファを参照できます（3.11 以前は buffer を使ってください）。
+    """
+
+    def __init__(self, width, data):
+        self.width = width
+        self.stride = (width + 7) // 8
+        self.data = data
+
+    @property
+    def buffer(self):
+        return memoryview(self.data)
+
+    def __buffer__(self, flags):
+        return memoryview(self.data)
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, position):
+        row, col = position
+        return bool(self.data[row * self.stride + col // 8] & (0x80 >> (col % 8)))
+
+    def row(self, row):
+        """1行分のバッファ（コピーなし）"""
+        start = row * self.stride
+        return self.buffer[start:start + self.stride]
+
+def qr_matrix(data, error_correction='M', border=4, mask='auto'):
+    """QRコードを画像にせず、詰めたビット行列（QRMatrix）として返す
+
+    PIL の画像生成も rich も使わないので、行列やバイト列だけが欲しい処理から呼び出せます。
+    """
+    qr = build_qr(data, error_correction=error_correction, box_size=1, border=border, mask=mask)
+    modules = qr.get_matrix()
+    width = len(modules)
+    stride = (width + 7) // 8
+    padding = '0' * (stride * 8 - width)
+    packed = bytearray()
+    for row in modules:
+        bits = ''.join('1' if module else '0' for module in row) + padding
+        packed += int(bits, 2).to_bytes(stride, 'big')
+    return QRMatrix(width, packed)
+
+def _scaled_rows(matrix, box_size, invert=False):
+    """box_size 倍に拡大した行のビット列を (バイト列, 繰り返し回数) で返す"""
+    pixel_width = matrix.width * box_size
+    stride = (pixel_width + 7) // 8
+    padding = '0' * (stride * 8 - pixel_width)
+    dark, light = ('0', '1') if invert else ('1', '0')
+    expand = str.maketrans({'1': dark * box_size, '0': light * box_size})
+    for row in range(matrix.width):
+        bits = format(int.from_bytes(matrix.row(row), 'big'), f'0{matrix.stride * 8}b')
+        bits = bits[:matrix.width].translate(expand) + padding
+        yield int(bits, 2).to_bytes(stride, 'big'), box_size
+
+def write_pbm(matrix, fp, box_size=10):
+    """QRMatrix をバイナリ PBM (P4) としてファイルオブジェクトへ書き出す"""
+    pixel_width = matrix.width * box_size
+    fp.write(f"P4\n{pixel_width} {pixel_width}\n".encode('ascii'))
+    for scanline, repeat in _scaled_rows(matrix, box_size):
+        fp.write(scanline * repeat)
+
+def _png_chunk(chunk_type, payload):
+    """PNG チャンク（長さ + 種別 + データ + CRC）"""
+    return (
+        struct.pack('>I', len(payload)) + chunk_type + payload
+        + struct.pack('>I', zlib.crc32(chunk_type + payload))
+    )
+
+def write_png(matrix, fp, box_size=10):
+    """QRMatrix を1ビットグレースケール PNG としてファイルオブジェクトへ書き出す
+
+    圧縮済みのデータが出来た分から IDAT チャンクとして書き出すので、
+    画像全体をメモリに組み立てません。
+    """
+    pixel_width = matrix.width * box_size
+    fp.write(b'\x89PNG\r\n\x1a\n')
+    fp.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', pixel_width, pixel_width, 1, 0, 0, 0, 0)))
+    compressor = zlib.compressobj(9)
+    for scanline, repeat in _scaled_rows(matrix, box_size, invert=True):
+        compressed = compressor.compress((b'\x00' + scanline) * repeat)
+        if compressed:
+            fp.write(_png_chunk(b'IDAT', compressed))
+    fp.write(_png_chunk(b'IDAT', compressor.flush()))
+    fp.write(_png_chunk(b'IEND', b''))
+
+def stream_qr_code(data, fp, image_format='png', box_size=10, border=4, error_correction='M',
+                   style='square', fill_color='black', back_color='white', mask='auto'):
+    """QRコードを一時ファイルを作らずにファイルオブジェクト（標準出力など）へ書き出す
+
+    白黒の square スタイルは PIL を使わずに PNG / PBM を直接書き出し、
+    それ以外のスタイルや色の PNG は PIL で描画してから書き出します。SVG / PDF はベクター形式です。
+    """
+    if image_format in ('svg', 'pdf'):
+        qr = build_qr(data, error_correction=error_correction, box_size=box_size, border=border, mask=mask)
+        write_vector(qr, fp, image_format, style=style, fill_color=fill_color, back_color=back_color)
+        fp.flush()
+        return
+    
+    monochrome = (
+        style == 'square'
+        and str(fill_color).lower() == 'black'
+        and str(back_color).lower() == 'white'
+    )
+    if image_format == 'pbm':
+        if not monochrome:
+            raise ValueError("PBM は白黒の square スタイルのみ対応しています")
+        write_pbm(qr_matrix(data, error_correction=error_correction, border=border, mask=mask), fp, box_size)
+    elif monochrome:
+        write_png(qr_matrix(data, error_correction=error_correction, border=border, mask=mask), fp, box_size)
+    else:
+        qr = build_qr(data, error_correction=error_correction, box_size=box_size, border=border, mask=mask)
+        img = make_qr_image(qr, style=style, fill_color=fill_color, back_color=back_color)
+        img.save(fp, format='PNG')
+    fp.flush()
+
+# ベクター形式（拡張子 → 形式）
+VECTOR_FORMATS = {'.svg': 'svg', '.pdf': 'pdf'}
+
+class VectorImage:
+    """SVG / PDF で書き出したQRコードの情報（PIL 画像の代わりに size を持つ）"""
+
+    def __init__(self, size, image_format):
+        self.size = size
+        self.format = image_format
+
+def _vector_shapes(qr, style):
+    """暗モジュールを行ごとの図形に変換する（座標はボーダー込みのモジュール単位）
+
+    square / round は横に連続する暗モジュールを1つの矩形（run）にまとめます。
+    round の角は qrcode の RoundedModuleDrawer と同じく、その角に接する上下・左右の
+    モジュールがどちらも明るい場合だけ丸めます。circle はモジュールごとの円です。
+    """
+    modules = qr.modules
+    count = qr.modules_count
+    border = qr.border
+
+    def active(row, col):
+        return 0 <= row < count and 0 <= col < count and bool(modules[row][col])
+
+    for row in range(count):
+        shapes = []
+        y = row + border
+        col = 0
+        while col < count:
+            if not modules[row][col]:
+                col += 1
+                continue
+            if style == 'circle':
+                shapes.append(('circle', col + border, y))
+                col += 1
+                continue
+            start = col
+            while col < count and modules[row][col]:
+                col += 1
+            last = col - 1
+            if style == 'round':
+                corners = (
+                    not active(row - 1, start),  # 左上
+                    not active(row - 1, last),   # 右上
+                    not active(row + 1, last),   # 右下
+                    not active(row + 1, start),  # 左下
+                )
+            else:
+                corners = (False, False, False, False)
+            shapes.append(('run', start + border, y, col - start, corners))
+        if shapes:
+            yield shapes
+
+def _num(value):
+    """座標を短い文字列にする（0.5 → .5）"""
+    text = f"{value:g}"
+    return text[1:] if text.startswith('0.') else text
+
+def _svg_path(shape):
+    """図形1つ分の SVG パスデータ"""
+    if shape[0] == 'circle':
+        _, x, y = shape
+        return f"M{x} {_num(y + 0.5)}a.5 .5 0 1 1 1 0a.5 .5 0 1 1-1 0z"
+
+    _, x, y, width, (nw, ne, se, sw) = shape
+    if not any((nw, ne, se, sw)):
+        return f"M{x} {y}h{width}v1h-{width}z"
+    right = x + width
+    parts = [f"M{_num(x + 0.5 if nw else x)} {y}H{_num(right - 0.5 if ne else right)}"]
+    parts.append(f"a.5 .5 0 0 1 .5 .5V{_num(y + 0.5 if se else y + 1)}" if ne
+                 else f"V{_num(y + 0.5 if se else y + 1)}")
+    if se:
+        parts.append("a.5 .5 0 0 1-.5 .5")
+    parts.append(f"H{_num(x + 0.5 if sw else x)}")
+    if sw:
+        parts.append("a.5 .5 0 0 1-.5-.5")
+    parts.append(f"V{_num(y + 0.5 if nw else y)}")
+    if nw:
+        parts.append("a.5 .5 0 0 1 .5-.5")
+    parts.append("z")
+    return ''.join(parts)
+
+def write_svg(qr, fp, style='square', fill_color='black', back_color='white'):
+    """QRコードを SVG として1行ずつファイルオブジェクト（バイナリ）へ書き出す"""
+    from html import escape
+
+    width = qr.modules_count + qr.border * 2
+    pixel_size = width * qr.box_size
+    fp.write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixel_size}" height="{pixel_size}" '
+        f'viewBox="0 0 {width} {width}" shape-rendering="crispEdges">\n'.encode('utf-8')
+    )
+    if str(back_color).lower() != 'transparent':
+        fp.write(f'<rect width="100%" height="100%" fill="{escape(str(back_color))}"/>\n'.encode('utf-8'))
+    fp.write(f'<path fill="{escape(str(fill_color))}" d="'.encode('utf-8'))
+    for shapes in _vector_shapes(qr, style):
+        fp.write((''.join(_svg_path(shape) for shape in shapes) + '\n').encode('ascii'))
+    fp.write(b'"/>\n</svg>\n')
+
+# 4分の1円をベジェ曲線で近似するときの制御点の係数
+_BEZIER_ARC = 0.5523
+
+def _pdf_path(shape):
+    """図形1つ分の PDF パス演算子（y 軸は下向きに変換済みの座標系）"""
+    k = 0.5 * _BEZIER_ARC
+    if shape[0] == 'circle':
+        _, x, y = shape
+        cx, cy = x + 0.5, y + 0.5
+        return (
+            f"{_num(cx + 0.5)} {_num(cy)} m "
+            f"{_num(cx + 0.5)} {_num(cy + k)} {_num(cx + k)} {_num(cy + 0.5)} {_num(cx)} {_num(cy + 0.5)} c "
+            f"{_num(cx - k)} {_num(cy + 0.5)} {_num(cx - 0.5)} {_num(cy + k)} {_num(cx - 0.5)} {_num(cy)} c "
+            f"{_num(cx - 0.5)} {_num(cy - k)} {_num(cx - k)} {_num(cy - 0.5)} {_num(cx)} {_num(cy - 0.5)} c "
+            f"{_num(cx + k)} {_num(cy - 0.5)} {_num(cx + 0.5)} {_num(cy - k)} {_num(cx + 0.5)} {_num(cy)} c h "
+        )
+
+    _, x, y, width, (nw, ne, se, sw) = shape
+    if not any((nw, ne, se, sw)):
+        return f"{x} {y} {width} 1 re "
+    right, bottom = x + width, y + 1
+    ops = [f"{_num(x + 0.5 if nw else x)} {y} m {_num(right - 0.5 if ne else right)} {y} l"]
+    if ne:
+        ops.append(f"{_num(right - 0.5 + k)} {y} {right} {_num(y + 0.5 - k)} {right} {_num(y + 0.5)} c")
+    ops.append(f"{right} {_num(bottom - 0.5 if se else bottom)} l")
+    if se:
+        ops.append(f"{right} {_num(bottom - 0.5 + k)} {_num(right - 0.5 + k)} {bottom} {_num(right - 0.5)} {bottom} c")
+    ops.append(f"{_num(x + 0.5 if sw else x)} {bottom} l")
+    if sw:
+        ops.append(f"{_num(x + 0.5 - k)} {bottom} {x} {_num(bottom - 0.5 + k)} {x} {_num(bottom - 0.5)} c")
+    ops.append(f"{x} {_num(y + 0.5 if nw else y)} l")
+    if nw:
+        ops.append(f"{x} {_num(y + 0.5 - k)} {_num(x + 0.5 - k)} {y} {_num(x + 0.5)} {y} c")
+    ops.append("h ")
+    return ' '.join(ops)
+
+class _CountingWriter:
+    """書き込んだバイト数を数える（PDF の xref にオブジェクトの位置が必要なため）"""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.offset = 0
+
+    def write(self, data):
+        self.fp.write(data)
+        self.offset += len(data)
+
+def write_pdf(qr, fp, style='square', fill_color='black', back_color='white'):
+    """QRコードを1ページの PDF としてファイルオブジェクト（バイナリ）へ書き出す
+
+    ページの内容は行ごとに Flate 圧縮しながら書き出し、長さは後続のオブジェクトで指定します。
+    """
+    from PIL import ImageColor
+
+    def pdf_color(color):
+        return ' '.join(_num(round(channel / 255, 4)) for channel in ImageColor.getrgb(color)[:3])
+
+    width = qr.modules_count + qr.border * 2
+    pixel_size = width * qr.box_size
+    out = _CountingWriter(fp)
+    offsets = {}
+
+    def begin_object(number):
+        offsets[number] = out.offset
+        out.write(f"{number} 0 obj\n".encode('ascii'))
+
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    begin_object(1)
+    out.write(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+    begin_object(2)
+    out.write(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+    begin_object(3)
+    out.write(
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pixel_size} {pixel_size}] "
+        f"/Contents 4 0 R /Resources << >> >>\nendobj\n".encode('ascii')
+    )
+
+    begin_object(4)
+    out.write(b"<< /Length 5 0 R /Filter /FlateDecode >>\nstream\n")
+    stream_start = out.offset
+    compressor = zlib.compressobj(9)
+
+    def emit(text):
+        compressed = compressor.compress(text.encode('ascii'))
+        if compressed:
+            out.write(compressed)
+
+    # 1モジュール = box_size pt、原点を左上にして y 軸を下向きにする
+    emit(f"{qr.box_size} 0 0 -{qr.box_size} 0 {pixel_size} cm\n")
+    if str(back_color).lower() != 'transparent':
+        emit(f"{pdf_color(back_color)} rg 0 0 {width} {width} re f\n")
+    emit(f"{pdf_color(fill_color)} rg\n")
+    for shapes in _vector_shapes(qr, style):
+        emit(''.join(_pdf_path(shape) for shape in shapes) + "\n")
+    emit("f\n")
+    out.write(compressor.flush())
+    stream_length = out.offset - stream_start
+    out.write(b"\nendstream\nendobj\n")
+    begin_object(5)
+    out.write(f"{stream_length}\nendobj\n".encode('ascii'))
+
+    xref_offset = out.offset
+    out.write(b"xref\n0 6\n0000000000 65535 f \n")
+    for number in range(1, 6):
+        out.write(f"{offsets[number]:010d} 00000 n \n".encode('ascii'))
+    out.write(f"trailer\n<< /Size 6 /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii'))
+
+def write_vector(qr, fp, image_format, style='square', fill_color='black', back_color='white'):
+    """SVG / PDF 形式で書き出し、VectorImage を返す"""
+    writer = write_pdf if image_format == 'pdf' else write_svg
+    writer(qr, fp, style=style, fill_color=fill_color, back_color=back_color)
+    pixel_size = (qr.modules_count + qr.border * 2) * qr.box_size
+    return VectorImage((pixel_size, pixel_size), image_format)
+
+def _read_vector_size(path):
+    """write_svg / write_pdf で書き出したファイルの先頭から画像サイズを読み取る"""
+    import re
+    with open(path, 'rb') as f:
+        head = f.read(1024)
+    match = re.search(rb'width="(\d+)" height="(\d+)"', head) or \
+        re.search(rb'/MediaBox \[0 0 (\d+) (\d+)\]', head)
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+# マニフェストの列名と create_qr_code() の引数の対応
+MANIFEST_OPTIONS = {
+    'size': ('box_size', int),
+    'border': ('border', int),
+    'error_level': ('error_correction', str),
+    'style': ('style', str),
+    'fill_color': ('fill_color', str),
+    'back_color': ('back_color', str),
+    'mask': ('mask', str),
+}
+
+def parse_manifest_line(line):
+    """JSONL マニフェストの1行を行データ（dict）に変換（JSON として読めない・形が違う行は ValueError）"""
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON として読めません: {e}")
+    if not isinstance(row, dict):
+        raise ValueError(f"1行に1つの JSON オブジェクトが必要です（{type(row).__name__} でした）")
+    # {"text": ..., "output": ..., "options": {...}} 形式にも対応
+    options = row.pop('options', None) or {}
+    if not isinstance(options, dict):
+        raise ValueError("options は JSON オブジェクトで指定してください")
+    row.update(options)
+    return row
+
+def read_manifest(manifest_path):
+    """CSV / JSONL マニフェストを1行ずつ読み込む（(行番号, 行データ, エラー) を返すジェネレータ）
+
+    読めない行は行データを None、エラーにその理由を入れて返し、残りの行の読み込みを続けます。
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, newline='', encoding='utf-8') as f:
+        if manifest_path.suffix.lower() in ('.jsonl', '.ndjson'):
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, parse_manifest_line(line), None
+                except ValueError as e:
+                    yield line_no, None, str(e)
+        else:
+            # 1行目はヘッダー（text,output[,size,border,...]）
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row, None
+
+def manifest_row_to_job(row, defaults):
+    """マニフェストの1行を create_qr_code() の引数に変換"""
+    text = row.get('text')
+    output = row.get('output')
+    if not text or not output:
+        raise ValueError("text と output は必須です")
+
+    options = dict(defaults)
+    for column, (name, convert) in MANIFEST_OPTIONS.items():
+        value = row.get(column)
+        if value not in (None, ''):
+            options[name] = convert(value)
+    return text, output, options
+
+def _render_chunk(chunk):
+    """ワーカープロセスでチャンク内のQRコードを生成し、行ごとの結果を返す"""
+    results = []
+    for line_no, text, output, options in chunk:
+        started = time.perf_counter()
+        try:
+            output_path = Path(output)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            create_qr_code(text, output_path, **options)
+            status, error = 'ok', ''
+        except Exception as e:
+            status, error = 'error', str(e)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        results.append((line_no, output, status, error, elapsed_ms))
+    return results
+
+def _iter_chunks(manifest_path, defaults, chunk_size, failures):
+    """マニフェストをチャンク単位に分割（変換できない行は failures に積む）"""
+    chunk = []
+    for line_no, row, error in read_manifest(manifest_path):
+        if error is not None:
+            failures.append((line_no, '', 'error', error, 0.0))
+            continue
+        try:
+            text, output, options = manifest_row_to_job(row, defaults)
+        except (ValueError, TypeError) as e:
+            failures.append((line_no, row.get('output', ''), 'error', str(e), 0.0))
+            continue
+        chunk.append((line_no, text, output, options))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def run_batch(manifest_path, report_path, defaults, workers=None, chunk_size=64):
+    """マニフェストの全行をプロセスプールで生成し、行ごとの結果をレポートに書き出す
+
+    投入中のチャンク数をワーカー数の2倍までに抑えるので、
+    巨大なマニフェストでもメモリを使い切らずに処理できます。
+    """
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    counts = {'ok': 0, 'error': 0}
+    started = time.perf_counter()
+
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', newline='', encoding='utf-8') as report_file, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.writer(report_file)
+        writer.writerow(['line', 'output', 'status', 'error', 'elapsed_ms'])
+
+        def write_results(results):
+            for line_no, output, status, error, elapsed_ms in results:
+                writer.writerow([line_no, output, status, error, f"{elapsed_ms:.2f}"])
+                counts[status] += 1
+
+        failures = []
+        pending = set()
+        for chunk in _iter_chunks(manifest_path, defaults, chunk_size, failures):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write_results(future.result())
+            pending.add(executor.submit(_render_chunk, chunk))
+            write_results(failures)
+            failures.clear()
+
+        for future in pending:
+            write_results(future.result())
+        write_results(failures)
+
+    elapsed = time.perf_counter() - started
+    return counts['ok'], counts['error'], elapsed
+
 def display_qr_info(data, output_path, qr_size, style, error_correction):
     """生成されたQRコードの情報を表示"""
+    from rich.table import Table
+    from rich import box
+    console = get_console()
     
     # 情報テーブルの作成
     table = Table(title="📊 生成されたQRコード情報", box=box.ROUNDED)
@@ -105,6 +883,10 @@ def display_qr_info(data, output_path, qr_size, style, error_correction):
 
 def show_help_info():
     """使用方法の詳細を表示"""
+    from rich.panel import Panel
+    from rich.text import Text
+    console = get_console()
+    
     help_text = Text()
     help_text.append("🎯 QRコード生成スクリプト\n\n", style="bold cyan")
     help_text.append("基本的な使用方法:\n", style="bold yellow")
@@ -115,7 +897,8 @@ def show_help_info():
     help_text.append("  --error-level L/M/Q/H  エラー訂正レベル (デフォルト: M)\n", style="white")
     help_text.append("  --style square/round/circle  スタイル (デフォルト: square)\n", style="white")
     help_text.append("  --fill-color COLOR  前景色 (デフォルト: black)\n", style="white")
-    help_text.append("  --back-color COLOR  背景色 (デフォルト: white)\n\n", style="white")
+    help_text.append("  --back-color COLOR  背景色 (デフォルト: white)\n", style="white")
+    help_text.append("  --quiet            rich を使わず何も表示しない（シェルのループ向け）\n\n", style="white")
     help_text.append("使用例:\n", style="bold yellow")
     help_text.append("  python qr.py \"https://example.com\" qr.png\n", style="green")
     help_text.append("  python qr.py \"Hello World\" hello.png --style round\n", style="green")
@@ -126,6 +909,144 @@ def show_help_info():
     console.print(panel)
     console.print()
 
+def display_cache_stats(cache):
+    """キャッシュの統計情報を表示"""
+    from rich.table import Table
+    from rich import box
+    console = get_console()
+    
+    stats = cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+    
+    table = Table(title="🗄️ QRコードキャッシュ", box=box.ROUNDED)
+    table.add_column("項目", style="bold cyan", width=20)
+    table.add_column("内容", style="bold white")
+    table.add_row("📂 保存先", str(cache.cache_dir))
+    table.add_row("✅ ヒット", str(stats['hits']))
+    table.add_row("❌ ミス", str(stats['misses']))
+    table.add_row("🎯 ヒット率", f"{hit_rate:.1f}%")
+    table.add_row("📦 エントリ数", str(stats['entries']))
+    table.add_row("📁 使用量", f"{stats['bytes'] / (1024 * 1024):.1f} / {cache.max_bytes / (1024 * 1024):.0f} MB")
+    
+    console.print()
+    console.print(table)
+    console.print()
+
+def run_batch_command(args, cache=None):
+    """--batch 指定時の一括生成と結果表示"""
+    defaults = {
+        'box_size': args.size,
+        'border': args.border,
+        'error_correction': args.error_level,
+        'style': args.style,
+        'fill_color': args.fill_color,
+        'back_color': args.back_color,
+        'mask': args.mask,
+        'cache': cache,
+        # 一括生成では NumPy の import 時間を全行で償却できるので auto なら常に使う
+        'renderer': 'numpy' if args.renderer == 'auto' and _numpy_available() else args.renderer,
+    }
+    
+    if args.quiet:
+        try:
+            ok, failed, elapsed = run_batch(
+                args.batch, args.report, defaults, workers=args.workers, chunk_size=args.chunk_size
+            )
+        except (OSError, ValueError) as e:
+            print(f"qr.py: エラー: {e}", file=sys.stderr)
+            sys.exit(1)
+        if failed:
+            sys.exit(1)
+        return
+    
+    from rich.panel import Panel
+    console = get_console()
+    try:
+        with console.status("[bold green]QRコードを一括生成中..."):
+            ok, failed, elapsed = run_batch(
+                args.batch,
+                args.report,
+                defaults,
+                workers=args.workers,
+                chunk_size=args.chunk_size
+            )
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]❌ マニフェストを処理できませんでした:[/bold red] {e}")
+        sys.exit(1)
+    
+    total = ok + failed
+    throughput = total / elapsed if elapsed > 0 else 0.0
+    border_style = "green" if failed == 0 else "yellow"
+    summary_panel = Panel(
+        f"[bold green]✅ 成功: {ok}[/bold green]  [bold red]❌ 失敗: {failed}[/bold red]\n"
+        f"⏱️ 所要時間: {elapsed:.2f} 秒\n"
+        f"🚀 スループット: {throughput:.1f} codes/sec\n"
+        f"📄 レポート: {args.report}",
+        title="🎉 一括生成完了",
+        border_style=border_style
+    )
+    console.print()
+    console.print(summary_panel)
+    console.print()
+    
+    if failed:
+        sys.exit(1)
+
+def stream_command(args):
+    """output が "-" または --format 指定時: 画像のバイト列を標準出力やファイルへ直接書き出す"""
+    image_format = args.format
+    if image_format is None:
+        suffix = Path(args.output).suffix.lower()
+        image_format = 'pbm' if suffix == '.pbm' else VECTOR_FORMATS.get(suffix, 'png')
+    
+    options = dict(
+        image_format=image_format,
+        box_size=args.size,
+        border=args.border,
+        error_correction=args.error_level,
+        style=args.style,
+        fill_color=args.fill_color,
+        back_color=args.back_color,
+        mask=args.mask
+    )
+    try:
+        if args.output == '-':
+            stream_qr_code(args.text, sys.stdout.buffer, **options)
+        else:
+            with replacing_output(args.output) as f:
+                stream_qr_code(args.text, f, **options)
+    except BrokenPipeError:
+        # 読み手が先に終了した（| head など）。終了時のフラッシュでも失敗しないよう標準出力を捨てる
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    except (OSError, ValueError) as e:
+        # 標準出力は画像データ用なので、メッセージは標準エラーへ
+        print(f"qr.py: エラー: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def quiet_command(args, cache=None):
+    """--quiet 指定時: rich を読み込まずに生成だけ行う"""
+    try:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        create_qr_code(
+            args.text,
+            output_path,
+            box_size=args.size,
+            border=args.border,
+            error_correction=args.error_level,
+            style=args.style,
+            fill_color=args.fill_color,
+            back_color=args.back_color,
+            cache=cache,
+            renderer=args.renderer,
+            mask=args.mask
+        )
+    except Exception as e:
+        print(f"qr.py: エラー: {e}", file=sys.stderr)
+        sys.exit(1)
+
 def main():
     """メイン関数"""
     parser = argparse.ArgumentParser(
@@ -141,12 +1062,21 @@ def main():
     
     parser.add_argument(
         'text',
+        nargs='?',
         help='QRコードに埋め込むテキスト'
     )
     
     parser.add_argument(
         'output',
-        help='出力ファイル名（.png, .jpg, .jpeg対応）'
+        nargs='?',
+        help='出力ファイル名（.png, .jpg, .jpeg, .svg, .pdf対応。"-" で標準出力へ書き出し）'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=['png', 'pbm', 'svg', 'pdf'],
+        default=None,
+        help='標準出力へ書き出すときの画像形式 (デフォルト: 出力ファイルの拡張子、なければ png)'
     )
     
     parser.add_argument(
@@ -170,13 +1100,10 @@ def main():
         help='エラー訂正レベル L(~7%%) M(~15%%) Q(~25%%) H(~30%%) (デフォルト: M)'
     )
     
-    style_choices = ['square']
-    if STYLED_FEATURES:
-        style_choices.extend(['round', 'circle'])
-    
+    # round / circle が使えない環境では square で描画（確認のための import は起動を遅くするので行わない）
     parser.add_argument(
         '--style',
-        choices=style_choices,
+        choices=['square', 'round', 'circle'],
         default='square',
         help='QRコードのスタイル (デフォルト: square)'
     )
@@ -193,6 +1120,76 @@ def main():
         help='背景色 (デフォルト: white)'
     )
     
+    parser.add_argument(
+        '--renderer',
+        choices=['auto', 'numpy', 'pil'],
+        default='auto',
+        help='square スタイルの描画方法 (デフォルト: auto = NumPy があれば numpy)'
+    )
+    
+    parser.add_argument(
+        '--mask',
+        choices=MASK_CHOICES,
+        default='auto',
+        help='マスクパターン: auto（8種類を評価）/ memo（同じ種類のデータで結果を再利用）/ 0-7（固定） (デフォルト: auto)'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        metavar='MANIFEST',
+        help='CSV / JSONL マニフェストから一括生成（列: text, output, size, border, error_level, style, fill_color, back_color, mask）'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='一括生成のワーカープロセス数 (デフォルト: CPUコア数)'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=64,
+        help='ワーカーに一度に渡す行数 (デフォルト: 64)'
+    )
+    
+    parser.add_argument(
+        '--report',
+        default='qr_batch_report.csv',
+        help='一括生成の行ごとの結果レポート (デフォルト: qr_batch_report.csv)'
+    )
+    
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help=f'生成済み画像のキャッシュを使う (保存先: {DEFAULT_CACHE_DIR})'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help='キャッシュの保存先（指定するとキャッシュを有効化）'
+    )
+    
+    parser.add_argument(
+        '--cache-max-mb',
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+        help='キャッシュの上限サイズ MB (デフォルト: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--cache-stats',
+        action='store_true',
+        help='キャッシュのヒット数・ミス数を表示'
+    )
+    
+    parser.add_argument(
+        '--quiet', '-q',
+        action='store_true',
+        help='rich を使わず何も表示しない（エラーは標準エラーへ）'
+    )
+    
     parser.add_argument(
         '--help-detail',
         action='store_true',
@@ -210,6 +1207,34 @@ def main():
         show_help_info()
         return
     
+    cache = None
+    if args.cache or args.cache_dir or args.cache_stats:
+        cache = QRCache(args.cache_dir or DEFAULT_CACHE_DIR, args.cache_max_mb * 1024 * 1024)
+    
+    if args.cache_stats:
+        if args.quiet:
+            print(json.dumps(cache.stats()))
+        else:
+            display_cache_stats(cache)
+        return
+    
+    if args.batch:
+        run_batch_command(args, cache)
+        return
+    
+    if not args.text or not args.output:
+        parser.error("text と output を指定してください（一括生成の場合は --batch MANIFEST）")
+    
+    if args.output == '-' or args.format:
+        stream_command(args)
+        return
+    
+    if args.quiet:
+        quiet_command(args, cache)
+        return
+    
+    from rich.panel import Panel
+    console = get_console()
     try:
         output_path = Path(args.output)
         
@@ -226,7 +1251,10 @@ def main():
                 error_correction=args.error_level,
                 style=args.style,
                 fill_color=args.fill_color,
-                back_color=args.back_color
+                back_color=args.back_color,
+                cache=cache,
+                renderer=args.renderer,
+                mask=args.mask
             )
         
         # 成功メッセージ
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = []
+# ///
+"""
+🧪 OpenWeatherMap 互換のローカルスタブサーバー
+ネットワークに出ずに weather.py の並行取得・キャッシュ・/group リクエストを試すためのサーバーです
+（標準ライブラリのみ。天気は都市IDから決まる疑似データを返します）
+
+    python stub_server.py --port 8766 --latency 50
+    python stub_server.py --error-rate 0.2 --rate-limit 50 --outage 10   # 障害を注入
+    python weather.py --api-base http://127.0.0.1:8766/data/2.5 \\
+        --build-city-index http://127.0.0.1:8766/sample/city.list.json.gz
+    OPENWEATHER_API_KEY=stub python weather.py --api-base http://127.0.0.1:8766/data/2.5 Tokyo Osaka -v
+
+--replay DIR を付けると weather.py / news.py の --record で記録した応答を（遅延・障害を加えて）配信します。
+天気は /data/2.5/... のまま、フィードは /ホスト/パス（news.py --replay http://127.0.0.1:8766）で問い合わせます
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from http_fixtures import FixtureStore, normalized_query
+
+# 組み込みの都市リスト（OWM の city.list.json と同じ形式。同名の都市も含めてある）
+CITIES = [
+    {'id': 1850147, 'name': 'Tokyo', 'state': '', 'country': 'JP', 'coord': {'lon': 139.6917, 'lat': 35.6895}},
+    {'id': 1853909, 'name': 'Osaka', 'state': '', 'country': 'JP', 'coord': {'lon': 135.5022, 'lat': 34.6937}},
+    {'id': 1857910, 'name': 'Kyoto', 'state': '', 'country': 'JP', 'coord': {'lon': 135.7539, 'lat': 35.0211}},
+    {'id': 1856057, 'name': 'Nagoya', 'state': '', 'country': 'JP', 'coord': {'lon': 136.9064, 'lat': 35.1815}},
+    {'id': 2128295, 'name': 'Sapporo', 'state': '', 'country': 'JP', 'coord': {'lon': 141.3469, 'lat': 43.0642}},
+    {'id': 1863967, 'name': 'Fukuoka', 'state': '', 'country': 'JP', 'coord': {'lon': 130.4181, 'lat': 33.6064}},
+    {'id': 1856035, 'name': 'Naha', 'state': '', 'country': 'JP', 'coord': {'lon': 127.6811, 'lat': 26.2125}},
+    {'id': 1835848, 'name': 'Seoul', 'state': '', 'country': 'KR', 'coord': {'lon': 126.9778, 'lat': 37.5683}},
+    {'id': 1816670, 'name': 'Beijing', 'state': '', 'country': 'CN', 'coord': {'lon': 116.3972, 'lat': 39.9075}},
+    {'id': 1796236, 'name': 'Shanghai', 'state': '', 'country': 'CN', 'coord': {'lon': 121.4581, 'lat': 31.2222}},
+    {'id': 1880252, 'name': 'Singapore', 'state': '', 'country': 'SG', 'coord': {'lon': 103.8501, 'lat': 1.2897}},
+    {'id': 2147714, 'name': 'Sydney', 'state': '', 'country': 'AU', 'coord': {'lon': 151.2073, 'lat': -33.8679}},
+    {'id': 2643743, 'name': 'London', 'state': '', 'country': 'GB', 'coord': {'lon': -0.1257, 'lat': 51.5085}},
+    {'id': 6058560, 'name': 'London', 'state': '', 'country': 'CA', 'coord': {'lon': -81.2497, 'lat': 42.9834}},
+    {'id': 2988507, 'name': 'Paris', 'state': '', 'country': 'FR', 'coord': {'lon': 2.3488, 'lat': 48.8534}},
+    {'id': 2950159, 'name': 'Berlin', 'state': '', 'country': 'DE', 'coord': {'lon': 13.4105, 'lat': 52.5244}},
+    {'id': 524901, 'name': 'Moscow', 'state': '', 'country': 'RU', 'coord': {'lon': 37.6156, 'lat': 55.7522}},
+    {'id': 5128581, 'name': 'New York', 'state': 'NY', 'country': 'US', 'coord': {'lon': -74.006, 'lat': 40.7143}},
+    {'id': 5368361, 'name': 'Los Angeles', 'state': 'CA', 'country': 'US', 'coord': {'lon': -118.2437, 'lat': 34.0522}},
+    {'id': 4887398, 'name': 'Chicago', 'state': 'IL', 'country': 'US', 'coord': {'lon': -87.65, 'lat': 41.85}},
+    {'id': 4250542, 'name': 'Springfield', 'state': 'IL', 'country': 'US', 'coord': {'lon': -89.6437, 'lat': 39.8017}},
+    {'id': 4409896, 'name': 'Springfield', 'state': 'MO', 'country': 'US', 'coord': {'lon': -93.2982, 'lat': 37.2153}},
+    {'id': 6167865, 'name': 'Toronto', 'state': '', 'country': 'CA', 'coord': {'lon': -79.4163, 'lat': 43.7001}},
+]
+
+# 疑似データに使う天気（OWM の condition ID, main, description, アイコン）
+CONDITIONS = [
+    (800, 'Clear', 'clear sky', '01'),
+    (801, 'Clouds', 'few clouds', '02'),
+    (802, 'Clouds', 'scattered clouds', '03'),
+    (803, 'Clouds', 'broken clouds', '04'),
+    (804, 'Clouds', 'overcast clouds', '04'),
+    (500, 'Rain', 'light rain', '10'),
+    (501, 'Rain', 'moderate rain', '10'),
+    (211, 'Thunderstorm', 'thunderstorm', '11'),
+    (600, 'Snow', 'light snow', '13'),
+    (701, 'Mist', 'mist', '50'),
+]
+
+# /group で指定できる都市IDの上限（OWM と同じ）
+GROUP_LIMIT = 20
+
+def normalize(text):
+    """weather.py の normalize_city と同じ正規化（大文字小文字・空白・カンマ前後の空白を無視）"""
+    text = re.sub(r'\s+', ' ', text.strip().casefold())
+    return re.sub(r'\s*,\s*', ',', text)
+
+def synthetic_cities(count, start_id=9000001):
+    """負荷試験用の架空の都市を count 件作る（Testcity 00000, ...）"""
+    return [
+        {'id': start_id + i, 'name': f'Testcity {i:05d}', 'state': '', 'country': 'ZZ',
+         'coord': {'lon': round(i % 360 - 180 + 0.5, 4), 'lat': round(i % 170 - 85 + 0.5, 4)}}
+        for i in range(count)
+    ]
+
+class CityTable:
+    """都市リストと、q= の検索に使う名前の索引"""
+
+    def __init__(self, cities):
+        self.cities = cities
+        self.by_id = {city['id']: city for city in cities}
+        self.by_name = {}
+        for city in cities:
+            name, country, state = city['name'], city['country'], city['state']
+            keys = [name, f"{name},{country}"]
+            if state:
+                keys.append(f"{name},{state},{country}")
+            for key in keys:
+                # OWM と同様、同名の都市は最初の1件を返す
+                self.by_name.setdefault(normalize(key), city)
+
+    def find(self, query):
+        return self.by_name.get(normalize(query))
+
+def weather_for(city, units='metric', now=None):
+    """都市IDから決まる疑似的な現在の天気（/weather と同じ形式）"""
+    now = int(now or time.time())
+    h = zlib.crc32(str(city['id']).encode())
+    condition_id, main, description, icon = CONDITIONS[h % len(CONDITIONS)]
+    temp = (h % 450) / 10 - 10
+    feels_like = temp - (h >> 8) % 40 / 10
+    wind_speed = (h >> 4) % 150 / 10
+    if units == 'imperial':
+        convert = lambda c: round(c * 9 / 5 + 32, 2)
+        wind_speed = round(wind_speed * 2.237, 2)
+    elif units == 'standard':
+        convert = lambda c: round(c + 273.15, 2)
+    else:
+        convert = lambda c: round(c, 2)
+    return {
+        'coord': city['coord'],
+        'weather': [{'id': condition_id, 'main': main, 'description': description, 'icon': f'{icon}d'}],
+        'base': 'stations',
+        'main': {
+            'temp': convert(temp),
+            'feels_like': convert(feels_like),
+            'temp_min': convert(temp - 1.5),
+            'temp_max': convert(temp + 1.5),
+            'pressure': 990 + (h >> 12) % 40,
+            'humidity': (h >> 16) % 100,
+        },
+        'visibility': 10000 - (h >> 20) % 8 * 1000,
+        'wind': {'speed': wind_speed, 'deg': (h >> 6) % 360},
+        'clouds': {'all': (h >> 10) % 101},
+        'dt': now,
+        'sys': {'country': city['country'], 'sunrise': now - 6 * 3600, 'sunset': now + 6 * 3600},
+        'timezone': 0,
+        'id': city['id'],
+        'name': city['name'],
+        'cod': 200,
+    }
+
+class FaultInjector:
+    """API 呼び出しに混ぜる障害の設定（既定ではすべて無効）
+
+    - outage: 起動から指定秒数のあいだ、すべての呼び出しに 503 を返す
+    - rate_limit: 1秒あたりの呼び出し数の上限。超えた分は 429 と Retry-After を返す
+    - error_rate: この割合の呼び出しに error_status（既定 503）を返す
+    - slow_rate: この割合の呼び出しで slow_seconds 秒待ってから応答する（クライアントのタイムアウト用）
+    """
+
+    def __init__(self, error_rate=0.0, error_status=503, rate_limit=0, retry_after=1,
+                 slow_rate=0.0, slow_seconds=15.0, outage=0.0, seed=None):
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.outage = outage
+        self.started = time.monotonic()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = (0, 0)
+
+    def inject(self):
+        """注入する障害を (ステータス, メッセージ, ヘッダー) で返す。None なら通常どおり応答する"""
+        now = time.monotonic()
+        with self.lock:
+            error_roll, slow_roll = self.random.random(), self.random.random()
+            second, calls = self.window
+            calls = calls + 1 if second == int(now) else 1
+            self.window = (int(now), calls)
+        if now - self.started < self.outage:
+            return 503, 'Service Unavailable (injected outage)', {}
+        if self.rate_limit and calls > self.rate_limit:
+            return 429, 'Too many requests (injected)', {'Retry-After': str(self.retry_after)}
+        if error_roll < self.error_rate:
+            return self.error_status, 'Injected error', {}
+        if slow_roll < self.slow_rate:
+            time.sleep(self.slow_seconds)
+        return None
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OWM の /data/2.5/weather・/data/2.5/group と都市リストを返すハンドラー"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        self.server.count('connections')
+        super().setup()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {'cod': str(status), 'message': message}, headers)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if self.server.fixtures is not None and url.path != '/stats':
+            fixture = self.server.fixtures.find(self.path)
+            if fixture is not None:
+                self.server.count('replayed')
+                self.handle_fixture(fixture)
+                return
+            # 記録がなければ通常の疑似データ（天気の API のみ）で応答する
+            self.server.count('not_recorded')
+        route = {
+            '/data/2.5/weather': self.handle_weather,
+            '/data/2.5/group': self.handle_group,
+            '/sample/city.list.json.gz': self.handle_city_list,
+            '/stats': self.handle_stats,
+        }.get(url.path.rstrip('/'))
+        if route is None:
+            if self.server.fixtures is not None:
+                self.send_error_json(404, f'記録がありません: {url.path.lstrip("/")}{normalized_query(url.query)}')
+            else:
+                self.send_error_json(404, 'Internal error: 404')
+            return
+        self.server.count(url.path.rstrip('/'))
+        route(params)
+
+    def inject_faults(self):
+        """遅延と障害を入れる（障害の応答を返したら False）"""
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        fault = self.server.faults.inject()
+        if fault is not None:
+            status, message, headers = fault
+            self.server.count(f'injected_{status}')
+            self.send_error_json(status, message, headers)
+            return False
+        return True
+
+    def check_api_call(self, params):
+        """遅延と障害を入れ、API キーがなければ 401 を返す（呼び出しを続けてよければ True）"""
+        if not self.inject_faults():
+            return False
+        if not params.get('appid'):
+            self.send_error_json(401, 'Invalid API key. Please see https://openweathermap.org/faq#error401 for more info.')
+            return False
+        return True
+
+    def handle_weather(self, params):
+        if not self.check_api_call(params):
+            return
+        if 'id' in params:
+            city = self.server.cities.by_id.get(int(params['id'])) if params['id'].isdigit() else None
+        else:
+            city = self.server.cities.find(params.get('q', ''))
+        if city is None:
+            self.send_error_json(404, 'city not found')
+            return
+        self.send_json(200, weather_for(city, params.get('units', 'standard')))
+
+    def handle_group(self, params):
+        if not self.check_api_call(params):
+            return
+        ids = [part for part in params.get('id', '').split(',') if part]
+        if not ids or not all(part.isdigit() for part in ids):
+            self.send_error_json(400, 'Invalid ID')
+            return
+        if len(ids) > GROUP_LIMIT:
+            self.send_error_json(400, f'Maximum number of cities is {GROUP_LIMIT}')
+            return
+        units = params.get('units', 'standard')
+        found = [self.server.cities.by_id[int(part)] for part in ids if int(part) in self.server.cities.by_id]
+        self.send_json(200, {'cnt': len(found), 'list': [weather_for(city, units) for city in found]})
+
+    def handle_fixture(self, fixture):
+        """記録した応答を返す。検証子が一致する条件付きリクエストには 304 を返す"""
+        if not self.inject_faults():
+            return
+        status, body = fixture.status, fixture.body
+        if fixture.not_modified(self.headers):
+            self.server.count('not_modified')
+            status, body = 304, b''
+        self.send_response(status)
+        for name, value in fixture.headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_city_list(self, params):
+        body = self.server.city_list_gz
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_stats(self, params):
+        """各エンドポイントの呼び出し回数と接続数（スタブ自身の確認用）"""
+        with self.server.stats_lock:
+            self.send_json(200, dict(self.server.stats))
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cities, latency=0.0, faults=None, verbose=False, fixtures=None):
+        super().__init__(address, StubHandler)
+        self.cities = CityTable(cities)
+        self.city_list_gz = gzip.compress(json.dumps(cities).encode())
+        self.latency = latency
+        self.faults = faults or FaultInjector()
+        self.verbose = verbose
+        # --replay: 記録した応答（FixtureStore）。一致するリクエストには疑似データより優先して返す
+        self.fixtures = fixtures
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+
+    def count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenWeatherMap 互換のローカルスタブサーバー")
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス')
+    parser.add_argument('--port', type=int, default=8766, help='待ち受けるポート')
+    parser.add_argument('--latency', type=float, default=0.0, help='API 呼び出しごとに入れる遅延（ミリ秒）')
+    parser.add_argument('--synthetic-cities', type=int, default=0,
+                        help='組み込みの都市に加える架空の都市の数（Testcity 00000, ...）')
+    faults = parser.add_argument_group('障害の注入')
+    faults.add_argument('--error-rate', type=float, default=0.0, help='エラーを返す呼び出しの割合（0〜1）')
+    faults.add_argument('--error-status', type=int, default=503, help='--error-rate で返すステータス')
+    faults.add_argument('--rate-limit', type=int, default=0, help='1秒あたりの呼び出し上限（超えると 429）')
+    faults.add_argument('--retry-after', type=int, default=1, help='429 に付ける Retry-After（秒）')
+    faults.add_argument('--slow-rate', type=float, default=0.0, help='応答を遅らせる呼び出しの割合（0〜1）')
+    faults.add_argument('--slow-seconds', type=float, default=15.0, help='--slow-rate で遅らせる秒数')
+    faults.add_argument('--outage', type=float, default=0.0, help='起動からこの秒数のあいだ 503 を返す')
+    faults.add_argument('--seed', type=int, help='障害を決める乱数のシード（再現用）')
+    parser.add_argument('--replay', metavar='DIR',
+                        help='weather.py / news.py の --record で記録した応答を配信する（記録のないリクエストは疑似データ）')
+    parser.add_argument('-v', '--verbose', action='store_true', help='リクエストごとにログを出す')
+    args = parser.parse_args()
+
+    fixtures = None
+    if args.replay:
+        fixtures = FixtureStore(args.replay)
+        if not len(fixtures):
+            parser.error(f'{fixtures.manifest} に記録がありません')
+
+    cities = CITIES + synthetic_cities(args.synthetic_cities)
+    injector = FaultInjector(
+        error_rate=args.error_rate, error_status=args.error_status, rate_limit=args.rate_limit,
+        retry_after=args.retry_after, slow_rate=args.slow_rate, slow_seconds=args.slow_seconds,
+        outage=args.outage, seed=args.seed
+    )
+    server = StubServer((args.host, args.port), cities, latency=args.latency / 1000,
+                        faults=injector, verbose=args.verbose, fixtures=fixtures)
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🧪 {len(cities)} 都市のスタブを {base} で起動しました（Ctrl+C で終了）")
+    print(f"   API: {base}/data/2.5  都市リスト: {base}/sample/city.list.json.gz  統計: {base}/stats")
+    if fixtures is not None:
+        print(f"   {fixtures.directory} の {len(fixtures)} 件の記録を再生します（フィード: {base}/ホスト/パス）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 終了します")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
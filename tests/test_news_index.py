@@ -0,0 +1,66 @@
+"""news.py の検索インデックス: 新しい順・日本語の bigram・1文字の LIKE・ソースと期間の絞り込み・重複登録"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from news import NewsIndex, NewsItem
+
+BASE = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def feed(source, titles, start=BASE):
+    """フィードと同じく新しい順に並んだ記事（1時間おき）"""
+    items = [NewsItem(title, f'https://{source}.example/{i}', source, start + timedelta(hours=i))
+             for i, title in enumerate(titles)]
+    return items[::-1]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NewsIndex(tmp_path / 'search.sqlite3')
+    yield index
+    index.close()
+
+
+def test_search_returns_newest_of_one_fetch(index):
+    items = feed('nhk', [f'ニュース {i}' for i in range(10)])
+    assert index.add(items) == 10
+
+    # 1回の取得分でも、先頭の k 件は公開時刻の新しい k 件
+    assert [item.title for item in index.search('ニュース', limit=3)] == ['ニュース 9', 'ニュース 8', 'ニュース 7']
+    assert [item.title for item in index.search('', limit=3, source='nhk')] == ['ニュース 9', 'ニュース 8', 'ニュース 7']
+
+
+def test_japanese_bigram_and_single_character(index):
+    index.add(feed('nhk', ['東京で初雪を観測', '大阪の天気は晴れ', '京都で紅葉が見ごろ']))
+
+    assert [item.title for item in index.search('東京')] == ['東京で初雪を観測']
+    assert [item.title for item in index.search('紅葉 京都')] == ['京都で紅葉が見ごろ']
+    # 1文字の語は bigram では探せないので LIKE で絞り込む
+    assert [item.title for item in index.search('雪')] == ['東京で初雪を観測']
+    assert [item.title for item in index.search('京')] == ['京都で紅葉が見ごろ', '東京で初雪を観測']
+    assert index.search('札幌') == []
+
+
+def test_source_and_since_filters(index):
+    index.add(feed('nhk', ['台風 接近', '台風 上陸']))
+    index.add(feed('bbc', ['台風 通過'], start=BASE + timedelta(days=1)))
+
+    assert {item.source for item in index.search('台風', source='bbc')} == {'bbc'}
+    assert [item.title for item in index.search('台風', source='nhk')] == ['台風 上陸', '台風 接近']
+    recent = index.search('台風', since=BASE + timedelta(minutes=30))
+    assert [item.title for item in recent] == ['台風 通過', '台風 上陸']
+    assert recent[0].published == BASE + timedelta(days=1)
+
+
+def test_adding_same_url_again_is_noop(index):
+    items = feed('nhk', ['地震 速報', '地震 続報'])
+    assert index.add(items) == 2
+    assert index.add(items) == 0
+    assert len(index) == 2
+    assert len(index.search('地震')) == 2
@@ -0,0 +1,50 @@
+"""qr.py のキャッシュ: キャッシュから取り出した出力を書き換えてもキャッシュが壊れないこと"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qr
+
+
+def test_overwriting_cached_output_keeps_cache(tmp_path):
+    cache = qr.QRCache(tmp_path / 'cache')
+    output = tmp_path / 'c2.png'
+
+    qr.create_qr_code('hello', output, cache=cache)
+    expected = output.read_bytes()
+    qr.create_qr_code('hello', output, cache=cache)
+    assert cache.stats()['hits'] == 1
+    # ヒットした出力は通常の書き込み可能なファイル
+    assert os.access(output, os.W_OK)
+    assert output.stat().st_mode & 0o200
+
+    # 他のツールのように出力をその場で書き換える
+    with open(output, 'r+b') as f:
+        f.write(b'edited')
+    assert output.read_bytes() != expected
+
+    again = tmp_path / 'x.png'
+    qr.create_qr_code('hello', again, cache=cache)
+    assert cache.stats()['hits'] == 2
+    assert again.read_bytes() == expected
+
+
+def test_fetch_treats_modified_entry_as_miss(tmp_path):
+    cache = qr.QRCache(tmp_path / 'cache')
+    output = tmp_path / 'a.png'
+    qr.create_qr_code('hello', output, cache=cache)
+    expected = output.read_bytes()
+
+    # キャッシュの画像が外部から書き換えられた場合はミスとして作り直す
+    key = qr.QRCache.make_key('hello', output, error_correction='M', box_size=10, border=4,
+                              style='square', fill_color='black', back_color='white')
+    cached = next((tmp_path / 'cache').glob(f'*/{key}.png'))
+    cached.write_bytes(b'broken')
+
+    rebuilt = tmp_path / 'b.png'
+    qr.create_qr_code('hello', rebuilt, cache=cache)
+    assert rebuilt.read_bytes() == expected
+    assert cache.stats()['misses'] == 2
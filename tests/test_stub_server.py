@@ -0,0 +1,151 @@
+"""weather.py をローカルの stub_server に向けて動かし、/group の一括取得・再試行・サーキットブレーカーを確かめる"""
+
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather
+from http_fixtures import FixtureStore
+from stub_server import CITIES, FaultInjector, StubServer, synthetic_cities
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """空いているポートでスタブを起動し、weather.py の接続先をそこへ向ける関数"""
+    servers = []
+    # テストごとにブレーカーの状態をリセットする
+    monkeypatch.setattr(weather, 'BREAKERS', {name: weather.CircuitBreaker(name) for name in weather.BREAKERS})
+
+    def start(cities=CITIES, **faults):
+        server = StubServer(('127.0.0.1', 0), cities, faults=FaultInjector(seed=1, **faults))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        server.base = f"http://127.0.0.1:{server.server_address[1]}"
+        monkeypatch.setattr(weather, 'API_BASE_URL', f"{server.base}/data/2.5")
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_group_batching_request_count(stub, tmp_path):
+    server = stub(CITIES + synthetic_cities(45))
+    city_index = weather.CityIndex(tmp_path / 'cities.sqlite3')
+    city_index.build(f"{server.base}/sample/city.list.json.gz")
+
+    # 架空の45都市 + 東京は /group（20件ずつで3回）、同名の都市がある London と未知の都市は都市名で問い合わせる
+    cities = [f"Testcity {i:05d}" for i in range(45)] + ['Tokyo', 'London', 'Nowhere']
+    stats = Counter()
+    results = {city: (data, error) for city, data, error in
+               weather.iter_weather(cities, 'stub', workers=4, city_index=city_index, stats=stats)}
+    city_index.close()
+
+    assert stats == {'group_requests': 3, 'single_requests': 2}
+    assert server.stats['/data/2.5/group'] == 3
+    assert server.stats['/data/2.5/weather'] == 2
+    assert results['Testcity 00044'][0]['name'] == 'Testcity 00044'
+    assert results['London'][0]['sys']['country'] in ('GB', 'CA')
+    assert results['Nowhere'][0] is None and '404' in results['Nowhere'][1]
+
+
+def test_breaker_opens_after_consecutive_5xx(stub, monkeypatch):
+    server = stub(error_rate=1.0, error_status=503)
+    monkeypatch.setattr(weather, 'MAX_RETRIES', 0)
+    breaker = weather.BREAKERS['weather']
+
+    for _ in range(breaker.threshold):
+        with pytest.raises(weather.ServiceUnavailableError):
+            weather.get_weather_data('Tokyo', 'stub')
+    # 開いたあとはスタブに問い合わせずに失敗する
+    with pytest.raises(weather.CircuitOpenError):
+        weather.get_weather_data('Tokyo', 'stub')
+    assert breaker.trips == 1
+    assert server.stats['/data/2.5/weather'] == breaker.threshold
+    assert server.stats['injected_503'] == breaker.threshold
+
+
+def test_retries_until_breaker_opens(stub, monkeypatch):
+    server = stub(error_rate=1.0, error_status=503)
+    monkeypatch.setattr(weather, 'BACKOFF_BASE', 0.001)
+    breaker = weather.BREAKERS['weather']
+
+    # 再試行も失敗として数えるので、1回の呼び出しの途中でブレーカーが開く
+    monkeypatch.setattr(weather, 'MAX_RETRIES', breaker.threshold + 2)
+    with pytest.raises(weather.CircuitOpenError):
+        weather.get_weather_data('Tokyo', 'stub')
+    assert server.stats['/data/2.5/weather'] == breaker.threshold
+    assert breaker.retries == breaker.threshold
+
+
+def test_retry_after_is_honoured(stub, monkeypatch):
+    server = stub(rate_limit=1, retry_after=1)
+    delays = []
+    backoff_delay = weather.backoff_delay
+
+    def recording_backoff(attempt, retry_after=None):
+        delays.append(retry_after)
+        return backoff_delay(attempt, retry_after)
+
+    monkeypatch.setattr(weather, 'backoff_delay', recording_backoff)
+    sleeps = []
+    sleep = weather.time.sleep
+
+    def recording_sleep(seconds):
+        sleeps.append(seconds)
+        sleep(seconds)
+
+    monkeypatch.setattr(weather.time, 'sleep', recording_sleep)
+
+    # 1秒に1回までなので、続けて呼ぶと 429 + Retry-After: 1 が返り、待ってから再試行して成功する
+    for city in ('Tokyo', 'Osaka', 'Kyoto'):
+        assert weather.get_weather_data(city, 'stub')['name'] == city
+        if server.stats['injected_429']:
+            break
+    assert server.stats['injected_429'] >= 1
+    assert delays and all(delay == 1.0 for delay in delays)
+    assert all(1.0 <= seconds <= 1.0 + weather.BACKOFF_BASE for seconds in sleeps)
+    # 429 ではブレーカーは開かない
+    assert weather.BREAKERS['weather'].trips == 0
+
+
+def test_group_replay_with_other_order_and_grouping(stub, tmp_path):
+    server = stub(CITIES + synthetic_cities(45))
+    city_index = weather.CityIndex(tmp_path / 'cities.sqlite3')
+    city_index.build(f"{server.base}/sample/city.list.json.gz")
+    fixtures = FixtureStore(tmp_path / 'fixtures')
+    cities = [f"Testcity {i:05d}" for i in range(45)]
+
+    def fetch(names, session):
+        stats = Counter()
+        results = {city: (data, error) for city, data, error in
+                   weather.iter_weather(names, 'stub', workers=4, session=session,
+                                        city_index=city_index, stats=stats)}
+        return results, stats
+
+    recorded, _ = fetch(cities, weather.create_session(fixtures=fixtures, record=True))
+    requests_made = server.stats['/data/2.5/group']
+
+    # 逆順・一部の都市だけにすると、/group の ID の並びも分け方も記録時と変わる
+    replay = FixtureStore(tmp_path / 'fixtures')
+    names = cities[::-1][:30]
+    replayed, stats = fetch(names, weather.create_session(fixtures=replay))
+    assert stats['group_requests'] == 2
+    assert replay.missing == 0 and replay.replayed == 2
+    assert server.stats['/data/2.5/group'] == requests_made
+    assert all(replayed[city][0] == recorded[city][0] for city in names)
+
+    # 記録にない都市を含む /group はキーを示して失敗する
+    city_id = recorded[cities[0]][0]['id']
+    session = weather.create_session(fixtures=replay)
+    assert set(weather.get_group_weather([city_id], 'stub', session)) == {city_id}
+    with pytest.raises(weather.CityNotFoundError,
+                       match=rf'no recorded response for 127\.0\.0\.1/data/2\.5/group\?id={city_id}%2C99999999&units='):
+        weather.get_group_weather([99999999, city_id], 'stub', session)
+    city_index.close()
@@ -11,13 +11,31 @@ Beautiful weather information with rich library
 """
 
 import argparse
+import functools
+import gzip
+import json
+import re
+import sqlite3
 import sys
 import os
+import random
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn, TimeElapsedColumn
 from rich import box
 
 console = Console()
@@ -44,31 +62,353 @@ WEATHER_ICONS = {
     'tornado': '🌪️'
 }
 
-def get_weather_icon(description):
-    """Get weather icon based on description"""
+# OpenWeatherMap condition ID ranges (weather[0]['id']) and their icons
+# See https://openweathermap.org/weather-conditions
+CONDITION_ICON_RANGES = [
+    (200, 299, '⛈️'),   # Thunderstorm
+    (300, 399, '🌦️'),   # Drizzle
+    (500, 504, '🌧️'),   # Rain
+    (511, 511, '🌧️'),   # Freezing rain
+    (520, 531, '🌦️'),   # Shower rain
+    (600, 699, '❄️'),   # Snow, sleet
+    (701, 701, '🌫️'),   # Mist
+    (711, 711, '💨'),   # Smoke
+    (721, 721, '🌫️'),   # Haze
+    (731, 731, '💨'),   # Sand/dust whirls
+    (741, 741, '🌫️'),   # Fog
+    (751, 771, '💨'),   # Sand, dust, volcanic ash, squalls
+    (781, 781, '🌪️'),   # Tornado
+    (800, 800, '☀️'),   # Clear sky
+    (801, 801, '🌤️'),   # Few clouds
+    (802, 802, '⛅'),   # Scattered clouds
+    (803, 804, '☁️'),   # Broken / overcast clouds
+]
+
+def _build_condition_icons():
+    icons = [None] * 1000
+    for low, high, icon in CONDITION_ICON_RANGES:
+        icons[low:high + 1] = [icon] * (high - low + 1)
+    return tuple(icons)
+
+# Icon for every condition ID 0-999 (None where OWM defines no condition)
+CONDITION_ICONS = _build_condition_icons()
+
+@functools.lru_cache(maxsize=256)
+def _description_icon(description):
     description = description.lower()
     for key, icon in WEATHER_ICONS.items():
         if key in description:
             return icon
     return '🌍'  # Default icon
 
-def get_weather_data(city, api_key):
+def get_weather_icon(description, condition_id=None):
+    """Get weather icon from the OWM condition ID, falling back to the description"""
+    if condition_id is not None and 0 <= condition_id < len(CONDITION_ICONS):
+        icon = CONDITION_ICONS[condition_id]
+        if icon is not None:
+            return icon
+    return _description_icon(description)
+
+API_BASE_URL = os.getenv('OPENWEATHER_API_BASE', "http://api.openweathermap.org/data/2.5")
+DEFAULT_WORKERS = 16
+# The /group endpoint accepts at most 20 city IDs per request
+GROUP_SIZE = 20
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that also saves every response to a fixture store (--record)"""
+
+    def __init__(self, fixtures, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = fixtures
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.fixtures.record(request.url, response.status_code, response.headers, response.content)
+        return response
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that answers from a fixture store without touching the network (--replay)
+
+    Requests that were never recorded get a 404, like an unknown city, whose
+    message names the missing fixture key. /group requests also match recordings
+    of the same IDs in another order, or are assembled from the items of other
+    recorded /group responses when every requested ID was recorded.
+    """
+
+    def __init__(self, fixtures):
+        super().__init__()
+        self.fixtures = fixtures
+
+    def send(self, request, **kwargs):
+        fixture = self.fixtures.find(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        if fixture is None:
+            from http_fixtures import fixture_key
+            response.status_code = 404
+            response.headers['Content-Type'] = 'application/json'
+            message = f"no recorded response for {fixture_key(request.url)}"
+            response._content = json.dumps({'cod': '404', 'message': message}).encode()
+        else:
+            response.status_code = fixture.status
+            response.reason = fixture.reason
+            response.headers.update(fixture.headers)
+            response._content = fixture.body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def close(self):
+        pass
+
+def create_session(pool_size=DEFAULT_WORKERS, fixtures=None, record=False):
+    """Create a requests.Session whose connection pool fits pool_size concurrent requests
+
+    Reusing the session keeps TCP connections (and DNS results) alive across cities
+    instead of reconnecting for every request. With a fixture store (see
+    http_fixtures.py) responses are recorded to it, or with record=False
+    replayed from it instead of hitting the network.
+    """
+    session = requests.Session()
+    if fixtures is None:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    elif record:
+        adapter = RecordingAdapter(fixtures, pool_connections=4, pool_maxsize=pool_size)
+    else:
+        adapter = ReplayAdapter(fixtures)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class WeatherError(Exception):
+    """Base class for errors while fetching weather data"""
+    # Whether the same request may succeed if retried later
+    retryable = False
+
+class CityNotFoundError(WeatherError):
+    """The API does not know the requested city (HTTP 404)"""
+
+class AuthenticationError(WeatherError):
+    """The API key is missing, invalid or not activated yet (HTTP 401)"""
+
+class RateLimitError(WeatherError):
+    """Too many requests (HTTP 429); retry_after is the server's hint in seconds"""
+    retryable = True
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ServiceUnavailableError(WeatherError):
+    """The API answered with a server error (HTTP 5xx)"""
+    retryable = True
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class NetworkError(WeatherError):
+    """The request timed out or the connection failed"""
+    retryable = True
+
+class InvalidResponseError(WeatherError):
+    """The API answered with something that is not the expected JSON"""
+
+class CircuitOpenError(WeatherError):
+    """The endpoint failed repeatedly and requests are short-circuited for a while"""
+
+# Retries for transient errors (429, 5xx, timeouts, connection failures)
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# A Retry-After longer than this is not waited for; the error is raised instead
+MAX_RETRY_AFTER = 60.0
+REQUEST_TIMEOUT = 10
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to sleep before retry number attempt (0-based), or None to give up
+
+    Honors the server's Retry-After when given (plus a little jitter); otherwise
+    exponential backoff with full jitter so concurrent workers do not retry in lockstep.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, BACKOFF_BASE) if retry_after <= MAX_RETRY_AFTER else None
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+class CircuitBreaker:
+    """Fail fast while an endpoint keeps failing
+
+    After `threshold` consecutive server errors or network failures (429 rate
+    limiting does not count: the endpoint is up) the circuit opens and calls
+    raise CircuitOpenError without touching the network. After `reset_timeout`
+    seconds one trial request is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, name, threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.retries = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"/{self.name} endpoint is failing; calls paused for {max(remaining, 0):.1f}s"
+                )
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (self.opened_at is None and self.failures >= self.threshold):
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+# One breaker per API endpoint
+BREAKERS = {
+    'weather': CircuitBreaker('weather'),
+    'group': CircuitBreaker('group'),
+}
+
+def error_for_response(response):
+    """Typed error for a non-2xx response, or None if the response is OK"""
+    if response.ok:
+        return None
+    try:
+        detail = response.json().get('message') or response.reason
+    except (ValueError, AttributeError):
+        detail = response.reason
+    message = f"HTTP {response.status_code}: {detail}"
+    status = response.status_code
+    if status == 404:
+        return CityNotFoundError(message)
+    if status == 401:
+        return AuthenticationError(message)
+    if status == 429:
+        return RateLimitError(message, parse_retry_after(response.headers.get('Retry-After')))
+    if status >= 500:
+        return ServiceUnavailableError(message, parse_retry_after(response.headers.get('Retry-After')))
+    return WeatherError(message)
+
+def api_get(endpoint, params, session=None):
+    """GET an API endpoint and return the decoded JSON
+
+    Transient errors are retried up to MAX_RETRIES times with backoff, and every
+    attempt goes through the endpoint's circuit breaker. Raises a WeatherError
+    subclass on failure.
+    """
+    breaker = BREAKERS[endpoint]
+    http = session or requests
+    url = f"{API_BASE_URL}/{endpoint}"
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            response = http.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.Timeout:
+            error = NetworkError(f"Request timed out after {REQUEST_TIMEOUT}s")
+        except requests.exceptions.RequestException as e:
+            # The exception text contains the full URL including appid, so only name the host
+            error = NetworkError(f"Connection to {urlsplit(url).netloc} failed ({type(e).__name__})")
+        else:
+            error = error_for_response(response)
+            if error is None:
+                breaker.record_success()
+                try:
+                    return response.json()
+                except ValueError as e:
+                    raise InvalidResponseError(f"Invalid JSON response: {e}")
+        
+        if not error.retryable or isinstance(error, RateLimitError):
+            # The endpoint itself is healthy (e.g. unknown city, or just asking us to slow down)
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        if not error.retryable:
+            raise error
+        delay = backoff_delay(attempt, getattr(error, 'retry_after', None)) if attempt < MAX_RETRIES else None
+        if delay is None:
+            raise error
+        breaker.record_retry()
+        attempt += 1
+        time.sleep(delay)
+
+def get_weather_data(city, api_key, session=None, units='metric'):
     """Fetch weather data from OpenWeatherMap API"""
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
     params = {
         'q': city,
         'appid': api_key,
-        'units': 'metric'
+        'units': units
     }
-    
+    return api_get('weather', params, session)
+
+def get_group_weather(city_ids, api_key, session=None, units='metric'):
+    """Fetch weather for up to GROUP_SIZE city IDs in one request (/group endpoint)
+
+    Returns {city_id: weather_data}; IDs missing from the response are left out.
+    """
+    params = {
+        'id': ','.join(str(city_id) for city_id in city_ids),
+        'appid': api_key,
+        'units': units
+    }
+    data = api_get('group', params, session)
     try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"API request failed: {e}")
-    except ValueError as e:
-        raise Exception(f"Invalid JSON response: {e}")
+        return {item['id']: item for item in data.get('list', [])}
+    except (AttributeError, KeyError, TypeError) as e:
+        raise InvalidResponseError(f"Invalid group response: {e}")
+
+# Temperature color bands (lower bound in °C, color), warmest first; colder is COLD_COLOR
+TEMPERATURE_BANDS = ((30, "red"), (20, "yellow"), (10, "green"))
+COLD_COLOR = "blue"
+
+WIND_DIRECTIONS = ('N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                   'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
+
+def temperature_color(temp):
+    """Color for a temperature value"""
+    for lower, color in TEMPERATURE_BANDS:
+        if temp >= lower:
+            return color
+    return COLD_COLOR
+
+def wind_direction_name(degrees):
+    """16-point compass name for a wind direction in degrees"""
+    return WIND_DIRECTIONS[int((degrees + 11.25) / 22.5) % 16]
 
 def format_weather_display(weather_data):
     """Format weather data for beautiful display"""
@@ -81,7 +421,7 @@ def format_weather_display(weather_data):
     country = weather_data['sys']['country']
     
     # Get weather icon
-    icon = get_weather_icon(weather['description'])
+    icon = get_weather_icon(weather['description'], weather.get('id'))
     
     # Create title with icon
     title = f"{icon} Weather in {city_name}, {country}"
@@ -93,14 +433,7 @@ def format_weather_display(weather_data):
     
     # Temperature with color based on value
     temp = main['temp']
-    if temp >= 30:
-        temp_color = "red"
-    elif temp >= 20:
-        temp_color = "yellow"
-    elif temp >= 10:
-        temp_color = "green"
-    else:
-        temp_color = "blue"
+    temp_color = temperature_color(temp)
     
     table.add_row("🌡️  Temperature", f"[{temp_color}]{temp:.1f}°C[/{temp_color}]")
     table.add_row("🌡️  Feels like", f"{main['feels_like']:.1f}°C")
@@ -112,10 +445,7 @@ def format_weather_display(weather_data):
     wind_direction = wind.get('deg', None)
     wind_text = f"{wind_speed:.1f} m/s"
     if wind_direction is not None:
-        directions = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
-                     'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
-        direction_idx = int((wind_direction + 11.25) / 22.5) % 16
-        wind_text += f" ({directions[direction_idx]})"
+        wind_text += f" ({wind_direction_name(wind_direction)})"
     
     table.add_row("💨 Wind", wind_text)
     table.add_row("🔽 Pressure", f"{main['pressure']} hPa")
@@ -136,16 +466,691 @@ def format_weather_display(weather_data):
     
     return panel
 
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'python-tools-demo' / 'weather.sqlite3'
+# OpenWeatherMap refreshes current conditions roughly every 10 minutes
+DEFAULT_CACHE_TTL = 600
+DEFAULT_STALE_TTL = 3600
+
+def normalize_city(city):
+    """'  new york , US' -> 'new york,us' (used for cache keys and the city index)"""
+    city = re.sub(r'\s+', ' ', city.strip().casefold())
+    return re.sub(r'\s*,\s*', ',', city)
+
+class WeatherCache:
+    """Persistent SQLite cache of API responses keyed on normalized city and units
+
+    Entries younger than `ttl` seconds are returned as-is. Entries up to
+    `stale_ttl` seconds past the TTL are returned immediately too, but are
+    refreshed in the background (stale-while-revalidate); call wait() before
+    exiting so those refreshes land in the cache. Older entries are misses.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_CACHE_TTL, stale_ttl=DEFAULT_STALE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+        self._lock = threading.Lock()
+        self._refreshing = {}
+        self._executor = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(city, units='metric'):
+        """'  new york , us' and 'New York,US' share one entry"""
+        return f"{units}:{normalize_city(city)}"
+
+    def _get(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT data, fetched_at FROM responses WHERE key = ?', (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _put(self, key, data):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, data, fetched_at) VALUES (?, ?, ?)',
+                (key, json.dumps(data), time.time())
+            )
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _refresh(self, keys, loader, units):
+        try:
+            for city, data in loader().items():
+                self.store(city, data, units)
+        except Exception:
+            self._count('refresh_errors')
+        finally:
+            with self._lock:
+                for key in keys:
+                    self._refreshing.pop(key, None)
+
+    def lookup(self, city, units='metric'):
+        """Return (data, is_fresh) for city, or None when it has to be fetched (updates the counters)"""
+        cached = self._get(self.make_key(city, units))
+        if cached is not None:
+            data, fetched_at = cached
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self._count('hits')
+                return data, True
+            if age < self.ttl + self.stale_ttl:
+                self._count('stale_hits')
+                return data, False
+        self._count('misses')
+        return None
+
+    def store(self, city, data, units='metric'):
+        self._put(self.make_key(city, units), data)
+
+    def revalidate(self, cities, loader, units='metric'):
+        """Refresh cities in the background; loader() returns {city: weather_data}
+
+        Cities that already have a refresh in flight are not refreshed twice.
+        """
+        with self._lock:
+            keys = [self.make_key(city, units) for city in cities]
+            keys = [key for key in keys if key not in self._refreshing]
+            if not keys:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4)
+            future = self._executor.submit(self._refresh, keys, loader, units)
+            for key in keys:
+                self._refreshing[key] = future
+
+    def fetch(self, city, loader, units='metric'):
+        """Return weather data for city from the cache, calling loader() on a miss"""
+        cached = self.lookup(city, units)
+        if cached is not None:
+            data, fresh = cached
+            if not fresh:
+                self.revalidate([city], lambda: {city: loader()}, units)
+            return data
+        data = loader()
+        self.store(city, data, units)
+        return data
+
+    def wait(self):
+        """Wait for background refreshes of stale entries to finish"""
+        with self._lock:
+            pending = set(self._refreshing.values())
+        wait(pending)
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._conn.close()
+
+def get_weather(city, api_key, session=None, cache=None, units='metric'):
+    """Fetch weather data for city, going through the cache when one is given"""
+    if cache is None:
+        return get_weather_data(city, api_key, session, units)
+    return cache.fetch(city, lambda: get_weather_data(city, api_key, session, units), units)
+
+DEFAULT_CITY_INDEX = Path.home() / '.cache' / 'python-tools-demo' / 'owm_cities.sqlite3'
+CITY_LIST_URL = "http://bulk.openweathermap.org/sample/city.list.json.gz"
+
+class CityIndex:
+    """Local city name -> OpenWeatherMap city ID index built from the OWM city list
+
+    Each city is indexed as 'name', 'name,country' and (when the list has a
+    state) 'name,state,country', normalized like cache keys. A key shared by
+    cities with different IDs is marked ambiguous and never resolved, so such
+    names keep going through the by-name endpoint and OWM's own choice.
+    """
+
+    def __init__(self, path=DEFAULT_CITY_INDEX):
+        self.path = Path(path)
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cities ('
+                'key TEXT PRIMARY KEY, id INTEGER NOT NULL, ambiguous INTEGER NOT NULL DEFAULT 0'
+                ') WITHOUT ROWID'
+            )
+        return self._conn
+
+    def exists(self):
+        return self.path.exists()
+
+    def build(self, source=CITY_LIST_URL, session=None):
+        """(Re)build the index from a city list URL or file (JSON, optionally gzipped); returns the city count"""
+        if re.match(r'https?://', source):
+            response = (session or requests).get(source, timeout=60)
+            response.raise_for_status()
+            raw = response.content
+        else:
+            raw = Path(source).read_bytes()
+        if raw[:2] == b'\x1f\x8b':
+            raw = gzip.decompress(raw)
+        cities = json.loads(raw)
+        
+        def rows():
+            for city in cities:
+                name, country, state = city['name'], city.get('country') or '', city.get('state') or ''
+                yield normalize_city(name), city['id']
+                if country:
+                    yield normalize_city(f"{name},{country}"), city['id']
+                    if state:
+                        yield normalize_city(f"{name},{state},{country}"), city['id']
+        
+        with self.conn:
+            self.conn.execute('DELETE FROM cities')
+            self.conn.executemany(
+                'INSERT INTO cities (key, id) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET ambiguous = 1 WHERE id != excluded.id',
+                rows()
+            )
+        return len(cities)
+
+    def resolve(self, city):
+        """City ID for a name, or None if it is unknown or ambiguous"""
+        row = self.conn.execute(
+            'SELECT id, ambiguous FROM cities WHERE key = ?', (normalize_city(city),)
+        ).fetchone()
+        return row[0] if row and not row[1] else None
+
+    def plan(self, cities, group_size=GROUP_SIZE):
+        """Pack cities into group requests
+
+        Returns ([{city_id: [city, ...]}, ...], unresolved_cities); each dict holds
+        at most group_size IDs. Names resolving to the same ID share one slot.
+        """
+        by_id = {}
+        unresolved = []
+        for city in cities:
+            city_id = self.resolve(city)
+            if city_id is None:
+                unresolved.append(city)
+            else:
+                by_id.setdefault(city_id, []).append(city)
+        ids = list(by_id)
+        groups = [{city_id: by_id[city_id] for city_id in ids[i:i + group_size]}
+                  for i in range(0, len(ids), group_size)]
+        return groups, unresolved
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+def fetch_group(group, api_key, session=None, units='metric'):
+    """Fetch one planned group ({city_id: [city, ...]}) and return {city: weather_data}"""
+    by_id = get_group_weather(list(group), api_key, session, units)
+    return {city: by_id[city_id] for city_id, cities in group.items() if city_id in by_id for city in cities}
+
+def read_cities_file(path):
+    """Read city names from a file (one per line, blank lines and # comments ignored)"""
+    cities = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                cities.append(line)
+    return cities
+
+def iter_weather(cities, api_key, workers=DEFAULT_WORKERS, session=None, cache=None,
+                 city_index=None, stats=None):
+    """Fetch weather for many cities concurrently over one pooled session
+
+    At most `workers` requests are in flight at once. With a city_index, cities
+    it can resolve are packed into /group requests of up to GROUP_SIZE IDs and
+    only the rest are fetched by name. Yields one (city, weather_data, error)
+    tuple per distinct city as soon as it is available (cache hits first, then
+    in completion order); exactly one of weather_data / error is set. Request
+    counts are added to the stats Counter.
+    """
+    unique = list(dict.fromkeys(cities))
+    session = session or create_session(max(1, min(workers, len(unique))))
+    results = {}
+    stats = stats if stats is not None else Counter()
+    stats_lock = threading.Lock()
+    
+    def fetch_by_name(city, store=False):
+        with stats_lock:
+            stats['single_requests'] += 1
+        data = get_weather_data(city, api_key, session)
+        if store and cache is not None:
+            cache.store(city, data)
+        return {city: data}
+    
+    def fetch_by_group(group, store=False):
+        with stats_lock:
+            stats['group_requests'] += 1
+        found = fetch_group(group, api_key, session)
+        if store and cache is not None:
+            for city, data in found.items():
+                cache.store(city, data)
+        return found
+    
+    if city_index is None:
+        if cache is None:
+            jobs = [([city], lambda city=city: fetch_by_name(city)) for city in unique]
+        else:
+            jobs = [([city], lambda city=city: {city: cache.fetch(city, lambda: fetch_by_name(city)[city])})
+                    for city in unique]
+    else:
+        to_fetch, stale = [], []
+        for city in unique:
+            cached = cache.lookup(city) if cache is not None else None
+            if cached is None:
+                to_fetch.append(city)
+            else:
+                results[city] = (city, cached[0], None)
+                if not cached[1]:
+                    stale.append(city)
+        groups, unresolved = city_index.plan(to_fetch)
+        jobs = [([city for names in group.values() for city in names],
+                 lambda group=group: fetch_by_group(group, store=True)) for group in groups]
+        jobs += [([city], lambda city=city: fetch_by_name(city, store=True)) for city in unresolved]
+        if stale:
+            # Stale entries are shown as-is and refreshed with group requests in the background
+            stale_groups, stale_unresolved = city_index.plan(stale)
+            for group in stale_groups:
+                cache.revalidate([city for names in group.values() for city in names],
+                                 lambda group=group: fetch_by_group(group))
+            for city in stale_unresolved:
+                cache.revalidate([city], lambda city=city: fetch_by_name(city))
+    
+    yield from results.values()
+    if not jobs:
+        return
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as executor:
+        futures = {executor.submit(job): job_cities for job_cities, job in jobs}
+        for future in as_completed(futures):
+            job_cities = futures[future]
+            try:
+                found = future.result()
+            except WeatherError as e:
+                found, error = {}, str(e)
+            else:
+                error = "City not found in group response"
+            for city in job_cities:
+                if city in found:
+                    yield city, found[city], None
+                else:
+                    yield city, None, error
+
+def fetch_many(cities, api_key, workers=DEFAULT_WORKERS, session=None, cache=None,
+               city_index=None, stats=None):
+    """iter_weather() behind a progress bar, returning the tuples in the order the cities were given"""
+    results = {}
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[bold green]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True
+    ) as progress:
+        task = progress.add_task("Fetching weather data...", total=len(set(cities)))
+        for result in iter_weather(cities, api_key, workers, session, cache, city_index, stats):
+            results[result[0]] = result
+            progress.advance(task)
+    
+    return [results[city] for city in cities]
+
+# Sort keys for the combined table (--sort)
+SORT_KEYS = {
+    'name': lambda data: data['name'].lower(),
+    'temp': lambda data: data['main']['temp'],
+    'feels_like': lambda data: data['main']['feels_like'],
+    'humidity': lambda data: data['main']['humidity'],
+    'pressure': lambda data: data['main']['pressure'],
+    'wind': lambda data: data.get('wind', {}).get('speed', 0),
+}
+
+FAILED_ROW_CELLS = tuple(Text("-") for _ in range(5))
+
+def weather_row(data):
+    """Cells for one city in the combined table
+
+    Cells are pre-styled Text objects, so rich does not parse markup for
+    thousands of rows; icons, directions and colors come from the lookup tables.
+    """
+    main = data['main']
+    weather = data['weather'][0]
+    wind = data.get('wind', {})
+    wind_text = f"{wind.get('speed', 0):.1f} m/s"
+    if wind.get('deg') is not None:
+        wind_text += f" {wind_direction_name(wind['deg'])}"
+    description = weather['description']
+    return (
+        Text(f"{data['name']}, {data['sys'].get('country', '')}"),
+        Text(f"{get_weather_icon(description, weather.get('id'))} {description.title()}"),
+        Text(f"{main['temp']:.1f}°C", style=temperature_color(main['temp'])),
+        Text(f"{main['feels_like']:.1f}°C"),
+        Text(f"{main['humidity']}%"),
+        Text(wind_text),
+        Text(f"{main['pressure']} hPa"),
+    )
+
+def format_weather_table(results, sort_by=None, descending=False):
+    """Build one table for many cities, sorted by a metric (failed cities are listed last)"""
+    fetched = [(city, data) for city, data, error in results if data is not None]
+    failed = [(city, error) for city, data, error in results if data is None]
+    if sort_by is not None:
+        fetched.sort(key=lambda pair: SORT_KEYS[sort_by](pair[1]), reverse=descending)
+    
+    title = f"🌍 Weather in {len(results)} cities"
+    if sort_by is not None:
+        title += f" (by {sort_by}, {'descending' if descending else 'ascending'})"
+    table = Table(title=title, box=box.ROUNDED, header_style="bold cyan")
+    table.add_column("City", style="bold white")
+    table.add_column("Condition")
+    # Numeric columns never wrap, which spares rich from measuring wrap points per cell
+    table.add_column("Temp", justify="right", no_wrap=True)
+    table.add_column("Feels like", justify="right", no_wrap=True)
+    table.add_column("Humidity", justify="right", no_wrap=True)
+    table.add_column("Wind", justify="right", no_wrap=True)
+    table.add_column("Pressure", justify="right", no_wrap=True)
+    
+    for city, data in fetched:
+        table.add_row(*weather_row(data))
+    
+    for city, error in failed:
+        table.add_row(Text(city), Text(error, style="red", no_wrap=True, overflow="ellipsis"), *FAILED_ROW_CELLS)
+    
+    return table
+
+OUTPUT_FORMATS = ['rich', 'json', 'ndjson']
+
+def weather_record(city, data, error=None):
+    """Flat record for machine-readable output (--format json/ndjson), one per city"""
+    if data is None:
+        return {'city': city, 'error': error}
+    main = data['main']
+    weather = data['weather'][0]
+    wind = data.get('wind', {})
+    observed_at = data.get('dt')
+    return {
+        'city': city,
+        'name': data.get('name'),
+        'country': data.get('sys', {}).get('country'),
+        'city_id': data.get('id'),
+        'condition_id': weather.get('id'),
+        'condition': weather.get('description'),
+        'temp': main.get('temp'),
+        'feels_like': main.get('feels_like'),
+        'humidity': main.get('humidity'),
+        'pressure': main.get('pressure'),
+        'wind_speed': wind.get('speed'),
+        'wind_deg': wind.get('deg'),
+        'visibility': data.get('visibility'),
+        'observed_at': datetime.fromtimestamp(observed_at, timezone.utc).isoformat() if observed_at else None,
+        'error': None,
+    }
+
+class RecordWriter:
+    """Write records as one JSON array or as NDJSON (one object per line)
+
+    Every record is written and flushed as soon as it is given, so consumers
+    see the first cities while the others are still being fetched.
+    """
+
+    def __init__(self, fmt, stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.count = 0
+
+    def write(self, record):
+        text = json.dumps(record, ensure_ascii=False)
+        if self.fmt == 'json':
+            text = ('[\n  ' if self.count == 0 else ',\n  ') + text
+        else:
+            text += '\n'
+        self.stream.write(text)
+        self.stream.flush()
+        self.count += 1
+
+    def close(self):
+        if self.fmt == 'json':
+            self.stream.write('\n]\n' if self.count else '[]\n')
+        self.stream.flush()
+
+def write_records(results, fmt, sort_by=None, descending=False, stream=None):
+    """Write (city, weather_data, error) tuples as records, streaming unless sorting
+
+    Without sort_by, records go out in the order results arrive. Sorting has to
+    wait for every city; failed cities are written last. Returns True if at
+    least one city succeeded.
+    """
+    if sort_by is not None:
+        results = list(results)
+        fetched = sorted((result for result in results if result[1] is not None),
+                         key=lambda result: SORT_KEYS[sort_by](result[1]), reverse=descending)
+        results = fetched + [result for result in results if result[1] is None]
+    writer = RecordWriter(fmt, stream)
+    succeeded = False
+    for city, data, error in results:
+        writer.write(weather_record(city, data, error))
+        succeeded = succeeded or data is not None
+    writer.close()
+    return succeeded
+
+DEFAULT_READINGS_STORE = Path.home() / '.cache' / 'python-tools-demo' / 'weather_readings.sqlite3'
+DEFAULT_POLL_INTERVAL = 600
+DEFAULT_METRICS_PORT = 9108
+
+class ReadingStore:
+    """Append-only SQLite time series of compact weather readings
+
+    One row per (city, observation time): temp, feels_like, humidity, pressure,
+    wind speed and visibility, with the city stored as an integer ID. Readings
+    are buffered and written in one transaction per batch: call flush() after
+    each poll, and a poll with more than batch_size readings is split.
+    """
+
+    def __init__(self, path=DEFAULT_READINGS_STORE, batch_size=500):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.written = 0
+        self._buffer = []
+        self._city_ids = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS cities (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);'
+            'CREATE TABLE IF NOT EXISTS readings ('
+            'city_id INTEGER NOT NULL REFERENCES cities(id), observed_at INTEGER NOT NULL, '
+            'temp REAL, feels_like REAL, humidity INTEGER, pressure INTEGER, wind REAL, visibility INTEGER, '
+            'PRIMARY KEY (city_id, observed_at)) WITHOUT ROWID;'
+        )
+        self._conn.commit()
+
+    def city_id(self, city):
+        if city not in self._city_ids:
+            with self._conn:
+                self._conn.execute('INSERT OR IGNORE INTO cities (name) VALUES (?)', (city,))
+            self._city_ids[city] = self._conn.execute(
+                'SELECT id FROM cities WHERE name = ?', (city,)
+            ).fetchone()[0]
+        return self._city_ids[city]
+
+    def append(self, city, data):
+        """Buffer one reading from an API response (flushes when the batch is full)"""
+        main = data['main']
+        wind = data.get('wind', {})
+        self._buffer.append((
+            self.city_id(city), int(data.get('dt') or time.time()),
+            main.get('temp'), main.get('feels_like'), main.get('humidity'), main.get('pressure'),
+            wind.get('speed'), data.get('visibility')
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            with self._conn:
+                # The same observation polled twice (OWM updates every ~10 minutes) is stored once
+                cursor = self._conn.executemany(
+                    'INSERT OR IGNORE INTO readings VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self._buffer
+                )
+            self.written += cursor.rowcount
+            self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+# (metric name, help text, function reading the value from an API response)
+GAUGES = [
+    ('weather_temperature_celsius', 'Current temperature', lambda data: data['main'].get('temp')),
+    ('weather_feels_like_celsius', 'Perceived temperature', lambda data: data['main'].get('feels_like')),
+    ('weather_humidity_percent', 'Relative humidity', lambda data: data['main'].get('humidity')),
+    ('weather_pressure_hpa', 'Atmospheric pressure', lambda data: data['main'].get('pressure')),
+    ('weather_wind_speed_mps', 'Wind speed', lambda data: data.get('wind', {}).get('speed')),
+    ('weather_visibility_meters', 'Visibility', lambda data: data.get('visibility')),
+    ('weather_observed_timestamp_seconds', 'Time of the observation reported by the API', lambda data: data.get('dt')),
+]
+
+def metric_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class WeatherMetrics:
+    """Latest reading per city plus poll counters, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.latest = {}
+        self.errors = Counter()
+        self.polls = 0
+        self.last_poll_seconds = 0.0
+        self.readings_written = 0
+        self._lock = threading.Lock()
+
+    def record_poll(self, results, elapsed, readings_written):
+        with self._lock:
+            self.polls += 1
+            self.last_poll_seconds = elapsed
+            self.readings_written = readings_written
+            for city, data, error in results:
+                if data is not None:
+                    self.latest[city] = data
+                else:
+                    self.errors[city] += 1
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for name, help_text, read in GAUGES:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                for city, data in self.latest.items():
+                    value = read(data)
+                    if value is not None:
+                        lines.append(f'{name}{{city="{metric_label(city)}"}} {value}')
+            lines += ["# HELP weather_fetch_errors_total Failed fetches per city",
+                      "# TYPE weather_fetch_errors_total counter"]
+            lines += [f'weather_fetch_errors_total{{city="{metric_label(city)}"}} {count}'
+                      for city, count in self.errors.items()]
+            lines += [
+                "# HELP weather_polls_total Completed polls", "# TYPE weather_polls_total counter",
+                f"weather_polls_total {self.polls}",
+                "# HELP weather_poll_duration_seconds Duration of the last poll",
+                "# TYPE weather_poll_duration_seconds gauge",
+                f"weather_poll_duration_seconds {self.last_poll_seconds:.6f}",
+                "# HELP weather_readings_written_total Readings appended to the store",
+                "# TYPE weather_readings_written_total counter",
+                f"weather_readings_written_total {self.readings_written}",
+            ]
+        return '\n'.join(lines) + '\n'
+
+def start_metrics_server(metrics, host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+    """Serve metrics.render() at /metrics from a background thread; returns the server"""
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def poll_forever(cities, api_key, store, metrics, interval=DEFAULT_POLL_INTERVAL, workers=DEFAULT_WORKERS,
+                 session=None, cache=None, city_index=None, polls=None):
+    """Poll cities every `interval` seconds, appending readings to store and updating metrics
+
+    Runs until interrupted (or for `polls` polls). One session is reused across
+    polls and nothing but the latest reading per city is kept in memory.
+    """
+    session = session or create_session(max(1, min(workers, len(cities))))
+    count = 0
+    next_poll = time.monotonic()
+    while polls is None or count < polls:
+        started = time.monotonic()
+        results = fetch_many(cities, api_key, workers=workers, session=session, cache=cache, city_index=city_index)
+        for city, data, error in results:
+            if data is not None:
+                store.append(city, data)
+        # One transaction per poll, so a stopped poller loses at most the poll in progress
+        store.flush()
+        elapsed = time.monotonic() - started
+        metrics.record_poll(results, elapsed, store.written)
+        count += 1
+        failed = sum(data is None for _, data, _ in results)
+        console.print(
+            f"[dim]{time.strftime('%H:%M:%S')}[/dim] polled {len(results)} cities in {elapsed * 1000:.0f} ms"
+            f"{f', [red]{failed} failed[/red]' if failed else ''}, {store.written} readings stored"
+        )
+        next_poll += interval
+        if polls is None or count < polls:
+            time.sleep(max(0.0, next_poll - time.monotonic()))
+
 def main():
     """Main function"""
+    global API_BASE_URL, MAX_RETRIES, console
     parser = argparse.ArgumentParser(
-        description="Display beautiful weather information for a city",
+        description="Display beautiful weather information for one or more cities",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   python weather.py Tokyo
   python weather.py "New York"
   python weather.py Paris --api-key YOUR_API_KEY
+  python weather.py Tokyo Osaka Sapporo --sort temp --desc
+  python weather.py --cities-file sites.txt --workers 32 --sort humidity
+  python weather.py Tokyo --cache-ttl 300 -v
+  python weather.py Tokyo --no-cache
+  python weather.py --build-city-index
+  python weather.py --cities-file sites.txt -v     # uses /group requests once the index exists
+  python weather.py --cities-file sites.txt --poll --interval 600 --metrics-port 9108
+  python weather.py --cities-file sites.txt --format ndjson | jq .temp
+  python weather.py --cities-file sites.txt --record fixtures/   # then replay offline:
+  python weather.py --cities-file sites.txt --replay fixtures/ --no-cache
 
 Note: Set OPENWEATHER_API_KEY environment variable or use --api-key option
 Get your free API key at: https://openweathermap.org/api
@@ -153,8 +1158,42 @@ Get your free API key at: https://openweathermap.org/api
     )
     
     parser.add_argument(
-        'city',
-        help='City name to get weather for'
+        'cities',
+        nargs='*',
+        metavar='city',
+        help='City name(s) to get weather for'
+    )
+    
+    parser.add_argument(
+        '-f', '--cities-file',
+        help='File with one city per line (blank lines and # comments are ignored)'
+    )
+    
+    parser.add_argument(
+        '--sort',
+        choices=sorted(SORT_KEYS),
+        help='Sort the combined table by this metric (default: input order)'
+    )
+    
+    parser.add_argument(
+        '--desc',
+        action='store_true',
+        help='Sort in descending order'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=OUTPUT_FORMATS,
+        default='rich',
+        help='Output format: rich panels/tables, or JSON / NDJSON records streamed to stdout '
+             'as cities arrive (default: rich)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Maximum number of concurrent requests (default: {DEFAULT_WORKERS})'
     )
     
     parser.add_argument(
@@ -162,7 +1201,168 @@ Get your free API key at: https://openweathermap.org/api
         help='OpenWeatherMap API key (or set OPENWEATHER_API_KEY env var)'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always call the API instead of using cached responses'
+    )
+    
+    parser.add_argument(
+        '--cache-file',
+        default=str(DEFAULT_CACHE_PATH),
+        help=f'Response cache location (default: {DEFAULT_CACHE_PATH})'
+    )
+    
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help=f'Seconds a cached response is considered fresh (default: {DEFAULT_CACHE_TTL})'
+    )
+    
+    parser.add_argument(
+        '--stale-ttl',
+        type=float,
+        default=DEFAULT_STALE_TTL,
+        help='Seconds past the TTL a stale response is still shown while it is '
+             f'refreshed in the background (default: {DEFAULT_STALE_TTL}, 0 disables)'
+    )
+    
+    parser.add_argument(
+        '--city-index',
+        default=str(DEFAULT_CITY_INDEX),
+        help=f'City name -> ID index used to batch cities into /group requests (default: {DEFAULT_CITY_INDEX})'
+    )
+    
+    parser.add_argument(
+        '--build-city-index',
+        nargs='?',
+        const=CITY_LIST_URL,
+        metavar='SOURCE',
+        help=f'Build the city index from the OWM city list (URL or file, default: {CITY_LIST_URL})'
+    )
+    
+    parser.add_argument(
+        '--no-group',
+        action='store_true',
+        help='Fetch every city by name even when the city index exists'
+    )
+    
+    parser.add_argument(
+        '--api-base',
+        default=API_BASE_URL,
+        help='API base URL, e.g. a local stub server (default: $OPENWEATHER_API_BASE or the OWM API)'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=MAX_RETRIES,
+        help=f'Retries for rate-limited, failing or timed-out requests (default: {MAX_RETRIES})'
+    )
+    
+    fixture_options = parser.add_mutually_exclusive_group()
+    fixture_options.add_argument(
+        '--record',
+        metavar='DIR',
+        help='Save every API response to DIR (see http_fixtures.py); implies --no-cache'
+    )
+    
+    fixture_options.add_argument(
+        '--replay',
+        metavar='DIR',
+        help='Answer from responses recorded in DIR without touching the network '
+             '(to replay through a server instead, run stub_server.py --replay and use --api-base)'
+    )
+    
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='Keep polling the cities, storing every reading and serving Prometheus metrics '
+             '(the response cache is not used)'
+    )
+    
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f'Seconds between polls in --poll mode (default: {DEFAULT_POLL_INTERVAL})'
+    )
+    
+    parser.add_argument(
+        '--polls',
+        type=int,
+        help='Stop after this many polls (default: run until interrupted)'
+    )
+    
+    parser.add_argument(
+        '--store',
+        default=str(DEFAULT_READINGS_STORE),
+        help=f'SQLite time series the readings are appended to (default: {DEFAULT_READINGS_STORE})'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=DEFAULT_METRICS_PORT,
+        help=f'Port for the /metrics endpoint in --poll mode, 0 disables it (default: {DEFAULT_METRICS_PORT})'
+    )
+    
+    parser.add_argument(
+        '--metrics-host',
+        default='127.0.0.1',
+        help='Address the /metrics endpoint listens on (default: 127.0.0.1)'
+    )
+    
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Show cache hit/miss and request counters'
+    )
+    
     args = parser.parse_args()
+    if args.poll and args.format != 'rich':
+        parser.error("--format applies to one-off fetches, not --poll")
+    if args.format != 'rich':
+        # stdout carries only the records; progress, warnings and errors go to stderr
+        console = Console(stderr=True)
+    
+    API_BASE_URL = args.api_base.rstrip('/')
+    MAX_RETRIES = max(0, args.retries)
+    
+    cities = list(args.cities)
+    if args.cities_file:
+        try:
+            cities.extend(read_cities_file(args.cities_file))
+        except OSError as e:
+            parser.error(f"cannot read cities file: {e}")
+    
+    fixtures = None
+    if args.record or args.replay:
+        # Only needed for recording/replaying, so keep it out of normal runs
+        import http_fixtures
+        fixtures = http_fixtures.FixtureStore(args.record or args.replay)
+        if args.replay and not len(fixtures):
+            parser.error(f"no recorded responses in {fixtures.manifest} (create them with --record)")
+    session = create_session(max(1, min(args.workers, len(cities) or 1)), fixtures, record=bool(args.record))
+    
+    if args.build_city_index:
+        city_index = CityIndex(args.city_index)
+        try:
+            with console.status(f"[bold green]Building city index from {args.build_city_index}..."):
+                count = city_index.build(args.build_city_index, session)
+        except (OSError, ValueError, KeyError, TypeError, sqlite3.Error,
+                requests.exceptions.RequestException) as e:
+            console.print(f"[red]Error:[/red] cannot build city index: {e}", style="bold")
+            sys.exit(1)
+        finally:
+            city_index.close()
+        console.print(f"[green]Indexed {count:,} cities into {city_index.path}[/green]")
+        if not cities:
+            return
+    
+    if not cities:
+        parser.error("at least one city (or --cities-file) is required")
     
     # Get API key from argument or environment variable
     api_key = args.api_key or os.getenv('OPENWEATHER_API_KEY')
@@ -176,10 +1376,117 @@ Get your free API key at: https://openweathermap.org/api
         )
         sys.exit(1)
     
+    cache = None
+    if not args.no_cache and not args.poll and not args.record:
+        try:
+            cache = WeatherCache(args.cache_file, ttl=args.cache_ttl, stale_ttl=args.stale_ttl)
+        except sqlite3.Error as e:
+            console.print(f"[yellow]Warning:[/yellow] cache disabled ({e})")
+    
+    city_index = None
+    if (len(cities) > 1 or args.poll or args.format != 'rich') and not args.no_group and Path(args.city_index).exists():
+        city_index = CityIndex(args.city_index)
+    stats = Counter()
+    
+    try:
+        if args.poll:
+            run_poller(args, cities, api_key, session, city_index)
+        elif args.format != 'rich':
+            results = iter_weather(cities, api_key, workers=args.workers, session=session, cache=cache,
+                                   city_index=city_index, stats=stats)
+            try:
+                succeeded = write_records(results, args.format, sort_by=args.sort, descending=args.desc)
+            except BrokenPipeError:
+                # The reader went away (e.g. `| head`); stop quietly
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                succeeded = True
+            if not succeeded:
+                sys.exit(1)
+        elif len(cities) > 1:
+            results = fetch_many(cities, api_key, workers=args.workers, session=session, cache=cache,
+                                 city_index=city_index, stats=stats)
+            console.print()
+            console.print(format_weather_table(results, sort_by=args.sort, descending=args.desc))
+            console.print()
+            # Exit with an error only if every city failed
+            if all(data is None for _, data, _ in results):
+                sys.exit(1)
+        else:
+            show_city(cities[0], api_key, cache, session)
+    finally:
+        if city_index is not None:
+            city_index.close()
+        if cache is not None:
+            # Let background refreshes of stale entries finish before exiting
+            cache.close()
+            if args.verbose:
+                console.print(
+                    f"[dim]Cache: {cache.hits} hit(s), {cache.stale_hits} stale (refreshed), "
+                    f"{cache.misses} miss(es), {cache.refresh_errors} refresh error(s) "
+                    f"[TTL {args.cache_ttl:g}s, {cache.path}][/dim]"
+                )
+        elif args.verbose:
+            console.print("[dim]Cache: disabled[/dim]")
+        if args.verbose and (len(cities) > 1 or args.format != 'rich') and not args.poll:
+            console.print(
+                f"[dim]Requests: {stats['group_requests']} group, {stats['single_requests']} by name "
+                f"for {len(set(cities))} cities"
+                f"{'' if city_index is not None else ' (no city index, use --build-city-index)'}[/dim]"
+            )
+        if fixtures is not None and args.record:
+            console.print(f"[dim]Recorded {fixtures.recorded} response(s) to {fixtures.directory}[/dim]")
+        elif fixtures is not None and (fixtures.missing or args.verbose):
+            console.print(
+                f"[dim]Replayed {fixtures.replayed} response(s) from {fixtures.directory}"
+                f"{f', [yellow]{fixtures.missing} request(s) not recorded[/yellow]' if fixtures.missing else ''}[/dim]"
+            )
+        if args.verbose:
+            for breaker in BREAKERS.values():
+                if breaker.retries or breaker.trips:
+                    console.print(
+                        f"[dim]/{breaker.name}: {breaker.retries} retry(ies), "
+                        f"circuit opened {breaker.trips} time(s)[/dim]"
+                    )
+
+def run_poller(args, cities, api_key, session=None, city_index=None):
+    """--poll mode: poll until interrupted, storing readings and serving /metrics"""
+    store = ReadingStore(args.store)
+    metrics = WeatherMetrics()
+    server = None
+    if args.metrics_port:
+        try:
+            server = start_metrics_server(metrics, args.metrics_host, args.metrics_port)
+        except OSError as e:
+            console.print(f"[red]Error:[/red] cannot serve metrics on port {args.metrics_port}: {e}", style="bold")
+            sys.exit(1)
+    console.print(
+        f"[bold green]Polling {len(cities)} cities every {args.interval:g}s[/bold green] "
+        f"→ {store.path}"
+        f"{f', metrics at http://{args.metrics_host}:{args.metrics_port}/metrics' if server else ''}"
+        " (Ctrl+C to stop)"
+    )
+    # Treat SIGTERM (systemd, docker stop, timeout) like Ctrl+C so the store is closed cleanly
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    previous_handler = signal.signal(signal.SIGTERM, stop)
+    try:
+        poll_forever(cities, api_key, store, metrics, interval=args.interval, workers=args.workers,
+                     session=session, city_index=city_index, polls=args.polls)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Stopped polling[/yellow]")
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        store.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+def show_city(city, api_key, cache=None, session=None):
+    """Fetch and display the weather panel for a single city"""
     try:
         # Show loading message
-        with console.status(f"[bold green]Fetching weather data for {args.city}..."):
-            weather_data = get_weather_data(args.city, api_key)
+        with console.status(f"[bold green]Fetching weather data for {city}..."):
+            weather_data = get_weather(city, api_key, session, cache=cache)
         
         # Display weather information
         weather_panel = format_weather_display(weather_data)
@@ -187,28 +1494,35 @@ Get your free API key at: https://openweathermap.org/api
         console.print(weather_panel)
         console.print("\n")
         
-    except Exception as e:
+    except WeatherError as e:
         console.print(f"[red]Error:[/red] {e}", style="bold")
         
         # Provide helpful suggestions based on error type
-        error_str = str(e).lower()
-        if "not found" in error_str or "404" in error_str:
+        if isinstance(e, CityNotFoundError):
             console.print(
                 f"\n[yellow]Suggestion:[/yellow] Check the city name spelling. "
                 f"Try including country code (e.g., 'Tokyo,JP' or 'London,UK')"
             )
-        elif "unauthorized" in error_str or "401" in error_str:
+        elif isinstance(e, AuthenticationError):
             console.print(
                 f"\n[yellow]Suggestion:[/yellow] Check your API key. "
                 f"Make sure it's valid and activated."
             )
-        elif "timeout" in error_str or "connection" in error_str:
+        elif isinstance(e, NetworkError):
             console.print(
                 f"\n[yellow]Suggestion:[/yellow] Check your internet connection "
                 f"and try again."
             )
+        elif isinstance(e, (RateLimitError, ServiceUnavailableError, CircuitOpenError)):
+            console.print(
+                f"\n[yellow]Suggestion:[/yellow] OpenWeatherMap is busy or degraded. "
+                f"Wait a minute and try again."
+            )
         
         sys.exit(1)
+    except (KeyError, TypeError) as e:
+        console.print(f"[red]Error:[/red] Unexpected weather data: {e}", style="bold")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file